@@ -1,86 +1,417 @@
 import os
 import streamlit as st
-import tempfile
 import time
-import whisper
 import gc  # Garbage Collector to free RAM
-import subprocess
-from google import genai
-from google.genai import types
+import threading
+from contextlib import closing
+
+from ingest import MAX_UPLOAD_BYTES, IngestError, ingest_stream
+from jobs import SPOOL_DIR, START_METHOD, JobQueue, WorkerPool
+from keyframes import FRAME_BUDGET, FRAME_WIDTH, VisualDigest, build_digest, extract_candidates
+from lazy import LazyModule
+from llm_gateway import default_gateway
+from model_registry import WHISPER_SIZES, default_registry
+from pcm import load_or_decode
+from pov_rewrite import GenerationAborted, PovRewriter, missing_part
+from recap_cache import RecapCache
+from sections import COMPLETE, SectionRouter
+from remote_wait import WaitMetrics, wait_until_ready
+from result_cache import ResultCache, cache_key, hash_stream
+from stages import RAN, REUSED, SKIPPED, StageMemo, StageScheduler
+from tracing import job_trace, serve_metrics, span
+from transcript import Transcript
+from vad import transcribe_gated
+from workspace import JobWorkspace
+
+# The Gemini SDK loads on the first API call, not before the first paint
+genai = LazyModule("google.genai")
+types = LazyModule("google.genai.types")
 
 # --- MOBILE STABILITY CONFIG ---
 MODEL_NAME = "gemini-3.1-pro-preview" 
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
-
+UPLOAD_TTL = 47 * 3600  # Gemini keeps uploaded files for 48h
+UPLOAD_READY_TIMEOUT = 15 * 60  # don't hang a worker on a stuck file
+LIVE_REFRESH_SECONDS = 0.3  # how often streamed text is repainted
+USE_VAD = os.environ.get("POV_VAD", "1") != "0"  # Whisper only hears the speech regions
+# "keyframes": a few scene-change stills go inline with each part; "video": upload the whole mp4
+MEDIA_MODES = ("keyframes", "video")
+MEDIA_MODE = os.environ.get("POV_MEDIA", "keyframes")
+if MEDIA_MODE not in MEDIA_MODES:
+    MEDIA_MODE = "keyframes"
 # Use Session State to keep data if the mobile browser refreshes
-for key in ["script", "novel", "processing"]:
+for key in ["script", "novel", "processing", "timings", "stage_status", "cache_stats", "model_stats", "llm_stats", "aborted", "section_repairs", "upload_hashes", "shown_job"]:
     if key not in st.session_state:
         st.session_state[key] = None
 
 @st.cache_resource
-def load_whisper_mobile():
-    # Use "base" or "tiny" for low-end phones, "turbo" only if server-side
-    return whisper.load_model("base") 
+def get_model_registry():
+    # One registry per server process: models stay warm across sessions and
+    # are unloaded by its idle/size policy, not by the request.
+    return default_registry()
+
+@st.cache_resource
+def get_client():
+    # One client (and its HTTP connection pool) per server process, not per rerun
+    return genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+
+@st.cache_resource
+def get_gateway():
+    # Shared by all sessions: one rate limit and in-flight bound for the API key
+    return default_gateway()
+
+@st.cache_resource
+def get_result_cache():
+    # Shared by all sessions; re-uploads of the same episode skip the heavy work
+    return ResultCache()
+
+@st.cache_resource
+def get_recap_cache():
+    # Keyed by show/episode, not by upload: any copy of the episode reuses the recap
+    return RecapCache()
+
+@st.cache_resource
+def get_stage_memo():
+    # Stage results by input key: re-running with another POV reuses everything upstream
+    return StageMemo()
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue()
+
+@st.cache_resource
+def get_worker_pool():
+    # Deployments that run `python jobs.py` separately set POV_INLINE_WORKERS=0
+    if os.environ.get("POV_INLINE_WORKERS", "1") == "0":
+        return None
+    # Never fork the Streamlit server: it is multithreaded, and a child can inherit
+    # a lock some other thread held. Fork + preload is for `python jobs.py` only.
+    return WorkerPool(start_method="spawn" if START_METHOD == "fork" else START_METHOD).start()
+
+@st.cache_resource
+def start_metrics_endpoint():
+    # Prometheus text on /metrics, JSON on /metrics.json (opt-in)
+    port = os.environ.get("POV_METRICS_PORT")
+    return serve_metrics(int(port)) if port else None
 
 def clear_memory():
     """Forcefully clear RAM after heavy tasks."""
     gc.collect()
 
-def extract_audio_mobile(video_path):
-    audio_path = f"{video_path}_low.mp3"
-    # Convert to ultra-low bitrate to save mobile memory
-    subprocess.run([
-        "ffmpeg", "-i", video_path, "-vn", "-acodec", "libmp3lame",
-        "-ac", "1", "-ar", "16000", "-b:a", "24k", audio_path, "-y"
-    ], capture_output=True)
-    return audio_path
-
-def run_production_mobile(uploaded_file, pov_char, show, title):
-    # Save file to disk immediately (don't keep in RAM)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tfile:
-        tfile.write(uploaded_file.getbuffer())
-        video_path = tfile.name
-    
-    try:
-        # STEP 1: Search (Title Precision)
+def extract_audio_mobile(video_path, video_hash, cache, workspace):
+    # 16 kHz float32 PCM straight from ffmpeg's stdout: no MP3 encode, no
+    # temp file for Whisper to decode again
+    return load_or_decode(video_path, workspace.bulk_file("audio.f32"), video_hash, cache)
+
+# STEP 1: Search (Title Precision)
+def search_lore(show, title, recaps):
+    def fetch():
         search_cfg = types.GenerateContentConfig(tools=[types.Tool(google_search=types.GoogleSearch())])
-        res = client.models.generate_content(
-            model=MODEL_NAME, 
-            contents=f"Detailed plot/fashion recap for '{show}' episode '{title}'",
-            config=search_cfg
-        )
-        lore = res.text
-        
-        # STEP 2: Audio (Mobile Optimized)
-        audio_path = extract_audio_mobile(video_path)
-        w_model = load_whisper_mobile()
-        segments = w_model.transcribe(audio_path)["segments"]
-        transcript = "\n".join([f"[{s['start']}s] {s['text']}" for s in segments])
-        
-        # Free Whisper RAM immediately
-        del w_model
-        clear_memory()
+        with span("lore"):
+            res = get_gateway().call(
+                MODEL_NAME, get_client().models.generate_content,
+                model=MODEL_NAME, 
+                contents=f"Detailed plot/fashion recap for '{show}' episode '{title}'",
+                config=search_cfg
+            )
+        return res.text
+    # Concurrent jobs for the same episode share one grounded call
+    return recaps.get_or_fetch(show, title, MODEL_NAME, fetch)
+
+# STEP 2: Audio (Mobile Optimized)
+def upload_hash(uploaded_file):
+    """SHA-256 of the upload's bytes, remembered per upload for this session's reruns."""
+    if uploaded_file.size > MAX_UPLOAD_BYTES:
+        raise IngestError(f"Upload is {uploaded_file.size / 1e6:.0f} MB; limit is {MAX_UPLOAD_BYTES / 1e6:.0f} MB.")
+    hashes = st.session_state.upload_hashes or {}
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is None or file_id not in hashes:
+        uploaded_file.seek(0)
+        with span("hash"):
+            digest = hash_stream(uploaded_file)
+        uploaded_file.seek(0)
+        if file_id is None:
+            return digest
+        hashes[file_id] = digest
+        st.session_state.upload_hashes = hashes
+    return hashes[file_id]
+
+def ingest_upload(uploaded_file, workspace):
+    # Stream to disk in chunks; hash + probe in the same pass, reject early
+    uploaded_file.seek(0)
+    with span("ingest"):
+        # The ~200 MB episode goes to disk, not the tmpfs scratch dir
+        return ingest_stream(uploaded_file, dest_dir=workspace.bulk_path,
+                             max_bytes=MAX_UPLOAD_BYTES, declared_size=uploaded_file.size)
+
+def transcribe_mobile(cache, workspace, registry, whisper_size, ingest):
+    video_path, video_hash = ingest.path, ingest.sha256
+    # Columnar transcript file: no JSON parse and no per-segment dicts on a hit
+    seg_key = cache_key(video_hash, "transcript", whisper=whisper_size, format="npz",
+                        **({"vad": True} if USE_VAD else {}))
+    cached = cache.get_path(seg_key)
+    if cached is not None:
+        try:
+            return Transcript.load(str(cached))
+        except FileNotFoundError:
+            pass  # evicted since the lookup; transcribe again
+    with span("extract"):
+        audio = extract_audio_mobile(video_path, video_hash, cache, workspace)
+    with registry.lease(whisper_size) as w_model, span("transcribe", model=whisper_size):
+        # Silence, music beds and laugh tracks are skipped; times map back to the episode
+        result = transcribe_gated(audio, w_model.transcribe) if USE_VAD else w_model.transcribe(audio)
+    transcript = Transcript.from_segments(result["segments"])
+    del result  # drop Whisper's token lists etc. right away
+    path = workspace.file("transcript.npz")
+    transcript.save(path)
+    cache.put_path(seg_key, path, suffix=".npz", move=True)
+    return transcript
+
+# STEP 3: Video Analysis
+def upload_video(cache, wait, ingest):
+    video_path, video_hash = ingest.path, ingest.sha256
+    key = cache_key(video_hash, "upload")
+    cached = cache.get_json(key)
+    if cached is not None:
+        try:
+            file_ref = get_client().files.get(name=cached["name"])
+            if file_ref.state.name == "ACTIVE":
+                return file_ref
+        except Exception:
+            pass  # expired or deleted server-side; upload again
 
-        # STEP 3: Video Analysis
+    client = get_client()
+    with span("upload"):
         file_ref = client.files.upload(path=video_path)
-        while file_ref.state.name == "PROCESSING":
-            time.sleep(3)
-            file_ref = client.files.get(name=file_ref.name)
+        file_ref = wait_until_ready(file_ref, lambda f: client.files.get(name=f.name),
+                                    timeout=UPLOAD_READY_TIMEOUT, metrics=wait)
+    cache.put_json(key, {"name": file_ref.name, "uri": file_ref.uri}, ttl=UPLOAD_TTL)
+    return file_ref
 
-        # STEP 4: Novel Writing
-        prompt = f"RECAP: {lore}\nTRANSCRIPT: {transcript}\nTASK: [SCRIPT] line-by-line script. [NOVEL] {pov_char} POV chapter."
-        final_res = client.models.generate_content(model=MODEL_NAME, contents=[prompt, file_ref])
+# STEP 3 (keyframe mode): scene-change stills instead of the upload
+def extract_keyframes(workspace, ingest):
+    with span("keyframes"):
+        return extract_candidates(ingest.path, workspace.file("keyframes"))
+
+def select_digest(candidates, transcript, budget=FRAME_BUDGET):
+    # Frames follow the dialogue and carry the `[t s]` of the line they fall in
+    return build_digest(None, None, segment_starts=transcript.starts, budget=budget, candidates=candidates)
+
+def media_contents(media, start=None, end=None):
+    """
+    What goes next to the prompt: the digest frames in [start, end), or the
+    uploaded file for the opening part only (start None). The whole episode is
+    billed every time it is attached, so later parts go on the transcript and
+    the character notes.
+    """
+    if isinstance(media, VisualDigest):
+        return media.contents(lambda data, mime: types.Part.from_bytes(data=data, mime_type=mime), start, end)
+    return [media] if start is None else []
+
+def part_spans(chunks):
+    """(start, end) of each planned part; the first and last are open so no frame is dropped."""
+    starts = [float(c.starts[0]) if len(c) else None for c in chunks]
+    return [(None if i == 0 else starts[i], starts[i + 1] if i + 1 < len(starts) else None)
+            for i in range(len(starts))]
+
+# STEP 4: Novel Writing (scene by scene, token-budgeted; see pov_rewrite)
+def chunk_prompt(pov_char, lore, scene, state, index, total):
+    if total == 1:
+        return (f"RECAP: {lore}\nTRANSCRIPT: {scene}\n"
+                f"TASK: [SCRIPT] line-by-line script. [END_SCRIPT] [NOVEL] {pov_char} POV chapter. [END_NOVEL]")
+    return (
+        f"RECAP: {lore}\nSTORY SO FAR ({pov_char}'s notes): {state or 'This is the opening.'}\n"
+        f"TRANSCRIPT (part {index + 1} of {total}): {scene}\n"
+        f"TASK: [SCRIPT] line-by-line script of this part. [END_SCRIPT] [NOVEL] {pov_char} POV chapter for this "
+        "part only; continue from the story so far, no recap. [END_NOVEL]"
+    )
+
+def generate_text(prompt, media):
+    with span("generate"):
+        return get_gateway().call(MODEL_NAME, get_client().models.generate_content,
+                                  model=MODEL_NAME, contents=[prompt, *media]).text
+
+def stream_text(prompt, media, router, cancel):
+    # Tokens go to the SCRIPT/NOVEL buffers as they arrive; leaving the loop
+    # early closes the stream, so an aborted part stops being billed
+    if cancel.is_set():
+        raise GenerationAborted("stopped by user")
+    pieces = get_gateway().stream(MODEL_NAME, get_client().models.generate_content_stream,
+                                  model=MODEL_NAME, contents=[prompt, *media])
+    with span("generate"), closing(pieces):  # closing frees the gateway slot right away
+        for piece in pieces:
+            if cancel.is_set():
+                raise GenerationAborted("stopped by user")
+            router.feed(piece.text or "")
+    router.close()
+    return router.full_text
+
+def assemble_parts(drafts, finished):
+    """
+    Script and novel so far: finished parts in order, then the part being
+    written. A finished part with no section markers at all goes into the
+    novel as the model wrote it rather than vanishing.
+    """
+    scripts, novels = [], []
+    for i in range(len(finished) + 1):
+        chunk, draft = finished.get(i), drafts.get(i)
+        if chunk is not None and chunk.error:
+            novels.append(missing_part(chunk))
+        elif chunk is not None and draft is not None and not draft.recovered:
+            novels.append(draft.full_text.strip())
+        elif draft is not None:
+            scripts.append(draft.text("SCRIPT").strip())
+            novels.append(draft.text("NOVEL").strip())
+    return "\n\n".join(filter(None, scripts)), "\n\n".join(filter(None, novels))
+
+def write_novel(pov_char, lore, transcript, upload, on_update=None, cancel=None):
+    """
+    (script, novel, repairs, complete). on_update(script, novel, parts_done,
+    parts_total) runs in this thread; repairs lists parts whose section
+    markers were off; complete is False if any part is missing or had no
+    sections at all (so that run is never memoized).
+    """
+    cancel = cancel or threading.Event()
+    drafts = {}    # part -> SectionRouter of the attempt in flight
+    finished = {}  # part -> RewriteChunk, filled in story order
+
+    spans = []     # part -> (start, end) seconds, for picking its keyframes
+
+    def generate(prompt, part):
+        if part is None:
+            # Character notes: not shown, and written from the transcript alone
+            return generate_text(prompt, [])
+        drafts[part] = router = SectionRouter()
+        return stream_text(prompt, media_contents(upload, *spans[part]), router, cancel)
+
+    rewriter = PovRewriter(
+        generate=generate,
+        build_prompt=lambda scene, state, i, n: chunk_prompt(pov_char, lore, scene, state, i, n),
+        character=pov_char,
+    )
+    spans[:] = part_spans(rewriter.plan(transcript))
+    total = len(spans)
+
+    def consume():
+        for chunk in rewriter.stream(transcript):
+            finished[chunk.index] = chunk
+
+    # Parts are written off-thread; this (script) thread repaints the UI
+    worker = threading.Thread(target=consume, name="pov-novel", daemon=True)
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(LIVE_REFRESH_SECONDS)
+            if on_update is not None:
+                on_update(*assemble_parts(drafts, finished), len(finished), total)
+    finally:
+        # Also reached when Streamlit stops the script (Stop button, page left)
+        cancel.set()
+    script, novel = assemble_parts(drafts, finished)
+    # Parts whose markers were missing/duplicated but whose text was recovered
+    repairs = {}
+    unsectioned = False
+    for i, draft in sorted(drafts.items()):
+        report = draft.report()
+        if i in finished and not draft.recovered:
+            report["fallback"] = "no sections found; full response used as the novel"
+            unsectioned = True
+        if any(status != COMPLETE for status in report.values()):
+            repairs[f"part {i + 1}"] = report
+    complete = len(finished) == total and not any(c.error for c in finished.values()) and not unsectioned
+    return script, novel, repairs, complete
+
+def submit_production_job(uploaded_file, pov_char, show, title, whisper_size="base"):
+    # The spool copy outlives this session; the worker deletes it when done
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    uploaded_file.seek(0)
+    ingested = ingest_stream(uploaded_file, dest_dir=SPOOL_DIR,
+                             max_bytes=MAX_UPLOAD_BYTES, declared_size=uploaded_file.size)
+    get_worker_pool()
+    return get_job_queue().submit("pov", {
+        "video_path": ingested.path,
+        "pov": pov_char,
+        "cast_info": f"Show: {show}\nEpisode: {title}",
+        "whisper_model": whisper_size,
+        "delete_input": True,
+    })
+
+def run_production_mobile(uploaded_file, pov_char, show, title, whisper_size="base", on_update=None,
+                          media_mode=MEDIA_MODE):
+    # Job wall time + peak RSS go to the metrics store
+    with job_trace("app"):
+        _run_production(uploaded_file, pov_char, show, title, whisper_size, on_update, media_mode)
+
+def _run_production(uploaded_file, pov_char, show, title, whisper_size, on_update=None, media_mode=MEDIA_MODE):
+    # Video, audio and frames share one per-job workspace, removed in `finally`
+    workspace = JobWorkspace()
+    try:
+        cache = get_result_cache()
+        # Resolve Streamlit caches in the script thread; stages run off-thread
+        registry = get_model_registry()
+        recaps = get_recap_cache()
+
+        # Keyed stages: changing a setting re-runs only the stages downstream
+        # of it. Keys start from the upload's content, so re-uploading the same
+        # episode reuses its work; it is written to disk only if a stage that
+        # reads it has to run.
+        sched = StageScheduler(memo=get_stage_memo())
+        sched.add("ingest", ingest_upload, uploaded_file, workspace,
+                  params={"sha256": upload_hash(uploaded_file)}, memoize=False)
+        # STEPS 1-3 run side by side (search, ffmpeg+Whisper, upload)
+        sched.add("lore", search_lore, show, title, recaps,
+                  params={"show": show, "title": title, "model": MODEL_NAME})
+        sched.add("transcript", transcribe_mobile, cache, workspace, registry, whisper_size,
+                  after=("ingest",), params={"whisper": whisper_size, "vad": USE_VAD})
+        upload_wait = WaitMetrics()
+        if media_mode == "keyframes":
+            # "upload" is the frame digest here, so the rewrite key below is unchanged
+            sched.add("keyframes", extract_keyframes, workspace, after=("ingest",), params={"width": FRAME_WIDTH})
+            sched.add("upload", select_digest, after=("keyframes", "transcript"),
+                      params={"media": media_mode, "budget": FRAME_BUDGET})
+        else:
+            sched.add("upload", upload_video, cache, upload_wait, after=("ingest",), params={})
+        inputs = sched.run(targets=("lore", "transcript", "upload"))
+        status = sched.status()
+
+        # STEP 4 runs in the script thread so finished chunks can reach the UI
+        generate_start = time.perf_counter()
+        memo = get_stage_memo()
+        rewrite_key = sched.derive_key("rewrite", {"pov": pov_char, "model": MODEL_NAME},
+                                       after=("lore", "transcript", "upload"))
+        found, written = memo.lookup(rewrite_key) if rewrite_key else (False, None)
+        if found:
+            script, novel, repairs = written
+            status["rewrite"] = REUSED
+        else:
+            script, novel, repairs, complete = write_novel(pov_char, inputs["lore"], inputs["transcript"],
+                                                           inputs["upload"], on_update)
+            if complete and rewrite_key:
+                memo.store(rewrite_key, (script, novel, repairs))
+            status["rewrite"] = RAN
+        st.session_state.timings = {
+            **sched.breakdown(),
+            "generate": round(time.perf_counter() - generate_start, 3),
+            "upload_wait": round(upload_wait.seconds, 3),
+            "upload_polls": upload_wait.polls,
+            **({"keyframes": inputs["upload"].stats()} if isinstance(inputs["upload"], VisualDigest) else {}),
+        }
+        st.session_state.stage_status = status
+        st.session_state.cache_stats = {**cache.stats(), "recaps": recaps.stats()}
+        st.session_state.model_stats = registry.stats()
+        st.session_state.llm_stats = get_gateway().stats()
         
         # Save to session so it survives a page flicker
-        st.session_state.script = final_res.text.split("[SCRIPT]")[1].split("[END_SCRIPT]")[0]
-        st.session_state.novel = final_res.text.split("[NOVEL]")[1].split("[END_NOVEL]")[0]
+        st.session_state.script = script
+        st.session_state.novel = novel
+        st.session_state.section_repairs = repairs
 
     finally:
         # Crucial for mobile: Delete files from the server disk after use
-        if os.path.exists(video_path): os.remove(video_path)
-        if 'audio_path' in locals() and os.path.exists(audio_path): os.remove(audio_path)
+        workspace.cleanup()
         clear_memory()
 
+start_metrics_endpoint()
+
 # --- MOBILE UI LAYOUT ---
 st.set_page_config(page_title="Mobile POV Engine", layout="centered") # Centered is better for phones
 st.title("🎬 POV Engine Mobile")
@@ -90,17 +421,77 @@ with st.expander("⚙️ Episode Settings", expanded=True):
     show = st.text_input("Show", "Wizards Beyond Waverly Place")
     title = st.text_input("Episode Title", "S01E03")
     pov = st.text_input("POV Character", "Roman")
+    # "tiny"/"base" for shared low-RAM hosts, "turbo" only on a beefy server
+    whisper_size = st.selectbox("Whisper Model", WHISPER_SIZES, index=WHISPER_SIZES.index("base"))
+    # Keyframes: a few MB of stills instead of uploading the whole episode
+    media_mode = st.radio("Video to Gemini", MEDIA_MODES, index=MEDIA_MODES.index(MEDIA_MODE), horizontal=True)
+
+    # Background jobs keep running if the phone disconnects or the page reloads
+    background = st.toggle("Run in background", value=False)
 
 up = st.file_uploader("Upload Video", type=["mp4"])
 
 if st.button("🚀 Start Production (Mobile Safe)"):
     if up:
-        with st.status("Processing... This may take a minute on mobile."):
-            run_production_mobile(up, pov, show, title)
+        try:
+            if background:
+                # Job id lives in the URL so a full page refresh can pick it up again
+                st.query_params["job"] = submit_production_job(up, pov, show, title, whisper_size)
+            else:
+                st.session_state.aborted = False
+                with st.status("Processing... This may take a minute on mobile."):
+                    # Stopping reruns the script, which cancels the streams
+                    st.button("⏹️ Stop generation", on_click=lambda: st.session_state.update(aborted=True))
+                    script_tab, novel_tab = st.tabs(["📜 Script", "📖 Novel"])
+                    with script_tab:
+                        live_script = st.empty()
+                    with novel_tab:
+                        live_novel = st.empty()
+
+                    def show_progress(script, novel, done, total):
+                        # Kept in session state so a stopped run still shows its partial text
+                        st.session_state.script, st.session_state.novel = script, novel
+                        live_script.text(script)
+                        live_novel.markdown(f"*Part {min(done + 1, total)} of {total}*\n\n{novel}")
+
+                    run_production_mobile(up, pov, show, title, whisper_size, on_update=show_progress,
+                                          media_mode=media_mode)
+        except IngestError as e:
+            st.error(f"Upload rejected: {e}")
+        else:
+            st.rerun()
+
+# --- BACKGROUND JOB STATUS ---
+job_id = st.query_params.get("job")
+if job_id:
+    job = get_job_queue().get(job_id)
+    if job is None:
+        st.warning("Unknown job id.")
+    elif job.active:
+        get_worker_pool()  # make sure someone is draining the queue after a restart
+        st.info(f"Job {job_id[:8]} is {job.status}…")
+        time.sleep(2)
         st.rerun()
+    elif job.status == "failed":
+        st.error(f"Job {job_id[:8]} failed: {job.error.splitlines()[0]}")
+    elif st.session_state.shown_job != job_id:
+        # Once per finished job: it replaces whatever this session showed before,
+        # but later reruns keep a newer inline result
+        st.session_state.script = job.result["transcript"]
+        st.session_state.novel = job.result["novel"]
+        st.session_state.section_repairs = None
+        st.session_state.aborted = False
+        st.session_state.shown_job = job_id
 
 # --- PERSISTENT RESULTS DISPLAY ---
-if st.session_state.script:
+if st.session_state.aborted:
+    st.warning("Generation stopped; showing what was written so far.")
+if st.session_state.section_repairs:
+    # Output didn't follow the [SCRIPT]/[NOVEL] format exactly; text was recovered
+    with st.expander("🩹 Recovered sections"):
+        st.json(st.session_state.section_repairs)
+
+if st.session_state.script or st.session_state.novel:
     st.divider()
     # Using tabs for mobile so you don't have to scroll forever
     tab1, tab2 = st.tabs(["📜 Script", "📖 Novel"])
@@ -112,3 +503,20 @@ if st.session_state.script:
     with tab2:
         st.text_area("POV Novel", st.session_state.novel, height=300)
         st.download_button("📥 Save Novel", st.session_state.novel, f"{pov}_novel.txt")
+
+    if st.session_state.timings:
+        with st.expander("⏱️ Stage timings (s)"):
+            if st.session_state.stage_status:
+                # ♻️ = result reused from an earlier run with the same inputs
+                icons = {RAN: "▶️", REUSED: "♻️", SKIPPED: "⏭️"}
+                st.caption("  ".join(f"{icons.get(v, '')} {k}" for k, v in st.session_state.stage_status.items()))
+            st.json(st.session_state.timings)
+            if st.session_state.cache_stats:
+                st.caption("Result cache")
+                st.json(st.session_state.cache_stats)
+            if st.session_state.model_stats:
+                st.caption("Whisper models")
+                st.json(st.session_state.model_stats)
+            if st.session_state.llm_stats:
+                st.caption("LLM calls")
+                st.json(st.session_state.llm_stats)
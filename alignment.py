@@ -0,0 +1,120 @@
+"""
+Speaker attribution: join pyannote diarization turns with Whisper segments.
+
+Both sides are sorted by start time and swept once; a min-heap keyed on turn
+end drops turns that can no longer overlap, so the cost is
+O((n + m) log m) plus the (small) number of actual overlaps, instead of the
+O(n * m) nested scan. Each segment, or each word when Whisper ran with
+`word_timestamps=True`, goes to the speaker it overlaps the most.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+from typing import Iterable, Sequence
+
+UNKNOWN_SPEAKER = "UNKNOWN"
+
+
+@dataclass(frozen=True, slots=True)
+class Turn:
+    start: float
+    end: float
+    speaker: str
+
+
+@dataclass(slots=True)
+class SpeakerLine:
+    start: float
+    end: float
+    speaker: str
+    text: str
+
+
+@dataclass
+class SpeakerTranscript:
+    lines: list[SpeakerLine] = field(default_factory=list)
+
+    @property
+    def speakers(self) -> list[str]:
+        return sorted({line.speaker for line in self.lines})
+
+    def render(self) -> str:
+        """`[12.5s] SPEAKER_01: text` lines, ready for a POV prompt."""
+        return "\n".join(f"[{line.start}s] {line.speaker}: {line.text.strip()}" for line in self.lines)
+
+    def to_dicts(self) -> list[dict]:
+        return [
+            {"start": l.start, "end": l.end, "speaker": l.speaker, "text": l.text}
+            for l in self.lines
+        ]
+
+
+def turns_from_annotation(annotation) -> list[Turn]:
+    """
+    Turns from a pyannote Annotation (or anything with itertracks(yield_label=True)).
+    pyannote 4 pipelines return a DiarizeOutput; its `.speaker_diarization` is used.
+    """
+    annotation = getattr(annotation, "speaker_diarization", annotation)
+    return [
+        Turn(float(segment.start), float(segment.end), str(label))
+        for segment, _track, label in annotation.itertracks(yield_label=True)
+    ]
+
+
+def assign_speakers(items: Sequence[tuple[float, float]], turns: Iterable[Turn]) -> list[str]:
+    """
+    Speaker with the largest overlap for each (start, end) item.
+
+    Items need not be sorted; results come back in input order.
+    """
+    ordered_turns = sorted(turns, key=lambda t: t.start)
+    order = sorted(range(len(items)), key=lambda i: items[i][0])
+    speakers = [UNKNOWN_SPEAKER] * len(items)
+
+    active: list[tuple[float, int]] = []  # (turn end, turn index)
+    next_turn = 0
+    for i in order:
+        start, end = items[i]
+        while next_turn < len(ordered_turns) and ordered_turns[next_turn].start < end:
+            heapq.heappush(active, (ordered_turns[next_turn].end, next_turn))
+            next_turn += 1
+        # Items are visited by start, so turns ending before this start are done for good.
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+
+        # Largest overlap wins; ties go to the earlier turn, whatever the heap order.
+        best, best_overlap = None, 0.0
+        for turn_end, t in active:
+            overlap = min(end, turn_end) - max(start, ordered_turns[t].start)
+            if overlap > best_overlap or (overlap == best_overlap and best is not None and t < best):
+                best, best_overlap = t, overlap
+        if best is not None:
+            speakers[i] = ordered_turns[best].speaker
+    return speakers
+
+
+def align_segments(segments: Sequence[dict], turns: Iterable[Turn]) -> SpeakerTranscript:
+    """
+    Speaker-labelled transcript from Whisper segments.
+
+    Uses per-word timing when segments carry "words"; consecutive words by the
+    same speaker are merged into one line, so a segment that spans a speaker
+    change is split.
+    """
+    turns = list(turns)
+    if any(seg.get("words") for seg in segments):
+        words = [w for seg in segments for w in seg.get("words") or []]
+        labels = assign_speakers([(w["start"], w["end"]) for w in words], turns)
+        lines: list[SpeakerLine] = []
+        for word, speaker in zip(words, labels):
+            if lines and lines[-1].speaker == speaker:
+                lines[-1].end = word["end"]
+                lines[-1].text += word["word"]
+            else:
+                lines.append(SpeakerLine(word["start"], word["end"], speaker, word["word"]))
+        return SpeakerTranscript(lines)
+
+    labels = assign_speakers([(s["start"], s["end"]) for s in segments], turns)
+    return SpeakerTranscript([
+        SpeakerLine(s["start"], s["end"], speaker, s["text"]) for s, speaker in zip(segments, labels)
+    ])
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Headless batch mode: a whole season, several POV characters, no clicking.
+
+    python batch.py season1/ --pov Roman --pov Alex --show "Wizards Beyond Waverly Place" -o out/
+    python batch.py season1.json -o out/        # manifest (see load_manifest)
+
+Work is pipelined in two pools:
+
+- CPU pool (processes): extract + transcribe each episode once, saving
+  `<out>/<episode>/transcript.npz`
+- LLM pool (threads): as soon as an episode's transcript lands, rewrite it
+  for every POV character into `<out>/<episode>/<character>.md`
+
+Outputs are written atomically, so a rerun after a crash skips everything
+already on disk: finished rewrites are not redone, and an episode whose
+transcript exists is not transcribed again.
+"""
+
+import json
+import multiprocessing as mp
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".m4v", ".webm")
+TRANSCRIPT_FILE = "transcript.npz"
+DEFAULT_LLM_CONCURRENCY = int(os.getenv("POV_BATCH_LLM_CONCURRENCY", "4"))
+
+
+@dataclass
+class Episode:
+    path: str
+    title: str
+    show: str = ""
+    cast_info: str = ""
+
+    @property
+    def slug(self) -> str:
+        return slugify(self.title)
+
+    def prompt_cast_info(self) -> str:
+        return self.cast_info or f"Show: {self.show}\nEpisode: {self.title}"
+
+
+def slugify(name: str) -> str:
+    """Filesystem-safe name: 'Roman (S1)' -> 'roman-s1'."""
+    return re.sub(r"[^\w]+", "-", name.casefold()).strip("-") or "untitled"
+
+
+def discover(directory: str, show: str = "") -> list[Episode]:
+    """Every video in `directory`, in name order, titled by file stem."""
+    paths = sorted(p for p in Path(directory).iterdir()
+                   if p.is_file() and p.suffix.lower() in VIDEO_EXTENSIONS)
+    return [Episode(path=str(p), title=p.stem, show=show) for p in paths]
+
+
+def load_manifest(path: str) -> tuple[list[Episode], list[str]]:
+    """
+    (episodes, characters) from a JSON manifest:
+
+        {"show": "...", "characters": ["Roman", "Alex"],
+         "episodes": [{"path": "ep1.mp4", "title": "S01E01", "cast_info": "..."}, ...]}
+
+    Relative episode paths are resolved against the manifest's directory.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    base = Path(path).parent
+    show = manifest.get("show", "")
+    episodes = []
+    for entry in manifest.get("episodes", []):
+        video = Path(entry["path"])
+        if not video.is_absolute():
+            video = base / video
+        episodes.append(Episode(path=str(video), title=entry.get("title") or video.stem,
+                                show=entry.get("show", show), cast_info=entry.get("cast_info", "")))
+    return episodes, list(manifest.get("characters", []))
+
+
+def write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+# ---- CPU stage (runs in pool processes) ----
+_ENGINES: dict = {}  # per process, reused across episodes
+
+
+def init_cpu_worker(threads: int) -> None:
+    """Pool initializer: Whisper in each worker gets its share of the cores, not all of them."""
+    from diarization import pin_torch_threads
+
+    pin_torch_threads(threads)
+
+
+def transcribe_episode(video_path: str, out_path: str, whisper_model: str = "base",
+                       chunked: bool = True) -> str:
+    """Transcribe one episode into `out_path` (.npz); returns the path."""
+    from processor import CastScriptEngine
+    from result_cache import ResultCache
+    from transcript import Transcript
+
+    key = (whisper_model, chunked)
+    if key not in _ENGINES:
+        options = {} if chunked else {"chunk_seconds": None}
+        _ENGINES[key] = CastScriptEngine(whisper_model=whisper_model, cache=ResultCache(), **options)
+    result = _ENGINES[key].process_video_or_url(video_path)
+    transcript = result.as_transcript() or Transcript.empty()
+    tmp = f"{out_path}.{os.getpid()}.tmp.npz"
+    transcript.save(tmp)
+    os.replace(tmp, out_path)
+    return out_path
+
+
+# ---- LLM stage (threads in the batch process) ----
+def complete_rewrite(chunks: Iterable) -> str:
+    """
+    The stitched rewrite, or RuntimeError if any part failed. A batch output
+    on disk counts as done, so a transient failure must not be written as a
+    `[Part N missing]` marker; the character is retried on the next run.
+    """
+    from pov_rewrite import stitch
+
+    chunks = list(chunks)
+    failed = [c for c in chunks if c.error]
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(chunks)} part(s) failed; first: "
+                           f"part {failed[0].index + 1}: {failed[0].error}")
+    return stitch(chunks)
+
+
+def engine_rewriter(whisper_model: str = "base") -> Callable[[str, Episode, str], str]:
+    """rewrite(transcript_path, episode, character) on one shared CastScriptEngine."""
+    from processor import CastScriptEngine
+    from transcript import Transcript
+
+    # Only the LLM side is used here; Whisper is never loaded in this process.
+    engine = CastScriptEngine(whisper_model=whisper_model)
+    if not engine.llm:
+        raise RuntimeError("Gemini is not configured; set GEMINI_API_KEY to run batch rewrites.")
+
+    def rewrite(transcript_path: str, episode: Episode, character: str) -> str:
+        return complete_rewrite(engine.rewrite_pov_stream(Transcript.load(transcript_path), character,
+                                                          episode.prompt_cast_info()))
+
+    return rewrite
+
+
+@dataclass
+class BatchReport:
+    transcribed: list[str] = field(default_factory=list)
+    written: list[str] = field(default_factory=list)   # "<episode>/<character>"
+    skipped: list[str] = field(default_factory=list)   # already on disk
+    failed: dict[str, str] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+class BatchRunner:
+
+    def __init__(self, out_dir: str, characters: list[str], whisper_model: str = "base",
+                 cpu_workers: int | None = None, llm_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+                 transcribe: Callable[..., str] = transcribe_episode,
+                 rewrite: Callable[[str, Episode, str], str] | None = None,
+                 cpu_pool: Executor | None = None, log: Callable[[str], None] | None = print):
+        if not characters:
+            raise ValueError("at least one POV character is required")
+        self.out_dir = Path(out_dir)
+        self.characters = list(dict.fromkeys(characters))
+        self.whisper_model = whisper_model
+        if cpu_workers is None:
+            from jobs import default_worker_count
+            cpu_workers = default_worker_count(whisper_model)
+        self.cpu_workers = cpu_workers
+        self.llm_concurrency = llm_concurrency
+        self.transcribe = transcribe
+        self.rewrite = rewrite
+        self.cpu_pool = cpu_pool
+        self.log = log or (lambda message: None)
+        self._lock = threading.Lock()
+
+    # ---- Output layout ----
+    def episode_dir(self, episode: Episode) -> Path:
+        return self.out_dir / episode.slug
+
+    def transcript_path(self, episode: Episode) -> Path:
+        return self.episode_dir(episode) / TRANSCRIPT_FILE
+
+    def output_path(self, episode: Episode, character: str) -> Path:
+        return self.episode_dir(episode) / f"{slugify(character)}.md"
+
+    def pending(self, episode: Episode) -> list[str]:
+        """Characters whose rewrite of `episode` is not on disk yet."""
+        return [c for c in self.characters if not self.output_path(episode, c).exists()]
+
+    # ---- Run ----
+    def run(self, episodes: list[Episode]) -> BatchReport:
+        report = BatchReport()
+        started = time.perf_counter()
+        if len({e.slug for e in episodes}) != len(episodes):
+            raise ValueError("episode titles must be unique (they name the output folders)")
+
+        todo = []
+        for episode in episodes:
+            missing = self.pending(episode)
+            report.skipped += [f"{episode.slug}/{slugify(c)}" for c in self.characters if c not in missing]
+            if missing:
+                self.episode_dir(episode).mkdir(parents=True, exist_ok=True)
+                todo.append((episode, missing))
+        if not todo:
+            report.seconds = time.perf_counter() - started
+            return report
+
+        rewrite = self.rewrite or engine_rewriter(self.whisper_model)
+        cpu_pool = self.cpu_pool or ProcessPoolExecutor(
+            max_workers=self.cpu_workers, mp_context=mp.get_context("spawn"),
+            initializer=init_cpu_worker, initargs=(max(1, (os.cpu_count() or 1) // self.cpu_workers),),
+        )
+        llm_pool = ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix="pov-batch-llm")
+        rewrites: list[Future] = []
+        try:
+            transcribing: dict[Future, tuple[Episode, list[str]]] = {}
+            for episode, missing in todo:
+                path = self.transcript_path(episode)
+                if path.exists():
+                    rewrites += self._fan_out(llm_pool, rewrite, str(path), episode, missing, report)
+                else:
+                    # Parallel episodes replace parallel chunks of one episode.
+                    future = cpu_pool.submit(self.transcribe, episode.path, str(path),
+                                             self.whisper_model, self.cpu_workers <= 1)
+                    transcribing[future] = (episode, missing)
+
+            # Rewrites for an episode start as soon as its transcript is ready,
+            # while later episodes are still transcribing.
+            for future in as_completed(transcribing):
+                episode, missing = transcribing[future]
+                try:
+                    path = future.result()
+                except Exception as e:
+                    self._fail(report, episode.slug, e)
+                    continue
+                report.transcribed.append(episode.slug)
+                self.log(f"📝 transcribed {episode.slug}")
+                rewrites += self._fan_out(llm_pool, rewrite, path, episode, missing, report)
+
+            for future in rewrites:
+                future.result()
+        finally:
+            llm_pool.shutdown(wait=True)
+            if self.cpu_pool is None:
+                cpu_pool.shutdown(wait=True)
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def _fan_out(self, pool: Executor, rewrite: Callable[[str, Episode, str], str], transcript_path: str,
+                 episode: Episode, characters: list[str], report: BatchReport) -> list[Future]:
+        return [pool.submit(self._rewrite_one, rewrite, transcript_path, episode, c, report) for c in characters]
+
+    def _rewrite_one(self, rewrite: Callable[[str, Episode, str], str], transcript_path: str,
+                     episode: Episode, character: str, report: BatchReport) -> None:
+        name = f"{episode.slug}/{slugify(character)}"
+        try:
+            text = rewrite(transcript_path, episode, character)
+            write_atomic(self.output_path(episode, character), text)
+        except Exception as e:
+            self._fail(report, name, e)
+            return
+        with self._lock:
+            report.written.append(name)
+        self.log(f"📖 wrote {name}")
+
+    def _fail(self, report: BatchReport, name: str, error: Exception) -> None:
+        with self._lock:
+            report.failed[name] = f"{type(error).__name__}: {error}"
+        self.log(f"❌ {name}: {type(error).__name__}: {error}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Transcribe a season once and rewrite it for several POV characters.")
+    parser.add_argument("source", help="directory of episode videos, or a JSON manifest")
+    parser.add_argument("-o", "--out", required=True, help="output directory (reruns resume from it)")
+    parser.add_argument("--pov", action="append", default=[], help="POV character (repeatable)")
+    parser.add_argument("--show", default="", help="show name for prompts (directory mode)")
+    parser.add_argument("--whisper-model", default="base")
+    parser.add_argument("--workers", type=int, default=None, help="transcription processes (default: sized to host)")
+    parser.add_argument("--llm-concurrency", type=int, default=DEFAULT_LLM_CONCURRENCY,
+                        help="rewrites in flight at once")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.source):
+        episodes, characters = discover(args.source, show=args.show), []
+    else:
+        episodes, characters = load_manifest(args.source)
+    characters = args.pov or characters
+    if not episodes:
+        parser.error(f"no episodes found in {args.source}")
+    if not characters:
+        parser.error("give at least one --pov (or 'characters' in the manifest)")
+
+    runner = BatchRunner(args.out, characters, whisper_model=args.whisper_model,
+                         cpu_workers=args.workers, llm_concurrency=args.llm_concurrency)
+    print(f"🎬 {len(episodes)} episode(s) × {len(runner.characters)} character(s), "
+          f"{runner.cpu_workers} transcription worker(s)")
+    report = runner.run(episodes)
+    print(f"✅ {len(report.written)} written, {len(report.skipped)} skipped, "
+          f"{len(report.failed)} failed in {report.seconds:.1f}s")
+    return 0 if report.ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
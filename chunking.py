@@ -0,0 +1,220 @@
+"""
+Chunked, parallel Whisper transcription for long episodes.
+
+- Split 16 kHz mono audio (raw float32 or WAV) at silence boundaries into
+  bounded windows
+- Transcribe the windows across a process pool (one Whisper model per worker)
+- Stitch segments back onto the original timeline, dropping overlap duplicates
+"""
+
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from typing import Sequence
+
+import numpy as np
+
+from pcm import BYTES_PER_SAMPLE, load_pcm_file
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 300.0      # 5-minute windows
+OVERLAP_SECONDS = 2.0      # audio shared by neighbouring windows
+SEARCH_SECONDS = 30.0      # how far before the hard limit we look for silence
+FRAME_SECONDS = 0.02       # 20 ms energy frames
+
+
+@dataclass(frozen=True)
+class Chunk:
+    index: int
+    start: float  # seconds on the original timeline
+    end: float
+
+
+def wav_duration(path: str) -> float:
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+
+def load_wav(path: str, start: float = 0.0, end: float | None = None) -> np.ndarray:
+    """Read [start, end) of a 16-bit mono WAV as float32 in [-1, 1]."""
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit mono PCM WAV")
+        rate = wf.getframerate()
+        total = wf.getnframes()
+        first = min(int(start * rate), total)
+        last = total if end is None else min(int(end * rate), total)
+        wf.setpos(first)
+        raw = wf.readframes(max(last - first, 0))
+    return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def read_window(path: str, start: float = 0.0, end: float | None = None) -> np.ndarray:
+    """[start, end) of a .wav file or a raw float32 (.f32) PCM file."""
+    if path.endswith(".wav"):
+        return load_wav(path, start, end)
+    return load_pcm_file(path, start, end)
+
+
+def audio_duration(path: str) -> float:
+    if path.endswith(".wav"):
+        return wav_duration(path)
+    return os.path.getsize(path) / (BYTES_PER_SAMPLE * SAMPLE_RATE)
+
+
+def frame_energy(audio: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                 frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """RMS energy per fixed-size frame (trailing partial frame dropped)."""
+    n = max(int(sample_rate * frame_seconds), 1)
+    usable = (len(audio) // n) * n
+    if usable == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:usable].reshape(-1, n)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+def plan_chunks(energy: Sequence[float], duration: float,
+                chunk_seconds: float = CHUNK_SECONDS,
+                overlap_seconds: float = OVERLAP_SECONDS,
+                search_seconds: float = SEARCH_SECONDS,
+                frame_seconds: float = FRAME_SECONDS) -> list[Chunk]:
+    """
+    Cut the timeline into windows no longer than `chunk_seconds`.
+
+    Each cut lands on the quietest frame in the last `search_seconds` before the
+    hard limit, so words are rarely split. Neighbouring windows share
+    `overlap_seconds` of audio; `stitch_segments` removes the duplicates.
+    """
+    if duration <= chunk_seconds:
+        return [Chunk(0, 0.0, duration)]
+
+    chunks: list[Chunk] = []
+    start = 0.0
+    while True:
+        hard_end = start + chunk_seconds
+        if hard_end >= duration:
+            chunks.append(Chunk(len(chunks), start, duration))
+            return chunks
+
+        lo = int(max(hard_end - search_seconds, start + overlap_seconds) / frame_seconds)
+        hi = min(int(hard_end / frame_seconds), len(energy))
+        if lo < hi:
+            # Quietest frame wins; on ties prefer the later one (longer window).
+            best = min(range(lo, hi), key=lambda i: (energy[i], -i))
+            cut = min((best + 0.5) * frame_seconds, hard_end)
+        else:
+            cut = hard_end
+
+        chunks.append(Chunk(len(chunks), start, cut))
+        start = max(cut - overlap_seconds, start + frame_seconds)
+
+
+def stitch_segments(per_chunk: Sequence[tuple[Chunk, list[dict]]]) -> list[dict]:
+    """
+    Merge chunk-local segments (already re-based to the original timeline).
+
+    Where two windows overlap, the midpoint of the shared audio is the owner
+    boundary: segments starting before it come from the earlier window, the
+    rest from the later one. Identical text repeated across the boundary is
+    dropped as well.
+    """
+    ordered = sorted(per_chunk, key=lambda item: item[0].index)
+    merged: list[dict] = []
+    for i, (chunk, segments) in enumerate(ordered):
+        lower = 0.0
+        upper = float("inf")
+        if i > 0:
+            prev = ordered[i - 1][0]
+            lower = (chunk.start + prev.end) / 2.0
+        if i + 1 < len(ordered):
+            nxt = ordered[i + 1][0]
+            upper = (nxt.start + chunk.end) / 2.0
+
+        for seg in segments:
+            if not (lower <= seg["start"] < upper):
+                continue
+            if merged and _is_overlap_duplicate(merged[-1], seg):
+                continue
+            merged.append(seg)
+    return merged
+
+
+def _is_overlap_duplicate(prev: dict, seg: dict, tolerance: float = OVERLAP_SECONDS) -> bool:
+    same_text = prev["text"].strip().lower() == seg["text"].strip().lower()
+    return same_text and abs(seg["start"] - prev["start"]) <= tolerance
+
+
+def slim_segment(seg: dict, offset: float = 0.0) -> dict:
+    """start/end/text (+ words when present), shifted by `offset` seconds."""
+    out = {
+        "start": round(seg["start"] + offset, 3),
+        "end": round(seg["end"] + offset, 3),
+        "text": seg["text"],
+    }
+    if seg.get("words"):
+        out["words"] = [
+            {"start": round(w["start"] + offset, 3), "end": round(w["end"] + offset, 3), "word": w["word"]}
+            for w in seg["words"]
+        ]
+    return out
+
+
+# ---- Process pool (one model per worker) ----
+_worker_model = None
+
+
+def _init_worker(model_name: str, threads: int) -> None:
+    global _worker_model
+    import torch
+    import whisper
+
+    torch.set_num_threads(threads)
+    _worker_model = whisper.load_model(model_name)
+
+
+def _transcribe_chunk(audio_path: str, chunk: Chunk, options: dict) -> tuple[Chunk, list[dict]]:
+    audio = read_window(audio_path, chunk.start, chunk.end)
+    result = _worker_model.transcribe(audio, **options)
+    # Keep only what downstream uses; token lists etc. stay in the worker.
+    segments = [slim_segment(s, offset=chunk.start) for s in result.get("segments", [])]
+    return chunk, segments
+
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def transcribe_chunked(audio_path: str, model_name: str = "base", workers: int | None = None,
+                       chunk_seconds: float = CHUNK_SECONDS, audio: np.ndarray | None = None,
+                       cpus: int | None = None, **options) -> dict:
+    """
+    Transcribe a 16 kHz mono audio file in parallel windows.
+
+    Pass `audio` if the samples are already loaded to skip re-reading them
+    for the silence search; workers always map their window from the file.
+    `cpus` caps the cores the pool uses (default: all of them).
+    Returns a Whisper-shaped result: {"text": ..., "segments": [...]}.
+    """
+    if audio is None:
+        audio = read_window(audio_path)
+    duration = len(audio) / SAMPLE_RATE
+    energy = frame_energy(audio)
+    chunks = plan_chunks(energy, duration, chunk_seconds=chunk_seconds)
+
+    cpus = cpus or os.cpu_count() or 1
+    workers = min(workers or default_workers(), len(chunks), cpus)
+    threads = max(1, cpus // workers)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_name, threads),
+    ) as pool:
+        futures = [pool.submit(_transcribe_chunk, audio_path, c, options) for c in chunks]
+        per_chunk = [f.result() for f in futures]
+
+    segments = stitch_segments(per_chunk)
+    text = "".join(s["text"] for s in segments).strip()
+    return {"text": text, "segments": segments}
@@ -0,0 +1,129 @@
+"""
+Speaker diarization in its own process, alongside transcription.
+
+pyannote and Whisper are both torch models that only read the decoded
+audio, so running them back to back wastes wall time. A `DiarizationWorker`
+keeps the pyannote pipeline warm in a single spawned process and diarizes
+the job's raw float32 audio file while the parent transcribes. Each side
+gets a fixed share of the cores (`split_cpus`), and torch is pinned to that
+share in both processes so they don't oversubscribe intra-op threads.
+"""
+
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Callable
+
+import numpy as np
+
+from pcm import SAMPLE_RATE, load_pcm_file
+
+DEFAULT_MODEL = "pyannote/speaker-diarization-community-1"
+DIARIZE_CPU_SHARE = float(os.getenv("POV_DIARIZE_CPU_SHARE", "0.5"))
+
+
+def split_cpus(diarize_share: float = DIARIZE_CPU_SHARE, total: int | None = None) -> tuple[int, int]:
+    """(diarize threads, transcribe threads); each side gets at least one core."""
+    total = total or os.cpu_count() or 1
+    share = min(max(diarize_share, 0.0), 1.0)
+    diarize = min(max(1, round(total * share)), max(1, total - 1))
+    return diarize, max(1, total - diarize)
+
+
+def pin_torch_threads(threads: int) -> None:
+    """Limit torch intra-op threads in this process (no-op without torch)."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def load_pyannote(model_id: str, token: str | None):
+    from pyannote.audio import Pipeline
+
+    # pyannote 3.x prefers token=...
+    return Pipeline.from_pretrained(model_id, token=token)
+
+
+def waveform_input(audio: np.ndarray) -> dict:
+    """pyannote's in-memory input: (channel, time) tensor plus sample rate."""
+    import torch
+
+    return {"waveform": torch.from_numpy(np.asarray(audio))[None, :], "sample_rate": SAMPLE_RATE}
+
+
+# ---- Worker process ----
+_pipeline = None
+_load_error: str | None = None
+
+
+def _init_worker(loader: Callable[[], Any], threads: int) -> None:
+    # A raising initializer breaks the pool for good and hides why; keep the
+    # error and report it from every task instead
+    global _pipeline, _load_error
+    pin_torch_threads(threads)
+    try:
+        _pipeline = loader()
+    except Exception as e:
+        _load_error = f"Failed to load pyannote pipeline: {type(e).__name__}: {e}"
+
+
+def _check_loaded() -> None:
+    if _pipeline is None:
+        raise RuntimeError(_load_error or "pyannote pipeline not loaded")
+
+
+def _ready() -> bool:
+    _check_loaded()
+    return True
+
+
+def _diarize(audio_path: str) -> tuple[Any, float]:
+    _check_loaded()
+    started = time.perf_counter()
+    audio = np.array(load_pcm_file(audio_path))
+    try:
+        inputs = waveform_input(audio)
+    except ImportError:
+        inputs = audio
+    return _pipeline(inputs), time.perf_counter() - started
+
+
+class DiarizationWorker:
+    """One warm diarization pipeline in a spawned process."""
+
+    def __init__(self, model_id: str = DEFAULT_MODEL, token: str | None = None, threads: int = 1,
+                 loader: Callable[[], Any] | None = None):
+        self.threads = threads
+        self._loader = loader or functools.partial(load_pyannote, model_id, token)
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:  # two jobs starting at once must not each spawn a pyannote process
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self._loader, self.threads),
+                )
+            return self._pool
+
+    def warm(self, timeout: float | None = None) -> None:
+        """Start the process and load the pipeline now; raises if loading fails."""
+        self._executor().submit(_ready).result(timeout)
+
+    def submit(self, audio_path: str) -> "Future[tuple[Any, float]]":
+        """Diarize a raw float32 PCM file; the future yields (annotation, seconds)."""
+        return self._executor().submit(_diarize, audio_path)
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,184 @@
+"""
+Streaming video ingest.
+
+Copies an upload to disk in fixed-size chunks and, in the same pass:
+- computes the SHA-256 used as the result-cache content hash
+- checks the container is ISO BMFF (mp4/mov) from the first box header and
+  rejects anything else before the copy goes further
+- enforces a byte limit, aborting the copy as soon as it is exceeded
+- parses `moov` as it streams past for duration, track types and codecs
+
+Peak memory is one chunk plus the `moov` box (capped), not the whole file.
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+INGEST_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024   # matches server.maxUploadSize
+MAX_MOOV_BYTES = 32 * 1024 * 1024
+
+# Top-level boxes a valid mp4/mov may start with.
+_LEADING_BOXES = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot"}
+_CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+class IngestError(ValueError):
+    """Raised when an upload is rejected (too large, not a video, truncated)."""
+
+
+@dataclass
+class ProbeInfo:
+    brand: str | None = None
+    duration: float | None = None
+    tracks: list[str] = field(default_factory=list)   # handler types: "vide", "soun"...
+    codecs: list[str] = field(default_factory=list)   # sample entry fourccs: "avc1", "mp4a"...
+
+    @property
+    def has_video(self) -> bool:
+        return "vide" in self.tracks
+
+
+@dataclass
+class IngestResult:
+    path: str
+    size: int
+    sha256: str
+    probe: ProbeInfo
+
+
+class Mp4Probe:
+    """Incremental top-level box walker; feed it chunks in file order."""
+
+    def __init__(self, max_moov_bytes: int = MAX_MOOV_BYTES):
+        self.info = ProbeInfo()
+        self.max_moov_bytes = max_moov_bytes
+        self._header = b""       # partial box header spanning chunks
+        self._remaining = 0      # body bytes left in the current box
+        self._box: bytes | None = None
+        self._body = bytearray() # buffered body of boxes we parse (ftyp, moov)
+        self._boxes_seen = 0
+        self.moov_parsed = False
+
+    def feed(self, data: bytes | memoryview) -> None:
+        view = memoryview(data)
+        while view:
+            if self._remaining == 0 and self._box is None:
+                view = self._read_header(view)
+                continue
+            take = min(len(view), self._remaining)
+            if self._box in (b"ftyp", b"moov") and len(self._body) + take <= self.max_moov_bytes:
+                self._body += view[:take]
+            self._remaining -= take
+            view = view[take:]
+            if self._remaining == 0:
+                self._finish_box()
+
+    def _read_header(self, view: memoryview) -> memoryview:
+        need = 8 if len(self._header) < 8 else 16
+        take = min(len(view), need - len(self._header))
+        self._header += bytes(view[:take])
+        view = view[take:]
+        if len(self._header) < 8:
+            return view
+
+        size, box = struct.unpack(">I4s", self._header[:8])
+        if self._boxes_seen == 0 and box not in _LEADING_BOXES:
+            raise IngestError("Not an MP4/MOV video (unrecognised container header).")
+        if size == 1:
+            if len(self._header) < 16:
+                return view
+            size = struct.unpack(">Q", self._header[8:16])[0]
+        header_len = len(self._header)
+        if size == 0:               # box runs to end of file
+            size = float("inf")
+        elif size < header_len:
+            raise IngestError(f"Corrupt MP4: box '{box.decode('latin-1')}' has size {size}.")
+
+        self._boxes_seen += 1
+        self._box = box
+        self._remaining = size - header_len
+        self._header = b""
+        self._body = bytearray()
+        if self._remaining == 0:
+            self._finish_box()
+        return view
+
+    def _finish_box(self) -> None:
+        body = bytes(self._body)
+        if self._box == b"ftyp" and len(body) >= 4:
+            self.info.brand = body[:4].decode("latin-1").strip()
+        elif self._box == b"moov" and body:
+            _parse_boxes(memoryview(body), self.info)
+            self.moov_parsed = True
+        self._box = None
+        self._body = bytearray()
+
+
+def _parse_boxes(view: memoryview, info: ProbeInfo) -> None:
+    pos = 0
+    while pos + 8 <= len(view):
+        size, box = struct.unpack(">I4s", view[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", view[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = len(view) - pos
+        if size < header:
+            return
+        body = view[pos + header:pos + size]
+        if box in _CONTAINER_BOXES:
+            _parse_boxes(body, info)
+        elif box == b"mvhd" and len(body) >= 20:
+            if body[0] == 1 and len(body) >= 32:
+                timescale, duration = struct.unpack(">IQ", body[20:32])
+            else:
+                timescale, duration = struct.unpack(">II", body[12:20])
+            if timescale:
+                info.duration = duration / timescale
+        elif box == b"hdlr" and len(body) >= 12:
+            info.tracks.append(bytes(body[8:12]).decode("latin-1"))
+        elif box == b"stsd" and len(body) >= 16:
+            # version/flags(4) entry_count(4) then entries: size(4) fourcc(4)...
+            info.codecs.append(bytes(body[12:16]).decode("latin-1").strip())
+        pos += size
+
+
+def ingest_stream(src: BinaryIO, dest_dir: str | None = None, suffix: str = ".mp4",
+                  max_bytes: int = MAX_UPLOAD_BYTES, declared_size: int | None = None,
+                  chunk_size: int = INGEST_CHUNK_BYTES) -> IngestResult:
+    """Copy `src` to a new temp file, hashing and probing on the way."""
+    if declared_size is not None and declared_size > max_bytes:
+        raise IngestError(f"Upload is {declared_size / 1e6:.0f} MB; limit is {max_bytes / 1e6:.0f} MB.")
+
+    digest = hashlib.sha256()
+    probe = Mp4Probe()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=dest_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = src.read(chunk_size)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_bytes:
+                    raise IngestError(f"Upload exceeds {max_bytes / 1e6:.0f} MB limit.")
+                probe.feed(block)
+                digest.update(block)
+                out.write(block)
+
+        if size == 0:
+            raise IngestError("Upload is empty.")
+        if probe.moov_parsed and not probe.info.has_video:
+            raise IngestError("File has no video track.")
+    except BaseException:
+        os.remove(path)
+        raise
+
+    return IngestResult(path=path, size=size, sha256=digest.hexdigest(), probe=probe.info)
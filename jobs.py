@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Background job subsystem for CinematicPOV Sync Engine.
+
+- JobQueue: persistent SQLite queue (submit -> job id, claim, complete, poll)
+- WorkerPool: worker processes that each keep a CastScriptEngine warm and
+  drain the queue, so work survives page refreshes / mobile disconnects
+
+Running jobs hold a lease (heartbeat + owner token); a job whose worker died
+is requeued, up to MAX_ATTEMPTS claims, and the pool replaces dead workers.
+
+Run workers standalone with `python jobs.py --workers 4`, or let the
+Streamlit app start a pool inside its server process (always spawned there).
+With `--start-method fork --preload base` the parent loads Whisper once and
+the workers share its weights copy-on-write (see lazy.prefork_warmup). Pool
+workers transcribe whole episodes in-process, never through the chunked
+path, so that shared copy is the one every episode uses.
+"""
+
+import json
+import multiprocessing as mp
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+DEFAULT_DB = os.getenv("POV_JOBS_DB", os.path.join(os.path.expanduser("~"), ".cache", "cinematicpov", "jobs.sqlite"))
+SPOOL_DIR = os.getenv("POV_JOBS_SPOOL", os.path.join(os.path.dirname(DEFAULT_DB), "spool"))
+POLL_SECONDS = 1.0
+# A running job's worker touches its heartbeat this often; a job whose heartbeat
+# is older than LEASE_SECONDS is requeued (works across hosts, unlike a pid check)
+HEARTBEAT_SECONDS = 15.0
+LEASE_SECONDS = float(os.getenv("POV_JOB_LEASE_SECONDS", "60"))
+# A job that has lost its worker this many times (e.g. it OOM-kills every worker
+# that takes it) is failed instead of requeued again
+MAX_ATTEMPTS = int(os.getenv("POV_JOB_MAX_ATTEMPTS", "3"))
+RESPAWN_SECONDS = 5.0      # how often a pool replaces workers that died
+START_METHOD = os.getenv("POV_WORKER_START_METHOD", "spawn")
+PRELOAD_MODELS = tuple(n.strip() for n in os.getenv("POV_WORKER_PRELOAD", "").split(",") if n.strip())
+WORKER_RAM_BYTES = {"tiny": 1 * 1024 ** 3, "base": 1536 * 1024 ** 2, "turbo": 6 * 1024 ** 3}
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str
+    payload: dict
+    result: Any = None
+    error: str | None = None
+    created: float = 0.0
+    started: float | None = None
+    finished: float | None = None
+    worker_pid: int | None = None
+    heartbeat: float | None = None
+    attempts: int = 0
+    owner: str | None = None   # lease token of the claim currently running it
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+
+class JobQueue:
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                       id TEXT PRIMARY KEY,
+                       kind TEXT NOT NULL,
+                       status TEXT NOT NULL,
+                       payload TEXT NOT NULL,
+                       result TEXT,
+                       error TEXT,
+                       created REAL NOT NULL,
+                       started REAL,
+                       finished REAL,
+                       worker_pid INTEGER,
+                       heartbeat REAL,
+                       attempts INTEGER NOT NULL DEFAULT 0,
+                       owner TEXT
+                   )"""
+            )
+            # Queues created by older versions lack the lease columns
+            columns = {row[1] for row in db.execute("PRAGMA table_info(jobs)")}
+            for name, decl in (("heartbeat", "REAL"), ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+                               ("owner", "TEXT")):
+                if name not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def submit(self, kind: str, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload), time.time()),
+            )
+        return job_id
+
+    def claim(self, worker_pid: int | None = None) -> Job | None:
+        """
+        Atomically move the oldest queued job to running and return it. The
+        job's `owner` token identifies this claim: only its holder can renew,
+        complete or fail the job, so a worker whose lease lapsed cannot
+        overwrite the run that replaced it.
+        """
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            now = time.time()
+            db.execute(
+                "UPDATE jobs SET status = ?, started = ?, heartbeat = ?, worker_pid = ?, owner = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, now, now, worker_pid or os.getpid(), uuid.uuid4().hex, row[0]),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+        return self.get(row[0])
+
+    @staticmethod
+    def _owned(sql: str, params: tuple, owner: str | None) -> tuple[str, tuple]:
+        """Restrict an UPDATE ... WHERE id = ? to the claim holding `owner`."""
+        if owner is None:
+            return sql, params
+        return sql + " AND owner = ?", params + (owner,)
+
+    def touch(self, job_id: str, owner: str | None = None) -> bool:
+        """Renew a running job's lease. False if the job is no longer ours."""
+        sql, params = self._owned("UPDATE jobs SET heartbeat = ? WHERE id = ? AND status = ?",
+                                  (time.time(), job_id, RUNNING), owner)
+        with self._connect() as db:
+            return db.execute(sql, params).rowcount > 0
+
+    @contextmanager
+    def heartbeat(self, job_id: str, interval: float = HEARTBEAT_SECONDS,
+                  owner: str | None = None) -> Iterator[None]:
+        """Keep touching `job_id` from a background thread while the block runs."""
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(interval):
+                try:
+                    self.touch(job_id, owner)
+                except sqlite3.Error:
+                    pass  # a busy database must not kill the job; the next beat retries
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{job_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def complete(self, job_id: str, result: Any, owner: str | None = None) -> bool:
+        """Record the result; with `owner`, only if that claim still holds the job."""
+        sql, params = self._owned("UPDATE jobs SET status = ?, result = ?, finished = ? WHERE id = ?",
+                                  (DONE, json.dumps(result), time.time(), job_id), owner)
+        with self._connect() as db:
+            return db.execute(sql, params).rowcount > 0
+
+    def fail(self, job_id: str, error: str, owner: str | None = None) -> bool:
+        sql, params = self._owned("UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                                  (FAILED, error, time.time(), job_id), owner)
+        with self._connect() as db:
+            return db.execute(sql, params).rowcount > 0
+
+    def get(self, job_id: str) -> Job | None:
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, kind, status, payload, result, error, created, started, finished, worker_pid, "
+                "heartbeat, attempts, owner FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(
+            id=row[0], kind=row[1], status=row[2], payload=json.loads(row[3]),
+            result=json.loads(row[4]) if row[4] is not None else None,
+            error=row[5], created=row[6], started=row[7], finished=row[8], worker_pid=row[9],
+            heartbeat=row[10], attempts=row[11], owner=row[12],
+        )
+
+    def requeue_orphans(self, lease_seconds: float = LEASE_SECONDS, now: float | None = None,
+                        max_attempts: int = MAX_ATTEMPTS) -> int:
+        """
+        Put 'running' jobs whose heartbeat lapsed back in the queue, or fail
+        them once they have used up `max_attempts` claims. Returns jobs requeued.
+        """
+        now = time.time() if now is None else now
+        lapsed = "status = ? AND COALESCE(heartbeat, started, 0) < ?"
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                f"UPDATE jobs SET status = ?, error = ?, finished = ?, owner = NULL "
+                f"WHERE {lapsed} AND attempts >= ?",
+                (FAILED, f"Lost its worker {max_attempts} times; not retrying", now,
+                 RUNNING, now - lease_seconds, max_attempts),
+            )
+            cur = db.execute(
+                f"UPDATE jobs SET status = ?, started = NULL, worker_pid = NULL, heartbeat = NULL, owner = NULL "
+                f"WHERE {lapsed}",
+                (QUEUED, RUNNING, now - lease_seconds),
+            )
+            db.execute("COMMIT")
+            return cur.rowcount
+
+    def counts(self) -> dict:
+        with self._connect() as db:
+            return dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+# ---- Job handlers ----
+# CastScriptEngine options for this worker process, set by worker_loop
+_engine_options: dict = {}
+
+
+def run_pov_job(payload: dict, engines: dict) -> dict:
+    """Transcribe an episode and rewrite it from one character's POV."""
+    from processor import CastScriptEngine
+    from result_cache import ResultCache
+
+    size = payload.get("whisper_model", "base")
+    if size not in engines:
+        engines[size] = CastScriptEngine(whisper_model=size, cache=ResultCache(), **_engine_options)
+    engine = engines[size]
+
+    video_path = payload["video_path"]
+    try:
+        result = engine.process_video_or_url(video_path)
+        transcript = result.as_transcript() or result.transcript_text
+        novel = engine.rewrite_pov(transcript, payload["pov"], payload.get("cast_info", ""))
+    finally:
+        if payload.get("delete_input") and os.path.exists(video_path):
+            os.remove(video_path)
+    return {"transcript": result.transcript_text, "novel": novel}
+
+
+HANDLERS: dict[str, Callable[[dict, dict], Any]] = {"pov": run_pov_job}
+
+
+def worker_loop(db_path: str, stop: Any = None, poll_seconds: float = POLL_SECONDS,
+                max_jobs: int | None = None, engine_options: dict | None = None,
+                threads: int | None = None) -> int:
+    """
+    Claim and run jobs until `stop` is set (or `max_jobs` ran). Returns jobs
+    handled. `engine_options` go to every CastScriptEngine this worker builds;
+    `threads` caps torch's intra-op threads in this (worker) process.
+    """
+    if threads:
+        from diarization import pin_torch_threads
+
+        pin_torch_threads(threads)
+    _engine_options.clear()
+    _engine_options.update(engine_options or {})
+    queue = JobQueue(db_path)
+    engines: dict = {}   # per-worker, reused across jobs
+    handled = 0
+    while stop is None or not stop.is_set():
+        job = queue.claim()
+        if job is None:
+            if max_jobs is not None:
+                break
+            queue.requeue_orphans()  # jobs of workers that died, here or on another host
+            time.sleep(poll_seconds)
+            continue
+        try:
+            handler = HANDLERS[job.kind]
+            with queue.heartbeat(job.id, owner=job.owner):
+                result = handler(job.payload, engines)
+            queue.complete(job.id, result, owner=job.owner)
+        except Exception as e:
+            queue.fail(job.id, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}", owner=job.owner)
+        handled += 1
+        if max_jobs is not None and handled >= max_jobs:
+            break
+    return handled
+
+
+def default_worker_count(whisper_model: str = "base") -> int:
+    """Size the pool to the host: one worker per core, capped by RAM per model."""
+    cores = os.cpu_count() or 1
+    try:
+        ram = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return max(1, cores // 2)
+    by_ram = ram // WORKER_RAM_BYTES.get(whisper_model, WORKER_RAM_BYTES["base"])
+    return int(max(1, min(cores, by_ram)))
+
+
+class WorkerPool:
+
+    def __init__(self, db_path: str = DEFAULT_DB, workers: int | None = None,
+                 start_method: str = START_METHOD, preload: tuple[str, ...] = PRELOAD_MODELS):
+        self.db_path = db_path
+        self.workers = workers or int(os.getenv("POV_JOB_WORKERS", "0")) or default_worker_count()
+        # Preloading only helps forked workers; spawned ones start from a fresh interpreter.
+        self.start_method = start_method
+        self.preload = tuple(preload) if start_method == "fork" else ()
+        # The pool is the parallelism: each worker transcribes whole episodes on
+        # its share of the cores, instead of spawning a chunk pool (and a Whisper
+        # per chunk process) of its own
+        self.engine_options = {"chunk_seconds": None}
+        self.threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._ctx = mp.get_context(start_method)
+        self._stop = self._ctx.Event()
+        self._procs = [self._worker(i) for i in range(self.workers)]
+        self._supervisor: threading.Thread | None = None
+
+    def _worker(self, i: int):
+        return self._ctx.Process(target=worker_loop, name=f"pov-worker-{i}", daemon=True,
+                                 args=(self.db_path, self._stop),
+                                 kwargs={"engine_options": self.engine_options, "threads": self.threads})
+
+    def start(self, respawn_seconds: float | None = RESPAWN_SECONDS) -> "WorkerPool":
+        JobQueue(self.db_path).requeue_orphans()
+        if self.preload:
+            from lazy import prefork_warmup
+
+            prefork_warmup(self.preload)
+        for proc in self._procs:
+            proc.start()
+        if respawn_seconds:
+            self._supervisor = threading.Thread(target=self._supervise, args=(respawn_seconds,),
+                                                name="pov-pool-supervisor", daemon=True)
+            self._supervisor.start()
+        return self
+
+    def _supervise(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.respawn()
+
+    def respawn(self) -> int:
+        """Replace workers that died (OOM kill, segfault in a native backend)."""
+        if self._stop.is_set():
+            return 0
+        replaced = 0
+        for i, proc in enumerate(self._procs):
+            if proc.exitcode is not None:
+                proc.close()
+                self._procs[i] = self._worker(i)
+                self._procs[i].start()
+                replaced += 1
+        return replaced
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        if self._supervisor is not None:
+            self._supervisor.join()
+        for proc in self._procs:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+
+    def alive(self) -> int:
+        return sum(p.is_alive() for p in self._procs)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run CinematicPOV background workers.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite job queue path")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: sized to host)")
+    parser.add_argument("--start-method", default=START_METHOD, choices=("spawn", "fork", "forkserver"))
+    parser.add_argument("--preload", action="append", default=list(PRELOAD_MODELS),
+                        help="Whisper model to load before forking workers (repeatable; fork only)")
+    args = parser.parse_args()
+
+    pool = WorkerPool(args.db, args.workers, start_method=args.start_method, preload=tuple(args.preload)).start()
+    print(f"🎬 {pool.workers} worker(s) polling {args.db}")
+    try:
+        while pool.alive():
+            time.sleep(5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Visual digest: a few keyframes instead of the whole video.
+
+Uploading a 200 MB episode to Gemini (and waiting for server-side
+processing) dominates wall time. For a POV rewrite the model mostly needs
+who is where and what they wear, which a handful of stills carries:
+
+- ffmpeg picks scene-change frames (plus one every `max_interval` seconds
+  so long static scenes are covered), downscaled to `width` px JPEGs
+- `select_keyframes` keeps at most `budget` of them, spread by where the
+  dialogue is: dense stretches of transcript get more frames
+- each frame is labelled with the `[12.5s]` stamp of the transcript line
+  it falls in, so the model can line stills up with dialogue
+- `VisualDigest.contents(start, end)` returns only the frames of one
+  rewrite part, ready to send inline with the prompt
+
+Fewer/smaller frames trade visual fidelity for a smaller, faster request.
+"""
+
+import os
+import re
+import subprocess
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+SCENE_THRESHOLD = 0.3      # ffmpeg scene score (0-1) that counts as a cut
+MAX_INTERVAL_SECONDS = 30.0
+FRAME_BUDGET = int(os.getenv("POV_KEYFRAME_BUDGET", "24"))
+FRAME_WIDTH = int(os.getenv("POV_KEYFRAME_WIDTH", "512"))
+JPEG_QUALITY = 5           # ffmpeg -q:v, 2 (best) .. 31
+MIME_TYPE = "image/jpeg"
+
+_PTS_TIME = re.compile(r"\bpts_time:\s*(-?[\d.]+)")
+
+
+class KeyframeError(RuntimeError):
+    """ffmpeg could not extract keyframes."""
+
+
+@dataclass
+class Keyframe:
+    time: float
+    data: bytes = field(repr=False)
+    label: str = ""     # transcript stamp, e.g. "[12.5s]"
+
+
+@dataclass
+class VisualDigest:
+    frames: list[Keyframe]
+    candidates: int = 0   # scene-change frames ffmpeg found before the budget
+    seconds: float = 0.0  # extraction + selection wall time
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(f.data) for f in self.frames)
+
+    def between(self, start: float | None = None, end: float | None = None) -> list[Keyframe]:
+        return [f for f in self.frames
+                if (start is None or f.time >= start) and (end is None or f.time < end)]
+
+    def contents(self, make_part: Callable[[bytes, str], Any],
+                 start: float | None = None, end: float | None = None) -> list:
+        """Label + image part for each frame in [start, end); make_part(data, mime_type)."""
+        out: list = []
+        for frame in self.between(start, end):
+            out.append(f"FRAME {frame.label or f'[{frame.time:.1f}s]'}")
+            out.append(make_part(frame.data, MIME_TYPE))
+        return out
+
+    def stats(self) -> dict:
+        return {"frames": len(self.frames), "candidates": self.candidates,
+                "bytes": self.nbytes, "seconds": round(self.seconds, 3)}
+
+
+def keyframes_command(input_path: str, out_pattern: str, threshold: float = SCENE_THRESHOLD,
+                      width: int = FRAME_WIDTH, max_interval: float = MAX_INTERVAL_SECONDS) -> list[str]:
+    select = (f"gt(scene\\,{threshold})"
+              f"+isnan(prev_selected_t)+gte(t-prev_selected_t\\,{max_interval})")
+    return [
+        "ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "info",
+        "-i", input_path,
+        "-an", "-sn",
+        "-vf", f"select='{select}',scale={width}:-2,showinfo",
+        "-vsync", "vfr",  # one file per selected frame, not a constant-rate stream
+        "-q:v", str(JPEG_QUALITY),
+        out_pattern,
+        "-y",
+    ]
+
+
+def parse_showinfo(stderr: str) -> list[float]:
+    """Frame times, in output order, from ffmpeg's showinfo log lines."""
+    return [float(m.group(1)) for line in stderr.splitlines()
+            if "Parsed_showinfo" in line and (m := _PTS_TIME.search(line))]
+
+
+def extract_candidates(input_path: str, out_dir: str, threshold: float = SCENE_THRESHOLD,
+                       width: int = FRAME_WIDTH, max_interval: float = MAX_INTERVAL_SECONDS) -> list[Keyframe]:
+    """Scene-change frames as in-memory JPEGs (the files are removed once read)."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    cmd = keyframes_command(input_path, str(out / "kf_%05d.jpg"), threshold, width, max_interval)
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise KeyframeError(f"ffmpeg failed ({proc.returncode}): {proc.stderr.strip()[-500:]}")
+    times = parse_showinfo(proc.stderr)
+    files = sorted(out.glob("kf_*.jpg"))
+    if len(times) != len(files):
+        # Pairing them anyway would stamp frames with their neighbours' times
+        raise KeyframeError(f"ffmpeg wrote {len(files)} frames but logged {len(times)} timestamps")
+    frames = []
+    for t, path in zip(times, files):
+        frames.append(Keyframe(time=t, data=path.read_bytes()))
+        path.unlink()
+    return frames
+
+
+def select_keyframes(candidates: Sequence[Keyframe], budget: int = FRAME_BUDGET,
+                     segment_starts: Sequence[float] | None = None) -> list[Keyframe]:
+    """
+    At most `budget` candidates. Targets are quantiles of the transcript's
+    segment starts (or even spacing without one); each takes the nearest
+    unused candidate.
+    """
+    if budget <= 0 or not candidates:
+        return []
+    if len(candidates) <= budget:
+        return list(candidates)
+    times = np.array([c.time for c in candidates])
+    if segment_starts is not None and len(segment_starts):
+        targets = np.quantile(np.asarray(segment_starts, dtype=np.float64), (np.arange(budget) + 0.5) / budget)
+    else:
+        targets = np.linspace(times[0], times[-1], budget)
+    chosen: set[int] = set()
+    for target in targets:
+        order = np.argsort(np.abs(times - target), kind="stable")
+        pick = next((int(i) for i in order if int(i) not in chosen), None)
+        if pick is not None:
+            chosen.add(pick)
+    return [candidates[i] for i in sorted(chosen)]
+
+
+def label_frames(frames: list[Keyframe], segment_starts: Sequence[float]) -> list[Keyframe]:
+    """
+    Copies of `frames`, each stamped with the `[t s]` of the transcript line it
+    falls in. Candidates may be shared (memoised across runs), so they are never
+    relabelled in place.
+    """
+    starts = np.asarray(segment_starts, dtype=np.float64)
+    if len(starts) == 0:
+        return list(frames)
+    idx = np.searchsorted(starts, [f.time for f in frames], side="right") - 1
+    return [replace(frame, label=f"[{float(starts[max(i, 0)])}s]") for frame, i in zip(frames, idx)]
+
+
+def build_digest(input_path: str, out_dir: str, segment_starts: Sequence[float] | None = None,
+                 budget: int = FRAME_BUDGET, candidates: list[Keyframe] | None = None,
+                 **options: Any) -> VisualDigest:
+    """Extract (unless `candidates` are given), select and label keyframes."""
+    started = time.perf_counter()
+    if candidates is None:
+        candidates = extract_candidates(input_path, out_dir, **options)
+    frames = select_keyframes(candidates, budget, segment_starts)
+    if segment_starts is not None:
+        frames = label_frames(frames, segment_starts)
+    return VisualDigest(frames=frames, candidates=len(candidates), seconds=time.perf_counter() - started)
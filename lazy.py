@@ -0,0 +1,111 @@
+"""
+Lazy imports for heavy optional backends.
+
+`LazyModule("google.genai")` stands in for the module until an attribute is
+first used, so importing App.py or processor.py does not pay for torch,
+pyannote or the Gemini SDKs up front:
+
+- `installed()` checks the package is present without importing it
+- `available()` imports it (once) and reports whether that worked; the
+  failure is kept in `error` for a readable message
+- attribute access imports it and raises the original ImportError if it
+  cannot be loaded
+
+`prefork_warmup()` does the opposite for worker pools started with fork:
+it imports the backends and loads models in the parent, so the children
+share the read-only weights through copy-on-write instead of each loading
+their own copy.
+"""
+
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Any
+
+HEAVY_MODULES = ("torch", "whisper", "pyannote.audio", "google.genai", "google.generativeai")
+
+
+class LazyModule:
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: ModuleType | None = None
+        self._error: BaseException | None = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is not None:
+            return self._module
+        with self._lock:
+            if self._module is None and self._error is None:
+                try:
+                    self._module = importlib.import_module(self._name)
+                except Exception as e:  # not just ImportError: broken installs raise all sorts
+                    self._error = e
+            if self._module is None:
+                raise ImportError(f"{self._name} is not available: {self._error}") from self._error
+            return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def installed(self) -> bool:
+        """Package present on the path (nothing is imported)."""
+        if self._module is not None or self._name in sys.modules:
+            return True
+        try:
+            return importlib.util.find_spec(self._name) is not None
+        except (ImportError, ValueError):
+            return False
+
+    def available(self) -> bool:
+        """Importable; imports it on first call."""
+        try:
+            self._load()
+        except ImportError:
+            return False
+        return True
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    @property
+    def error(self) -> BaseException | None:
+        return self._error
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "failed" if self._error is not None else "pending"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def heavy_modules_loaded() -> list[str]:
+    """Which of HEAVY_MODULES this process has imported so far."""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def prefork_warmup(whisper_models: tuple[str, ...] = (), modules: tuple[str, ...] = ("whisper",)) -> dict:
+    """
+    Import `modules` and pin `whisper_models` in the default registry before
+    forking workers. Returns seconds spent per step.
+    """
+    from model_registry import default_registry
+
+    timings = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            continue  # optional backend missing; children will report it on use
+        timings[name] = round(time.perf_counter() - started, 3)
+    if whisper_models:
+        started = time.perf_counter()
+        default_registry().keep_warm(*whisper_models)
+        timings["models"] = round(time.perf_counter() - started, 3)
+    return timings
@@ -0,0 +1,278 @@
+"""
+Shared gateway for LLM calls.
+
+Every generate call goes through one process-wide `LLMGateway`, which
+applies, per call:
+
+- a token bucket per model (requests per minute, with a small burst)
+- a bound on calls in flight across all models
+- retries on 429 / 5xx with jittered exponential backoff (honouring
+  Retry-After when the error carries one)
+- latency and prompt/output token accounting, in `stats()` and in the
+  tracing metrics store
+
+The gateway wraps whatever client does the call (google-genai or
+google-generativeai), so several users share one quota instead of colliding
+on it. Connection reuse is left to those SDK clients, which App.py and
+CastScriptEngine create once per process.
+"""
+
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+from remote_wait import backoff_delays
+from tracing import METRICS, MetricsStore
+
+DEFAULT_RPM = float(os.getenv("POV_LLM_RPM", "60"))
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("POV_LLM_MAX_IN_FLIGHT", "8"))
+DEFAULT_RETRIES = int(os.getenv("POV_LLM_RETRIES", "4"))
+RETRY_INITIAL_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+TOKEN_BUCKETS = (100, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000, 256000, 1000000)
+
+METRICS.register("pov_llm_seconds", "Wall time per LLM call (including retries).")
+METRICS.register("pov_llm_tokens", "Prompt/output tokens per LLM call.", TOKEN_BUCKETS)
+
+
+# ---- Error classification ----
+def status_of(exc: BaseException) -> int | None:
+    """HTTP status carried by an SDK or HTTP error, if any."""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return int(value)
+    response = getattr(exc, "response", None)
+    value = getattr(response, "status_code", None) or getattr(response, "status", None)
+    return int(value) if isinstance(value, int) else None
+
+
+def retry_after_of(exc: BaseException) -> float | None:
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None  # HTTP-date form: fall back to backoff
+
+
+def is_retryable(exc: BaseException) -> bool:
+    return status_of(exc) in RETRYABLE_STATUS
+
+
+def handled_by_gateway(exc: BaseException) -> bool:
+    """The gateway already retried this error, or decided it is not worth retrying."""
+    return getattr(exc, "llm_gateway_handled", False)
+
+
+def usage_of(response: Any) -> tuple[int, int]:
+    """(prompt tokens, output tokens) from an SDK response or a REST JSON body."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None and isinstance(response, dict):
+        usage = response.get("usageMetadata")
+    if usage is None:
+        return 0, 0
+    if isinstance(usage, dict):
+        return int(usage.get("promptTokenCount") or 0), int(usage.get("candidatesTokenCount") or 0)
+    return int(getattr(usage, "prompt_token_count", 0) or 0), int(getattr(usage, "candidates_token_count", 0) or 0)
+
+
+# ---- Rate limiting ----
+class TokenBucket:
+    """`rate` tokens per second, up to `capacity` saved for bursts."""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Any] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block until `tokens` are available; returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Tolerate float drift, or a sub-ulp wait would never advance the clock.
+                if self.tokens >= tokens - 1e-9:
+                    self.tokens = max(0.0, self.tokens - tokens)
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            self.sleep(wait)
+            waited += wait
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    throttled_seconds: float = 0.0
+    latency_seconds: float = 0.0
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+
+class LLMGateway:
+
+    def __init__(self, rpm: float | dict[str, float] = DEFAULT_RPM, burst: float | None = None,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, retries: int = DEFAULT_RETRIES,
+                 initial_delay: float = RETRY_INITIAL_DELAY, max_delay: float = RETRY_MAX_DELAY,
+                 store: MetricsStore = METRICS, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], Any] = time.sleep, rng: random.Random | None = None):
+        # rpm: one limit for every model, or {model: rpm} with "*" as the fallback
+        self.rpm = rpm if isinstance(rpm, dict) else {"*": rpm}
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.store = store
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._buckets: dict[str, TokenBucket] = {}
+        self._stats: dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, model: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(model)
+            if bucket is None:
+                rpm = self.rpm.get(model, self.rpm.get("*", DEFAULT_RPM))
+                burst = self.burst if self.burst is not None else max(1.0, rpm / 10)
+                bucket = self._buckets[model] = TokenBucket(rpm / 60.0, burst, self.clock, self.sleep)
+            return bucket
+
+    def _model_stats(self, model: str) -> ModelStats:
+        with self._lock:
+            return self._stats.setdefault(model, ModelStats())
+
+    def _record(self, model: str, started: float, response: Any = None, error: bool = False) -> None:
+        seconds = self.clock() - started
+        prompt, output = usage_of(response) if response is not None else (0, 0)
+        stats = self._model_stats(model)
+        with self._lock:
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.latency_seconds += seconds
+            stats.prompt_tokens += prompt
+            stats.output_tokens += output
+        self.store.observe("pov_llm_seconds", seconds, model=model, status="error" if error else "ok")
+        if prompt or output:
+            self.store.observe("pov_llm_tokens", prompt, model=model, kind="prompt")
+            self.store.observe("pov_llm_tokens", output, model=model, kind="output")
+
+    def _admit(self, model: str) -> None:
+        waited = self.bucket(model).acquire()
+        if waited:
+            stats = self._model_stats(model)
+            with self._lock:
+                stats.throttled_seconds += waited
+
+    def _backoff(self, model: str, exc: BaseException, attempt: int, delays: Iterator[float]) -> None:
+        if not is_retryable(exc) or attempt >= self.retries:
+            exc.llm_gateway_handled = True  # callers must not retry it on top
+            raise exc
+        stats = self._model_stats(model)
+        with self._lock:
+            stats.retries += 1
+        delay = retry_after_of(exc)
+        self.sleep(delay if delay is not None else next(delays))
+
+    def call(self, model: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """fn(*args, **kwargs) under the model's rate limit, the in-flight bound and retries."""
+        delays = backoff_delays(self.initial_delay, self.max_delay, rng=self.rng)
+        attempt = 0
+        while True:
+            self._admit(model)
+            with self._slots:
+                started = self.clock()
+                try:
+                    response = fn(*args, **kwargs)
+                except Exception as e:
+                    self._record(model, started, error=True)
+                    error = e
+                else:
+                    self._record(model, started, response)
+                    return response
+            # Back off outside the slot so waiting doesn't block other calls.
+            self._backoff(model, error, attempt, delays)
+            attempt += 1
+
+    def stream(self, model: str, fn: Callable[..., Any], *args, **kwargs) -> Iterator[Any]:
+        """
+        Iterate a streaming call. Failures before the first chunk are
+        retried like `call`; the in-flight slot is held until the stream
+        ends or the caller stops iterating.
+        """
+        delays = backoff_delays(self.initial_delay, self.max_delay, rng=self.rng)
+        attempt = 0
+        while True:
+            self._admit(model)
+            self._slots.acquire()
+            started = self.clock()
+            try:
+                chunks = iter(fn(*args, **kwargs))
+                first = next(chunks, None)
+            except Exception as e:
+                self._slots.release()
+                self._record(model, started, error=True)
+                self._backoff(model, e, attempt, delays)
+                attempt += 1
+                continue
+            break
+
+        last, failed = first, False
+        try:
+            if first is not None:
+                yield first
+                for last in chunks:
+                    yield last
+        except Exception:
+            failed = True
+            raise
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()  # stop the underlying stream (and its billing) too
+            self._slots.release()
+            # Usage is reported on the final chunk.
+            self._record(model, started, None if failed else last, error=failed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                model: {
+                    **vars(s),
+                    "mean_latency_seconds": round(s.latency_seconds / s.calls, 3) if s.calls else None,
+                }
+                for model, s in self._stats.items()
+            }
+
+
+_default: LLMGateway | None = None
+_default_lock = threading.Lock()
+
+
+def default_gateway() -> LLMGateway:
+    """Process-wide gateway configured from POV_LLM_* environment variables."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = LLMGateway()
+        return _default
+
@@ -0,0 +1,214 @@
+"""
+Shared Whisper model registry.
+
+One registry per process keeps loaded models warm and shares them between
+jobs. Policies:
+- pinned models ("keep warm") are never unloaded
+- models unused for `idle_timeout` seconds are unloaded by a reaper thread
+- at most `max_models` models / `max_bytes` of weights stay resident; the
+  least recently used idle model is dropped first
+
+Use `lease(name)` so a model cannot be unloaded while a job is using it.
+A lease is also exclusive: Whisper's decoder hangs its kv-cache on hooks of
+the shared module, so two concurrent `transcribe` calls on one instance
+corrupt each other. Jobs wanting the same size take turns.
+"""
+
+import gc
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+WHISPER_SIZES = ("tiny", "base", "turbo")
+
+
+def _load_whisper(name: str):
+    import whisper
+
+    return whisper.load_model(name)
+
+
+def model_nbytes(model: Any) -> int:
+    """Bytes held by a torch module's parameters and buffers (0 if unknown)."""
+    total = 0
+    for attr in ("parameters", "buffers"):
+        tensors = getattr(model, attr, None)
+        if tensors is None:
+            continue
+        total += sum(t.numel() * t.element_size() for t in tensors())
+    return total
+
+
+@dataclass
+class _Entry:
+    model: Any
+    nbytes: int
+    load_seconds: float
+    last_used: float
+    leases: int = 0     # holders + waiters; either keeps the model resident
+    in_use: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ModelRegistry:
+
+    def __init__(self, loader: Callable[[str], Any] = _load_whisper,
+                 idle_timeout: float | None = None, max_models: int | None = None,
+                 max_bytes: int | None = None):
+        self.loader = loader
+        self.idle_timeout = idle_timeout
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.loads = 0
+        self.unloads = 0
+        self._entries: dict[str, _Entry] = {}
+        self._pinned: set[str] = set()
+        self._lock = threading.RLock()
+        self._load_locks: dict[str, threading.Lock] = {}
+        self._reaper: threading.Thread | None = None
+        if idle_timeout:
+            self._reaper = threading.Thread(target=self._reap_forever, name="model-reaper", daemon=True)
+            self._reaper.start()
+
+    # ---- Access ----
+    def get(self, name: str) -> Any:
+        """Return a resident model, loading it on first use."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry.last_used = time.monotonic()
+                return entry.model
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # Load outside the registry lock so other models stay available.
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    entry.last_used = time.monotonic()
+                    return entry.model
+            started = time.perf_counter()
+            model = self.loader(name)
+            load_seconds = time.perf_counter() - started
+            with self._lock:
+                self._entries[name] = _Entry(model, model_nbytes(model), load_seconds, time.monotonic())
+                self.loads += 1
+                self._enforce_budget(keep=name)
+            return model
+
+    @contextmanager
+    def lease(self, name: str) -> Iterator[Any]:
+        """
+        Exclusive use of a model for the duration of a job; it will not be
+        evicted meanwhile. Other leases of the same model wait their turn.
+        """
+        while True:
+            model = self.get(name)
+            with self._lock:
+                entry = self._entries.get(name)
+                # Re-check: it may have been evicted between get() and here.
+                if entry is not None and entry.model is model:
+                    entry.leases += 1
+                    break
+        try:
+            with entry.in_use:
+                yield model
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+
+    def keep_warm(self, *names: str) -> None:
+        """Load and pin models so they are never unloaded."""
+        for name in names:
+            self.get(name)
+            with self._lock:
+                self._pinned.add(name)
+
+    # ---- Unloading ----
+    def unload(self, name: str) -> bool:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.leases > 0 or name in self._pinned:
+                return False
+            del self._entries[name]
+            self.unloads += 1
+        del entry
+        gc.collect()
+        return True
+
+    def unload_idle(self, now: float | None = None) -> list[str]:
+        if not self.idle_timeout:
+            return []
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            idle = [n for n, e in self._entries.items() if now - e.last_used >= self.idle_timeout]
+        return [n for n in idle if self.unload(n)]
+
+    def _enforce_budget(self, keep: str) -> None:
+        def over_budget() -> bool:
+            too_many = self.max_models is not None and len(self._entries) > self.max_models
+            too_big = self.max_bytes is not None and self.resident_bytes() > self.max_bytes
+            return too_many or too_big
+
+        by_age = sorted(self._entries, key=lambda n: self._entries[n].last_used)
+        for name in by_age:
+            if not over_budget():
+                break
+            if name != keep:
+                self.unload(name)
+
+    def _reap_forever(self) -> None:
+        interval = max(min(self.idle_timeout / 2, 30.0), 0.05)
+        while True:
+            time.sleep(interval)
+            self.unload_idle()
+
+    # ---- Introspection ----
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(e.nbytes for e in self._entries.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "resident_bytes": self.resident_bytes(),
+                "loads": self.loads,
+                "unloads": self.unloads,
+                "models": {
+                    name: {
+                        "load_seconds": round(e.load_seconds, 3),
+                        "bytes": e.nbytes,
+                        "idle_seconds": round(now - e.last_used, 1),
+                        "leases": e.leases,
+                        "pinned": name in self._pinned,
+                    }
+                    for name, e in self._entries.items()
+                },
+            }
+
+
+_default: ModelRegistry | None = None
+_default_lock = threading.Lock()
+
+
+def default_registry() -> ModelRegistry:
+    """Process-wide registry configured from POV_WHISPER_* environment variables."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            idle = os.getenv("POV_WHISPER_IDLE_SECONDS")
+            max_models = os.getenv("POV_WHISPER_MAX_MODELS", "2")
+            max_bytes = os.getenv("POV_WHISPER_MAX_BYTES")
+            _default = ModelRegistry(
+                idle_timeout=float(idle) if idle else None,
+                max_models=int(max_models) if max_models else None,
+                max_bytes=int(max_bytes) if max_bytes else None,
+            )
+            warm = os.getenv("POV_WHISPER_KEEP_WARM")
+            if warm:
+                _default.keep_warm(*[n.strip() for n in warm.split(",") if n.strip()])
+        return _default
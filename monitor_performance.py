@@ -2,18 +2,45 @@
 """
 Performance Monitoring Script for CinematicPOV Sync Engine
 Monitors app performance metrics and health
+
+One-shot report:   python monitor_performance.py
+Continuous daemon: python monitor_performance.py --daemon --interval 5 --attach-streamlit
 """
 
+import os
 import psutil
 import time
 import json
+import urllib.request
+from collections import deque
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Iterable, List, Optional
+
+from tracing import MetricsStore
+
+
+def default_metrics_url() -> Optional[str]:
+    """The app's metrics endpoint when it exports one (POV_METRICS_PORT)"""
+    port = os.environ.get("POV_METRICS_PORT")
+    return f"http://127.0.0.1:{port}" if port else None
+
 
 class PerformanceMonitor:
-    """Monitor application performance metrics"""
+    """Monitor application performance metrics
+    
+    Pipeline metrics live in the app's process, so they are read from its
+    /metrics.json endpoint (`metrics_url`); `store` is for running the
+    monitor inside that process. With neither, the pipeline section is empty.
+    """
     
-    def __init__(self):
+    def __init__(self, store: Optional[MetricsStore] = None, metrics_url: Optional[str] = None,
+                 timeout: float = 2.0):
+        self.store = store
+        self.metrics_url = metrics_url.rstrip('/') if metrics_url else None
+        self.timeout = timeout
+        # Prime the CPU counter so later reads diff against it instead of
+        # blocking for a sampling interval.
+        psutil.cpu_percent(interval=None)
         self.metrics = {
             'timestamp': None,
             'cpu_percent': 0,
@@ -21,6 +48,7 @@ class PerformanceMonitor:
             'memory_percent': 0,
             'disk_usage_percent': 0,
             'network_io': {},
+            'pipeline': {},
             'health_status': 'unknown'
         }
     
@@ -30,7 +58,7 @@ class PerformanceMonitor:
         process = psutil.Process(os.getpid())
         
         self.metrics['timestamp'] = datetime.now().isoformat()
-        self.metrics['cpu_percent'] = psutil.cpu_percent(interval=1)
+        self.metrics['cpu_percent'] = psutil.cpu_percent(interval=None)
         self.metrics['memory_mb'] = process.memory_info().rss / 1024 / 1024
         self.metrics['memory_percent'] = process.memory_percent()
         
@@ -43,9 +71,32 @@ class PerformanceMonitor:
             'bytes_sent': net_io.bytes_sent,
             'bytes_recv': net_io.bytes_recv
         }
+
+        # Per-stage latency / per-job RSS recorded by tracing spans
+        self.metrics['pipeline'] = self.collect_pipeline_metrics()
         
         return self.metrics
     
+    def _fetch(self, path: str) -> Optional[str]:
+        try:
+            with urllib.request.urlopen(self.metrics_url + path, timeout=self.timeout) as resp:
+                return resp.read().decode()
+        except OSError:
+            return None
+    
+    def collect_pipeline_metrics(self) -> Dict:
+        """The app's tracing metrics; empty when its endpoint is unreachable"""
+        if self.store is not None:
+            return self.store.to_json()
+        if self.metrics_url:
+            body = self._fetch('/metrics.json')
+            if body is not None:
+                try:
+                    return json.loads(body)
+                except ValueError:
+                    pass
+        return {}
+    
     def check_health(self) -> str:
         """Check overall health status"""
         issues = []
@@ -92,6 +143,14 @@ class PerformanceMonitor:
 🏥 Health Status: {health.upper()}
 """
         
+        stages = self.metrics['pipeline'].get('pov_stage_seconds', [])
+        if stages:
+            report += "\n⏱️  Pipeline Stages (p50 / p95 s, n):\n"
+            for series in sorted(stages, key=lambda x: -x['sum']):
+                labels = series['labels']
+                report += (f"   • {labels.get('stage', '?'):<12} {series['p50']:.2f} / "
+                           f"{series['p95']:.2f}  n={series['count']} ({labels.get('status', 'ok')})\n")
+
         if self.metrics.get('issues'):
             report += "\n⚠️  Issues Detected:\n"
             for issue in self.metrics['issues']:
@@ -101,15 +160,218 @@ class PerformanceMonitor:
         
         return report
     
+    def prometheus(self) -> str:
+        """System gauges plus pipeline histograms in Prometheus text format"""
+        gauges = {
+            'pov_cpu_percent': self.metrics['cpu_percent'],
+            'pov_process_memory_bytes': self.metrics['memory_mb'] * 1024 * 1024,
+            'pov_disk_usage_percent': self.metrics['disk_usage_percent'],
+        }
+        lines = []
+        for name, value in gauges.items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        pipeline = ''
+        if self.store is not None:
+            pipeline = self.store.to_prometheus()
+        elif self.metrics_url:
+            pipeline = self._fetch('/metrics') or ''
+        return "\n".join(lines) + "\n" + pipeline
+    
     def save_metrics(self, filepath: str = 'performance_metrics.json'):
         """Save metrics to JSON file"""
         with open(filepath, 'w') as f:
             json.dump(self.metrics, f, indent=2)
 
 
+class NdjsonRing:
+    """Append-only NDJSON sample log, rotated at max_bytes (path, path.1, ... path.N)"""
+    
+    def __init__(self, path: str, max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+    
+    def append(self, record: Dict):
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size and size + len(line) > self.max_bytes:
+            self._rotate()
+        with open(self.path, 'a') as f:
+            f.write(line)
+    
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+    
+    def read(self) -> List[Dict]:
+        """All retained samples, oldest first"""
+        files = [f"{self.path}.{i}" for i in range(self.backups, 0, -1)] + [self.path]
+        records = []
+        for name in files:
+            if os.path.exists(name):
+                with open(name) as f:
+                    records.extend(json.loads(line) for line in f if line.strip())
+        return records
+
+
+class ProcessSampler:
+    """Non-blocking CPU/RSS sampling: diffs CPU times between calls instead of sleeping"""
+    
+    def __init__(self, pids: Iterable[int] = ()):
+        self._procs: Dict[int, psutil.Process] = {}
+        self._last_cpu: Dict[int, float] = {}
+        self._last_wall = time.monotonic()
+        self._last_system = psutil.cpu_times()
+        for pid in pids:
+            self.attach(pid)
+    
+    def attach(self, pid: int):
+        if pid in self._procs:
+            return
+        try:
+            proc = psutil.Process(pid)
+            times = proc.cpu_times()
+        except psutil.Error:
+            return
+        self._procs[pid] = proc
+        self._last_cpu[pid] = times.user + times.system
+    
+    def sample(self) -> Dict:
+        now = time.monotonic()
+        elapsed = max(now - self._last_wall, 1e-6)
+        self._last_wall = now
+        
+        system = psutil.cpu_times()
+        def busy(t):
+            return sum(t) - t.idle - getattr(t, 'iowait', 0)
+
+        total_delta = sum(system) - sum(self._last_system)
+        busy_delta = busy(system) - busy(self._last_system)
+        self._last_system = system
+        
+        procs = {}
+        for pid, proc in list(self._procs.items()):
+            try:
+                times = proc.cpu_times()
+                rss = proc.memory_info().rss
+            except psutil.Error:
+                del self._procs[pid]
+                self._last_cpu.pop(pid, None)
+                continue
+            cpu = times.user + times.system
+            procs[str(pid)] = [round(100 * (cpu - self._last_cpu[pid]) / elapsed, 1),
+                               round(rss / 1024 / 1024, 1)]
+            self._last_cpu[pid] = cpu
+        
+        return {
+            't': round(time.time(), 3),
+            'cpu': round(100 * busy_delta / total_delta, 1) if total_delta > 0 else 0.0,
+            'mem': psutil.virtual_memory().percent,
+            'disk': psutil.disk_usage('/').percent,
+            'procs': procs,
+        }
+
+
+def find_streamlit_pids() -> List[int]:
+    """PIDs of running Streamlit servers and their children (job workers, ffmpeg)"""
+    pids = []
+    for proc in psutil.process_iter(['pid', 'cmdline']):
+        cmdline = ' '.join(proc.info.get('cmdline') or [])
+        if 'streamlit' in cmdline and proc.info['pid'] != os.getpid():
+            pids.append(proc.info['pid'])
+            try:
+                pids.extend(child.pid for child in proc.children(recursive=True))
+            except psutil.Error:
+                pass
+    return sorted(set(pids))
+
+
+class WindowedHealth:
+    """Health over a sliding time window: sustained load warns, single spikes don't"""
+    
+    def __init__(self, window_seconds: float = 300, cpu: float = 80, memory: float = 80, disk: float = 90):
+        self.window_seconds = window_seconds
+        self.limits = {'cpu': cpu, 'mem': memory, 'disk': disk}
+        self.samples = deque()
+    
+    def add(self, sample: Dict) -> Dict:
+        self.samples.append(sample)
+        while self.samples and sample['t'] - self.samples[0]['t'] > self.window_seconds:
+            self.samples.popleft()
+        return self.evaluate()
+    
+    def evaluate(self) -> Dict:
+        if not self.samples:
+            return {'status': 'unknown', 'issues': []}
+        means = {key: sum(s[key] for s in self.samples) / len(self.samples) for key in self.limits}
+        labels = {'cpu': 'High CPU usage', 'mem': 'High memory usage', 'disk': 'Low disk space'}
+        issues = [f"{labels[k]} ({means[k]:.0f}% avg over {len(self.samples)} samples)"
+                  for k, limit in self.limits.items() if means[k] > limit]
+        return {'status': 'warning' if issues else 'healthy', 'issues': issues}
+
+
+def run_daemon(out_path: str = 'performance_samples.ndjson', interval: float = 5.0,
+               pids: Iterable[int] = (), attach_streamlit: bool = False,
+               window_seconds: float = 300, max_bytes: int = 5 * 1024 * 1024,
+               backups: int = 3, max_samples: Optional[int] = None) -> WindowedHealth:
+    """Sample every `interval` seconds into a rotating NDJSON ring until interrupted"""
+    ring = NdjsonRing(out_path, max_bytes=max_bytes, backups=backups)
+    sampler = ProcessSampler([os.getpid(), *pids])
+    health = WindowedHealth(window_seconds)
+    next_tick = time.monotonic()
+    taken = 0
+    try:
+        while max_samples is None or taken < max_samples:
+            if attach_streamlit:
+                for pid in find_streamlit_pids():
+                    sampler.attach(pid)
+            sample = sampler.sample()
+            verdict = health.add(sample)
+            sample['health'] = verdict['status']
+            ring.append(sample)
+            taken += 1
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    return health
+
+
 def main():
     """Main monitoring function"""
-    monitor = PerformanceMonitor()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="CinematicPOV performance monitor")
+    parser.add_argument('--daemon', action='store_true', help='sample continuously into a rotating NDJSON file')
+    parser.add_argument('--interval', type=float, default=5.0, help='seconds between samples')
+    parser.add_argument('--out', default='performance_samples.ndjson', help='NDJSON ring file')
+    parser.add_argument('--max-bytes', type=int, default=5 * 1024 * 1024, help='rotate the ring at this size')
+    parser.add_argument('--window', type=float, default=300, help='health window in seconds')
+    parser.add_argument('--pid', type=int, action='append', default=[], help='extra PID to track')
+    parser.add_argument('--attach-streamlit', action='store_true', help='track Streamlit server PIDs')
+    parser.add_argument('--metrics-url', default=default_metrics_url(),
+                        help="app metrics endpoint for pipeline stages (default: POV_METRICS_PORT on localhost)")
+    parser.add_argument('--sample-seconds', type=float, default=1.0, help='CPU window for the one-shot report')
+    args = parser.parse_args()
+    
+    if args.daemon:
+        print(f"📈 Sampling every {args.interval}s into {args.out} (Ctrl+C to stop)")
+        health = run_daemon(args.out, args.interval, args.pid, args.attach_streamlit,
+                            args.window, args.max_bytes)
+        return 0 if health.evaluate()['status'] != 'warning' else 1
+    
+    monitor = PerformanceMonitor(metrics_url=args.metrics_url)
+    time.sleep(args.sample_seconds)  # CPU % is diffed since the monitor was created
     
     print(monitor.generate_report())
     
@@ -0,0 +1,119 @@
+"""
+In-memory PCM extraction.
+
+ffmpeg decodes straight to 16 kHz mono float32 on stdout and we read it into
+a NumPy buffer, which Whisper's `transcribe` accepts as-is. That skips the
+intermediate audio file (and App.py's lossy MP3 encode) plus the second
+decode Whisper would otherwise run on it.
+
+Long inputs spill to a raw float32 file (ideally in a tmpfs-backed job
+workspace) and come back as a copy-on-write memory map, so RAM is not
+pinned by the whole episode and chunk workers can map the same file.
+"""
+
+import os
+import subprocess
+
+import numpy as np
+
+from result_cache import ResultCache, cache_key
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 4                 # float32
+PIPE_CHUNK_BYTES = 1024 * 1024
+SPILL_AFTER_SECONDS = 10 * 60        # keep up to 10 minutes in RAM
+
+
+def ffmpeg_pcm_command(input_path: str, sample_rate: int = SAMPLE_RATE) -> list[str]:
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin",
+        "-i", input_path,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "-f", "f32le",
+        "pipe:1",
+    ]
+
+
+def load_pcm_file(path: str, start: float = 0.0, end: float | None = None,
+                  sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Memory-map [start, end) of a raw float32 file (copy-on-write, so torch can wrap it)."""
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=np.float32)  # mmap refuses empty files
+    audio = np.memmap(path, dtype="<f4", mode="c")
+    first = int(start * sample_rate)
+    last = None if end is None else int(end * sample_rate)
+    return audio[first:last]
+
+
+def decode_pcm(input_path: str, spill_path: str | None = None,
+               spill_after_seconds: float = SPILL_AFTER_SECONDS,
+               sample_rate: int = SAMPLE_RATE,
+               chunk_bytes: int = PIPE_CHUNK_BYTES) -> np.ndarray:
+    """
+    Decode any ffmpeg-readable input to mono float32 PCM.
+
+    Returns an in-memory array, or a memory map of `spill_path` once the
+    decoded audio grows past `spill_after_seconds` (0 = always spill).
+    """
+    cmd = ffmpeg_pcm_command(input_path, sample_rate)
+    spill_bytes = int(spill_after_seconds * sample_rate * BYTES_PER_SAMPLE)
+    buf = bytearray()
+    out = None
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            block = proc.stdout.read(chunk_bytes)
+            if not block:
+                break
+            if out is not None:
+                out.write(block)
+                continue
+            buf += block
+            if spill_path is not None and len(buf) >= spill_bytes:
+                out = open(spill_path, "wb")
+                out.write(buf)
+                buf = bytearray()
+        stderr = proc.stderr.read()
+        returncode = proc.wait()
+    finally:
+        if out is not None:
+            out.close()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+    if out is not None:
+        return load_pcm_file(spill_path, sample_rate=sample_rate)
+    if spill_path is not None and spill_after_seconds <= 0:
+        # Nothing was decoded, but callers asked for a file.
+        open(spill_path, "wb").close()
+        return np.zeros(0, dtype=np.float32)
+    usable = len(buf) // BYTES_PER_SAMPLE
+    return np.frombuffer(buf, dtype="<f4", count=usable)
+
+
+def load_or_decode(input_path: str, scratch_path: str, content_hash: str | None = None,
+                   cache: ResultCache | None = None, spill_after_seconds: float = SPILL_AFTER_SECONDS) -> np.ndarray:
+    """
+    PCM for `input_path`, served from the result cache when possible.
+
+    With a cache, the decoded audio is always spilled to `scratch_path` and
+    moved into the cache, then mapped from there.
+    """
+    if cache is None or content_hash is None:
+        return decode_pcm(input_path, spill_path=scratch_path, spill_after_seconds=spill_after_seconds)
+
+    key = cache_key(content_hash, "audio", format="f32le", rate=SAMPLE_RATE, channels=1)
+    path = cache.get_path(key)
+    if path is not None:
+        try:
+            return load_pcm_file(str(path))
+        except FileNotFoundError:
+            pass  # evicted since the lookup; decode again
+    decode_pcm(input_path, spill_path=scratch_path, spill_after_seconds=0)
+    path = cache.put_path(key, scratch_path, suffix=".f32", move=True)
+    return load_pcm_file(str(path))
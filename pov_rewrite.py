@@ -0,0 +1,210 @@
+"""
+Scene-chunked, token-budgeted POV rewrite for long transcripts.
+
+One prompt holding the whole episode is slow, brushes the context limit and
+fails all at once. Instead:
+
+- `split_scenes` cuts the transcript into chunks under a token budget,
+  preferring silences of `gap_seconds` or more (scene changes) as cut points
+- each chunk is rewritten by its own LLM call, at most `concurrency` at a
+  time
+- a rolling character-state summary (where the POV character is, what they
+  know and feel) is updated scene by scene on a separate chain, so chunk i
+  starts as soon as the notes for chunks 0..i-1 exist, not when their prose
+  does
+- `PovRewriter.stream` yields finished chunks in story order, so the first
+  paragraphs can be shown while the rest is still being written
+
+A failed chunk is reported on its `RewriteChunk` instead of failing the
+whole rewrite.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+import numpy as np
+
+from llm_gateway import handled_by_gateway
+from transcript import Transcript
+
+CHUNK_TOKENS = int(os.getenv("POV_REWRITE_CHUNK_TOKENS", "2000"))
+CONCURRENCY = int(os.getenv("POV_REWRITE_CONCURRENCY", "4"))
+SCENE_GAP_SECONDS = 3.0
+MIN_FILL = 0.5          # only cut at a scene gap once a chunk is at least half full
+CHARS_PER_TOKEN = 4     # rough, model-agnostic estimate
+STATE_WORDS = 150
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_scenes(transcript: Transcript, max_tokens: int = CHUNK_TOKENS,
+                 gap_seconds: float = SCENE_GAP_SECONDS, min_fill: float = MIN_FILL) -> list[Transcript]:
+    """
+    Contiguous chunks of at most `max_tokens` (a single over-long segment
+    gets a chunk of its own). A chunk that has to be cut ends at its last
+    scene gap if that leaves it at least `min_fill` full, else right before
+    the segment that would overflow it.
+    """
+    n = len(transcript)
+    if n == 0:
+        return [transcript]  # no speech: still one (e.g. video-only) rewrite
+    # Rendered line cost: text plus the "[1234.5s] " prefix
+    costs = [estimate_tokens(transcript.text_at(i)) + 3 for i in range(n)]
+    cum = np.concatenate(([0], np.cumsum(costs)))
+    gaps = transcript.starts[1:] - transcript.ends[:-1]
+
+    chunks: list[Transcript] = []
+    lo, gap = 0, None
+    for i in range(1, n):
+        if gaps[i - 1] >= gap_seconds:
+            gap = i
+        if cum[i + 1] - cum[lo] > max_tokens:
+            if gap is not None and gap > lo and cum[gap] - cum[lo] >= min_fill * max_tokens:
+                cut = gap
+            else:
+                cut = i
+            chunks.append(transcript[lo:cut])
+            lo, gap = cut, None
+    chunks.append(transcript[lo:n])
+    return chunks
+
+
+def state_prompt(character: str, state: str, scene: str) -> str:
+    return f"""You keep continuity notes for a story told from {character}'s point of view.
+
+CURRENT NOTES:
+{state or "(none yet)"}
+
+NEW SCENE (transcript):
+{scene}
+
+Rewrite the notes to cover everything so far: where {character} is, who they are with,
+what they know, want and feel, and open threads. At most {STATE_WORDS} words. Notes only.""".strip()
+
+
+@dataclass
+class RewriteChunk:
+    index: int
+    total: int
+    start: float        # transcript time covered
+    end: float
+    text: str = ""
+    state: str = ""     # character notes this chunk was written with
+    error: str | None = None
+    seconds: float = 0.0
+
+
+class GenerationAborted(RuntimeError):
+    """The caller stopped generation (e.g. the user pressed Stop); never retried."""
+
+
+def should_retry(exc: Exception) -> bool:
+    """Only failures nothing else handled: not aborts, not what the gateway already retried."""
+    return not isinstance(exc, GenerationAborted) and not handled_by_gateway(exc)
+
+
+class PovRewriter:
+    """
+    `generate(prompt, part) -> text` is the LLM call, with `part` the chunk
+    index for rewrites and None for character-notes updates (so a streaming
+    caller can tell which draft the tokens belong to). `build_prompt(scene,
+    state, index, total) -> prompt` turns one chunk (rendered transcript
+    lines) and the character notes so far into a rewrite prompt.
+    """
+
+    def __init__(self, generate: Callable[[str, int | None], str],
+                 build_prompt: Callable[[str, str, int, int], str],
+                 character: str, max_tokens: int = CHUNK_TOKENS, concurrency: int = CONCURRENCY,
+                 gap_seconds: float = SCENE_GAP_SECONDS, retries: int = 1):
+        self.generate = generate
+        self.build_prompt = build_prompt
+        self.character = character
+        self.max_tokens = max_tokens
+        self.concurrency = max(1, concurrency)
+        self.gap_seconds = gap_seconds
+        self.retries = retries
+
+    def plan(self, transcript: Transcript) -> list[Transcript]:
+        return split_scenes(transcript, self.max_tokens, self.gap_seconds)
+
+    def _call(self, prompt: str, part: int | None = None) -> str:
+        attempt = 0
+        while True:
+            try:
+                return self.generate(prompt, part)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.retries or not should_retry(e):
+                    raise
+
+    def _update_state(self, previous: "Future[str] | None", scene: str) -> str:
+        state = previous.result() if previous is not None else ""
+        try:
+            return self._call(state_prompt(self.character, state, scene)).strip() or state
+        except Exception:
+            return state  # keep the last good notes; the prose still gets written
+
+    def _rewrite(self, index: int, chunks: list[Transcript], scenes: list[str],
+                 state: "Future[str] | None", cancel: threading.Event) -> RewriteChunk:
+        chunk = chunks[index]
+        start = float(chunk.starts[0]) if len(chunk) else 0.0
+        out = RewriteChunk(index, len(chunks), start, chunk.duration)
+        if cancel.is_set():
+            out.error = "cancelled"
+            return out
+        started = time.perf_counter()
+        try:
+            out.state = state.result() if state is not None else ""
+            out.text = self._call(self.build_prompt(scenes[index], out.state, index, len(chunks)), index).strip()
+        except Exception as e:
+            out.error = f"{type(e).__name__}: {e}"
+        out.seconds = time.perf_counter() - started
+        return out
+
+    def stream(self, transcript: Transcript) -> Iterator[RewriteChunk]:
+        """Rewrite chunk by chunk; yields each chunk in order as soon as it and its predecessors are done."""
+        chunks = self.plan(transcript)
+        scenes = [c.render() for c in chunks]
+        cancel = threading.Event()
+        notes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pov-notes")
+        writers = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="pov-rewrite")
+        try:
+            # states[i] = notes covering chunks 0..i; one worker keeps them in order.
+            states: list[Future[str]] = []
+            for i in range(len(chunks) - 1):
+                states.append(notes.submit(self._update_state, states[-1] if states else None, scenes[i]))
+            pending = [
+                writers.submit(self._rewrite, i, chunks, scenes, states[i - 1] if i else None, cancel)
+                for i in range(len(chunks))
+            ]
+            for future in pending:
+                yield future.result()
+        finally:
+            # Stopping early (generator closed) drops the chunks not yet started.
+            cancel.set()
+            notes.shutdown(wait=False, cancel_futures=True)
+            writers.shutdown(wait=False, cancel_futures=True)
+
+    def rewrite(self, transcript: Transcript) -> str:
+        return stitch(self.stream(transcript))
+
+
+def stitch(chunks: Iterator[RewriteChunk] | list[RewriteChunk]) -> str:
+    """Chapters in order; a failed chunk leaves a visible gap marker instead of sinking the rest."""
+    parts = []
+    for chunk in chunks:
+        if chunk.error:
+            parts.append(missing_part(chunk))
+        elif chunk.text:
+            parts.append(chunk.text)
+    return "\n\n".join(parts)
+
+
+def missing_part(chunk: RewriteChunk) -> str:
+    return f"[Part {chunk.index + 1} missing ({chunk.start:.0f}s-{chunk.end:.0f}s): {chunk.error}]"
@@ -1,137 +1,387 @@
 import os
-import subprocess
+import threading
 from dataclasses import dataclass
+from typing import Iterator
 from dotenv import load_dotenv
 
-import whisper
+import numpy as np
 
-# --- Optional: pyannote (can fail on Streamlit Cloud) ---
-try:
-    from pyannote.audio import Pipeline
-except Exception:
-    Pipeline = None
+from alignment import SpeakerTranscript, align_segments, turns_from_annotation
+from chunking import CHUNK_SECONDS, slim_segment, transcribe_chunked
+from diarization import (
+    DEFAULT_MODEL as DIARIZATION_MODEL,
+    DIARIZE_CPU_SHARE,
+    DiarizationWorker,
+    load_pyannote,
+    pin_torch_threads,
+    split_cpus,
+    waveform_input,
+)
+from lazy import LazyModule
+from llm_gateway import LLMGateway, default_gateway
+from model_registry import ModelRegistry, default_registry
+from pcm import SAMPLE_RATE, SPILL_AFTER_SECONDS, load_or_decode
+from remote_wait import DEFAULT_TIMEOUT, wait_until_ready
+from result_cache import ResultCache, cache_key, hash_file
+from tracing import METRICS, job_trace, span
+from pov_rewrite import CHUNK_TOKENS, PovRewriter, RewriteChunk, estimate_tokens
+from transcript import Transcript
+from vad import transcribe_gated
+from workspace import JobWorkspace
 
-# --- Optional: Gemini (can fail if package/model mismatch) ---
-try:
-    import google.generativeai as genai
-except Exception:
-    genai = None
+# --- Optional backends, imported on first use (see lazy.py) ---
+# pyannote can fail on Streamlit Cloud; Gemini can fail on a package/model mismatch.
+pyannote_audio = LazyModule("pyannote.audio")
+genai = LazyModule("google.generativeai")
 
 load_dotenv()
 
+LLM_MODEL = "gemini-1.5-flash"
+
+
+def format_segments(segments: list[dict] | Transcript) -> str:
+    """Render Whisper segments as the `[12.5s] text` lines used in prompts."""
+    if isinstance(segments, Transcript):
+        return segments.render()
+    return "\n".join(f"[{s['start']}s] {s['text']}" for s in segments)
+
+
+def build_pov_prompt(transcript: str, character_name: str, cast_info: str,
+                     state: str = "", part: tuple[int, int] | None = None) -> str:
+    """Single-call prompt; with `part` (index, total) and `state`, one chunk of a map-reduce rewrite."""
+    continuity = ""
+    if part is not None and part[1] > 1:
+        continuity = f"""
+PART {part[0] + 1} OF {part[1]}: write only this part. Continue the story, don't recap earlier parts.
+
+STORY SO FAR ({character_name}'s notes):
+{state or "(this is the opening)"}
+"""
+    return f"""ACT AS: A master screenwriter.
+STYLE: Modern YA-friendly prose, clean and vivid.
+RULES:
+- Rewrite strictly from the POV of {character_name}.
+- Keep events faithful to the transcript (no new plot points).
+- Add internal thoughts, biases, and emotions of {character_name}.
+- Don't invent speaker names that aren't in CAST INFO.
+
+CAST INFO:
+{cast_info}
+{continuity}
+TRANSCRIPT:
+{transcript}
+""".strip()
+
 
 @dataclass
 class CastScriptResult:
     transcript_text: str
     diarization: object  # Annotation | None
     diarization_error: str | None = None
+    segments: Transcript | None = None
+    speaker_transcript: SpeakerTranscript | None = None
+    vad: dict | None = None  # VadReport.as_dict() when the VAD gate ran
+
+    @property
+    def prompt_transcript(self) -> str:
+        """Best transcript for prompting: speaker-labelled, else timestamped, else plain."""
+        if self.speaker_transcript is not None and self.speaker_transcript.lines:
+            return self.speaker_transcript.render()
+        if self.segments:
+            return format_segments(self.segments)
+        return self.transcript_text
+
+    def as_transcript(self) -> Transcript | None:
+        """Timed transcript for rewriting, speaker-labelled when diarization ran."""
+        if self.speaker_transcript is not None and self.speaker_transcript.lines:
+            return Transcript.from_segments(self.speaker_transcript.to_dicts())
+        return self.segments
 
 
 class CastScriptEngine:
     """
-    - Extract mono 16kHz WAV via ffmpeg
-    - Transcribe with Whisper (local)
-    - Optional diarization with pyannote (HF gated)
+    - Decode mono 16kHz float32 PCM from ffmpeg's stdout (no temp audio file)
+    - Transcribe with Whisper (local); long inputs in parallel chunks;
+      with `vad`, only the speech regions (see vad.py)
+    - Optional diarization with pyannote (HF gated), in its own process while
+      Whisper transcribes
     - Optional POV rewrite with Gemini (text-only)
+    - Optional content-addressed cache for audio and transcripts
+
+    Each call to process_video_or_url works in its own scratch directory, so
+    one engine can serve concurrent jobs from several threads.
     """
 
-    def __init__(self, whisper_model: str = "base", enable_diarization: bool = False):
+    def __init__(self, whisper_model: str = "base", enable_diarization: bool = False,
+                 chunk_seconds: float | None = CHUNK_SECONDS, workers: int | None = None,
+                 cache: ResultCache | None = None, models: ModelRegistry | None = None,
+                 word_timestamps: bool = False, parallel_diarization: bool = True,
+                 diarize_cpu_share: float | None = None, diarizer: DiarizationWorker | None = None,
+                 gateway: LLMGateway | None = None, vad: bool = False):
+        self.cache = cache
+
         # ---- Whisper ----
-        self.stt_model = whisper.load_model(whisper_model)
+        # Models come from a shared registry, so building another engine does
+        # not load another copy; the first transcription loads it if needed.
+        self.whisper_model = whisper_model
+        self.models = models or default_registry()
+        # Inputs longer than chunk_seconds are split and transcribed across
+        # `workers` processes; None disables chunking.
+        self.chunk_seconds = chunk_seconds
+        self.workers = workers
+        # Per-word timing lets speaker alignment split segments at speaker changes.
+        self.word_timestamps = word_timestamps
+        # Skip silence / music beds before Whisper; segment times stay on the episode timeline.
+        self.vad = vad
 
         # ---- Gemini (optional) ----
+        # Calls go through a shared gateway (rate limit, in-flight bound,
+        # retries on 429/5xx), so engines in one process share the quota.
+        self.gateway = gateway or default_gateway()
         self.llm = None
         gemini_key = os.getenv("GEMINI_API_KEY")
-        if genai is not None and gemini_key:
+        if gemini_key and genai.available():
             try:
                 genai.configure(api_key=gemini_key)
                 # Use a safer default model name; you can change later in app UI
-                self.llm = genai.GenerativeModel("gemini-1.5-flash")
+                self.llm = genai.GenerativeModel(LLM_MODEL)
             except Exception:
                 self.llm = None
 
         # ---- Diarization (optional) ----
+        # With parallel_diarization the pipeline is loaded in a worker process
+        # and runs while this one transcribes; `diarize_cpu_share` of the cores
+        # go to it and the rest to Whisper, each pinned to its share.
         self.diarization_pipeline = None
         self.diarization_error = None
+        self.diarizer = diarizer
+        self.diarize_threads, self.transcribe_threads = split_cpus(
+            DIARIZE_CPU_SHARE if diarize_cpu_share is None else diarize_cpu_share
+        )
+        self._threads_pinned = False
 
-        if enable_diarization:
-            if Pipeline is None:
+        if enable_diarization and diarizer is None:
+            # Only check it is installed: the worker process does the (slow) import.
+            if not pyannote_audio.installed():
                 self.diarization_error = "pyannote.audio not available in this environment."
             else:
                 hf_token = os.getenv("HF_TOKEN")
                 if not hf_token:
                     self.diarization_error = "HF_TOKEN missing in .env/secrets."
                 else:
-                    # IMPORTANT: pyannote 3.x prefers token=...
-                    try:
-                        # community-1 is often easier than 3.1 gating wise
-                        model_id = os.getenv("PYANNOTE_MODEL", "pyannote/speaker-diarization-community-1")
-                        self.diarization_pipeline = Pipeline.from_pretrained(
-                            model_id,
-                            token=hf_token
-                        )
-                    except Exception as e:
-                        self.diarization_pipeline = None
-                        self.diarization_error = f"Failed to load pyannote pipeline: {e}"
-
-    def extract_audio(self, input_path: str, audio_path: str = "temp_audio.wav") -> None:
-        # ffmpeg must be installed (on Streamlit Cloud: packages.txt must include ffmpeg)
-        cmd = [
-            "ffmpeg", "-hide_banner", "-loglevel", "error",
-            "-i", input_path,
-            "-ar", "16000",
-            "-ac", "1",
-            "-vn",
-            audio_path,
-            "-y",
-        ]
-        subprocess.run(cmd, check=True)
+                    # community-1 is often easier than 3.1 gating wise
+                    model_id = os.getenv("PYANNOTE_MODEL", DIARIZATION_MODEL)
+                    if parallel_diarization:
+                        self.diarizer = DiarizationWorker(model_id, hf_token, threads=self.diarize_threads)
+                    else:
+                        try:
+                            self.diarization_pipeline = load_pyannote(model_id, hf_token)
+                        except Exception as e:
+                            self.diarization_pipeline = None
+                            self.diarization_error = f"Failed to load pyannote pipeline: {e}"
+
+    def close(self) -> None:
+        """Stop the diarization worker process, if any."""
+        if self.diarizer is not None:
+            self.diarizer.close()
 
     def process_video_or_url(self, input_path: str) -> CastScriptResult:
-        audio_path = "temp_audio.wav"
-        self.extract_audio(input_path, audio_path=audio_path)
+        with job_trace("engine"), JobWorkspace() as workspace:
+            return self._process(input_path, workspace)
+
+    def _process(self, input_path: str, workspace: JobWorkspace) -> CastScriptResult:
+        content_hash = None
+        if self.cache is not None:
+            with span("ingest"):
+                content_hash = hash_file(input_path)
+        transcript_key = None
+        result = None
+        if content_hash is not None:
+            transcript_key = cache_key(content_hash, "transcript", whisper=self.whisper_model,
+                                       chunk_seconds=self.chunk_seconds, words=self.word_timestamps,
+                                       **({"vad": True} if self.vad else {}))
+            result = self.cache.get_json(transcript_key)
+
+        # Audio is only needed if something below still has to read it.
+        audio = None
+        if result is None or self.diarization_pipeline is not None or self.diarizer is not None:
+            with span("extract"):
+                audio = self.load_audio(input_path, content_hash, workspace)
 
         diarization = None
         diarization_error = None
+        pending = None
 
-        if self.diarization_pipeline is not None:
+        if self.diarizer is not None:
+            # Runs in the worker process while transcription runs here.
+            pending = self.diarizer.submit(self._audio_file(audio, workspace))
+        elif self.diarization_pipeline is not None:
             try:
-                diarization = self.diarization_pipeline(audio_path)
+                with span("diarize"):
+                    diarization = self.diarization_pipeline(waveform_input(audio))
             except Exception as e:
                 diarization_error = f"Diarization failed: {e}"
         else:
             diarization_error = self.diarization_error
 
-        result = self.stt_model.transcribe(audio_path)
+        try:
+            if result is None:
+                with span("transcribe", model=self.whisper_model):
+                    result = self.transcribe(audio, workspace)
+                if transcript_key is not None:
+                    self.cache.put_json(transcript_key, {
+                        "text": result.get("text") or "",
+                        "segments": [slim_segment(s) for s in result.get("segments", [])],
+                        **({"vad": result["vad"]} if result.get("vad") else {}),
+                    })
+        except BaseException:
+            if pending is not None:
+                pending.cancel()
+            raise
+
+        if pending is not None:
+            try:
+                diarization, seconds = pending.result()
+                METRICS.observe("pov_stage_seconds", seconds, stage="diarize", status="ok")
+            except Exception as e:
+                diarization_error = f"Diarization failed: {e}"
+
+        vad_report = result.get("vad")
         transcript = (result.get("text") or "").strip()
+        # VAD remapping and Whisper's timestamp jitter can leave starts out of
+        # order; everything downstream (alignment, Transcript) wants them sorted
+        segments = sorted(result.get("segments") or [], key=lambda seg: seg["start"])
+
+        speaker_transcript = None
+        if diarization is not None and segments:
+            # The transcript stands on its own; a bad alignment only loses the speaker labels
+            try:
+                with span("align"):
+                    speaker_transcript = align_segments(segments, turns_from_annotation(diarization))
+            except Exception as e:
+                diarization_error = f"Speaker alignment failed: {e}"
+        # Keep the compact columns; Whisper's per-segment dicts go with `result`.
+        segments = Transcript.from_segments(segments)
+        del result
 
         return CastScriptResult(
             transcript_text=transcript,
             diarization=diarization,
-            diarization_error=diarization_error
+            diarization_error=diarization_error,
+            segments=segments,
+            speaker_transcript=speaker_transcript,
+            vad=vad_report,
+        )
+
+    def load_audio(self, input_path: str, content_hash: str | None, workspace: JobWorkspace) -> np.ndarray:
+        """16 kHz mono float32 samples; anything chunked or diarized out of process is file-backed."""
+        spill_after = SPILL_AFTER_SECONDS
+        if self.chunk_seconds:
+            spill_after = min(spill_after, self.chunk_seconds)
+        if self.diarizer is not None:
+            spill_after = 0
+        return load_or_decode(input_path, workspace.bulk_file("audio.f32"), content_hash, self.cache,
+                              spill_after_seconds=spill_after)
+
+    @staticmethod
+    def _audio_file(audio: np.ndarray, workspace: JobWorkspace) -> str:
+        """Path of the raw float32 file behind `audio`, writing one if it is in memory."""
+        path = getattr(audio, "filename", None)
+        if path is None:
+            path = workspace.bulk_file("audio.f32")
+            np.asarray(audio, dtype=np.float32).tofile(path)
+        return str(path)
+
+    def transcribe(self, audio: np.ndarray, workspace: JobWorkspace | None = None) -> dict:
+        if self.vad:
+            return transcribe_gated(audio, lambda speech: self._transcribe(self._file_backed(speech, workspace)))
+        return self._transcribe(audio)
+
+    def _file_backed(self, audio: np.ndarray, workspace: JobWorkspace | None) -> np.ndarray:
+        """Gated speech as a file-backed map when it is long enough to be chunked."""
+        if workspace is None or not self.chunk_seconds or len(audio) / SAMPLE_RATE <= self.chunk_seconds:
+            return audio
+        path = workspace.bulk_file("speech.f32")
+        np.asarray(audio, dtype=np.float32).tofile(path)
+        return np.memmap(path, dtype=np.float32, mode="c")
+
+    def _transcribe(self, audio: np.ndarray) -> dict:
+        # While a diarization worker runs, Whisper keeps to its share of the cores.
+        cpus = self.transcribe_threads if self.diarizer is not None else None
+        # Chunk workers map their window from the backing file.
+        audio_file = getattr(audio, "filename", None)
+        if self.chunk_seconds and audio_file and len(audio) / SAMPLE_RATE > self.chunk_seconds:
+            return transcribe_chunked(
+                audio_file,
+                model_name=self.whisper_model,
+                workers=self.workers,
+                chunk_seconds=self.chunk_seconds,
+                audio=audio,
+                cpus=cpus,
+                word_timestamps=self.word_timestamps,
+            )
+        if cpus is not None and not self._threads_pinned:
+            # torch's thread count is process-wide: set it once, never per call,
+            # so concurrent transcriptions don't flip it under each other
+            pin_torch_threads(cpus)
+            self._threads_pinned = True
+        with self.models.lease(self.whisper_model) as model:
+            return model.transcribe(audio, word_timestamps=self.word_timestamps)
+
+    @property
+    def stt_model(self):
+        return self.models.get(self.whisper_model)
+
+    def upload_media(self, path: str, timeout: float | None = DEFAULT_TIMEOUT,
+                     cancel: threading.Event | None = None):
+        """Upload a file to Gemini and wait (with backoff) until it is ready to prompt with."""
+        if not self.llm:
+            raise RuntimeError("Gemini is not configured; cannot upload media.")
+        with span("upload"):
+            file_ref = genai.upload_file(path)
+            return wait_until_ready(file_ref, lambda f: genai.get_file(f.name), timeout=timeout, cancel=cancel)
+
+    def _generate(self, prompt: str, media=None) -> str:
+        # `media` is an optional file from upload_media (e.g. the episode video)
+        with span("generate"):
+            resp = self.gateway.call(LLM_MODEL, self.llm.generate_content,
+                                     [prompt, media] if media is not None else prompt)
+        return getattr(resp, "text", "").strip()
+
+    def pov_rewriter(self, character_name: str, cast_info: str, media=None, **options) -> PovRewriter:
+        """Map-reduce rewriter over this engine's LLM (options: max_tokens, concurrency, ...)."""
+        return PovRewriter(
+            generate=lambda prompt, part: self._generate(prompt, media),
+            build_prompt=lambda scene, state, i, n: build_pov_prompt(
+                scene, character_name, cast_info, state=state, part=(i, n)),
+            character=character_name,
+            **options,
         )
 
-    def rewrite_pov(self, transcript: str, character_name: str, cast_info: str) -> str:
+    def rewrite_pov(self, transcript: str | SpeakerTranscript | Transcript, character_name: str,
+                    cast_info: str, media=None, max_tokens: int = CHUNK_TOKENS) -> str:
+        """
+        POV rewrite in one call, or scene by scene (see pov_rewrite) when a
+        timed Transcript is longer than `max_tokens`.
+        """
         if not self.llm:
             return (
                 "POV rewrite is disabled. Set GEMINI_API_KEY and ensure google-generativeai is installed. "
                 "Also confirm the model name is available."
             )
 
-        prompt = f"""ACT AS: A master screenwriter.
-STYLE: Modern YA-friendly prose, clean and vivid.
-RULES:
-- Rewrite strictly from the POV of {character_name}.
-- Keep events faithful to the transcript (no new plot points).
-- Add internal thoughts, biases, and emotions of {character_name}.
-- Don't invent speaker names that aren't in CAST INFO.
+        if isinstance(transcript, Transcript):
+            if estimate_tokens(transcript.text) > max_tokens:
+                return self.pov_rewriter(character_name, cast_info, media, max_tokens=max_tokens).rewrite(transcript)
+            transcript = transcript.render()
+        elif isinstance(transcript, SpeakerTranscript):
+            transcript = transcript.render()
+        prompt = build_pov_prompt(transcript, character_name, cast_info)
+        return self._generate(prompt, media)
 
-CAST INFO:
-{cast_info}
-
-TRANSCRIPT:
-{transcript}
-""".strip()
-
-        resp = self.llm.generate_content(prompt)
-        return getattr(resp, "text", "").strip()
+    def rewrite_pov_stream(self, transcript: Transcript, character_name: str, cast_info: str,
+                           media=None, **options) -> Iterator[RewriteChunk]:
+        """Rewritten chunks in story order, each as soon as it is ready."""
+        if not self.llm:
+            raise RuntimeError("Gemini is not configured; cannot rewrite.")
+        return self.pov_rewriter(character_name, cast_info, media, **options).stream(transcript)
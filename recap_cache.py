@@ -0,0 +1,127 @@
+"""
+Cache for show/episode recaps (the search-grounded lore lookup).
+
+A recap depends on the show, the episode and the model, not on the uploaded
+video, so entries are keyed by normalised (show, episode, model):
+"Wizards Beyond Waverly Place" / "S01E03", "wizards beyond waverly place" /
+"1x3" and "Season 1 Episode 3" all land on the same entry.
+
+Entries live in their own `ResultCache` (SQLite index, shared by every
+worker process) with a TTL and a byte budget. Lookups are single-flight:
+concurrent misses for one episode make a single remote call, whether the
+callers are threads in this process (they wait on the leader) or other
+processes (they wait on the leader's lease in the index, then read its
+result).
+"""
+
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+from result_cache import DEFAULT_CACHE_DIR, ResultCache, cache_key
+
+RECAP_TTL = float(os.getenv("POV_RECAP_TTL", str(7 * 24 * 3600)))  # recaps barely change
+RECAP_MAX_BYTES = int(os.getenv("POV_RECAP_MAX_BYTES", str(64 * 1024 ** 2)))
+LEASE_SECONDS = 120.0  # longer than a slow grounded call; a crashed leader frees it after this
+POLL_SECONDS = 0.25
+
+_EPISODE_PATTERNS = (
+    re.compile(r"^s(?:eason)?\s*(\d+)\s*[-_.]?\s*e(?:p(?:isode)?)?\s*(\d+)$"),
+    re.compile(r"^(\d+)\s*x\s*(\d+)$"),
+)
+
+
+def normalise_show(show: str) -> str:
+    """Case, punctuation and spacing don't matter: 'The  Office!' -> 'the office'."""
+    return " ".join(re.sub(r"[^\w\s]", " ", show.casefold()).split())
+
+
+def normalise_episode(episode: str) -> str:
+    """'S01E03', 's1 e3', '1x03', 'Season 1 Episode 3' -> 's01e03'; titles as normalise_show."""
+    text = normalise_show(episode)
+    for pattern in _EPISODE_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            season, number = (int(g) for g in match.groups())
+            return f"s{season:02d}e{number:02d}"
+    return text
+
+
+def recap_key(show: str, episode: str, model: str) -> str:
+    return cache_key(normalise_show(show), "recap", episode=normalise_episode(episode), model=model)
+
+
+class RecapCache:
+
+    def __init__(self, cache: ResultCache | None = None, ttl: float = RECAP_TTL,
+                 lease_seconds: float = LEASE_SECONDS, poll_seconds: float = POLL_SECONDS):
+        self.cache = cache or ResultCache(root=str(Path(DEFAULT_CACHE_DIR) / "recaps"),
+                                          max_bytes=RECAP_MAX_BYTES)
+        self.ttl = ttl
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.fetches = 0
+        self.shared = 0  # misses answered by another caller's fetch
+        self._inflight: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get(self, show: str, episode: str, model: str) -> str | None:
+        return self.cache.get_json(recap_key(show, episode, model))
+
+    def get_or_fetch(self, show: str, episode: str, model: str, fetch: Callable[[], str]) -> str:
+        """Cached recap, else fetch() once no matter how many callers ask at the same time."""
+        key = recap_key(show, episode, model)
+        while True:
+            cached = self.cache.get_json(key)
+            if cached is not None:
+                return cached
+            with self._lock:
+                done = self._inflight.get(key)
+                leader = done is None
+                if leader:
+                    done = self._inflight[key] = threading.Event()
+            if not leader:
+                # Another thread here is fetching; use its result (or retry if it failed)
+                done.wait()
+                cached = self.cache.get_json(key)
+                if cached is not None:
+                    with self._lock:
+                        self.shared += 1
+                    return cached
+                continue
+            try:
+                return self._lead(key, fetch)
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                done.set()
+
+    def _lead(self, key: str, fetch: Callable[[], str]) -> str:
+        deadline = time.monotonic() + self.lease_seconds
+        while not self.cache.claim(key, self.lease_seconds):
+            # Another process holds the lease: wait for its entry or for the lease to lapse
+            time.sleep(self.poll_seconds)
+            cached = self.cache.get_json(key)
+            if cached is not None:
+                with self._lock:
+                    self.shared += 1
+                return cached
+            if time.monotonic() > deadline:
+                break  # leader looks stuck; fetch ourselves rather than wait forever
+        try:
+            cached = self.cache.get_json(key)  # filled between our miss and the claim
+            if cached is not None:
+                return cached
+            text = fetch()
+            with self._lock:
+                self.fetches += 1
+            self.cache.put_json(key, text, ttl=self.ttl)
+            return text
+        finally:
+            self.cache.release(key)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "fetches": self.fetches, "shared": self.shared}
@@ -0,0 +1,108 @@
+"""
+Waiting for remote assets (e.g. Gemini file processing) to become ready.
+
+`wait_until_ready` polls with exponential backoff and jitter, starting
+fast so short clips are picked up quickly and backing off for long uploads.
+It stops at a deadline or when a cancel event is set, and records how long
+the wait took and how many polls it needed.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+INITIAL_DELAY = 0.5
+MAX_DELAY = 10.0
+BACKOFF_FACTOR = 2.0
+DEFAULT_TIMEOUT = 15 * 60.0
+
+
+class RemoteAssetError(RuntimeError):
+    """The remote asset ended in a failed state."""
+
+
+class RemoteAssetTimeout(TimeoutError):
+    """The asset was still processing when the deadline passed."""
+
+
+class RemoteAssetCancelled(RuntimeError):
+    """The wait was cancelled by the caller."""
+
+
+@dataclass
+class WaitMetrics:
+    polls: int = 0
+    seconds: float = 0.0
+    delays: list[float] = field(default_factory=list)
+    final_state: str | None = None
+
+
+def backoff_delays(initial: float = INITIAL_DELAY, maximum: float = MAX_DELAY,
+                   factor: float = BACKOFF_FACTOR, rng: random.Random | None = None):
+    """Infinite generator of jittered delays: uniform(initial/2, min(max, initial * factor**n))."""
+    rng = rng or random
+    ceiling = initial
+    while True:
+        yield rng.uniform(initial / 2, ceiling)
+        ceiling = min(maximum, ceiling * factor)
+
+
+def state_name(asset: Any) -> str:
+    """'ACTIVE'/'PROCESSING'/'FAILED' from google-genai and google-generativeai file objects."""
+    state = getattr(asset, "state", None)
+    return getattr(state, "name", None) or str(state)
+
+
+def wait_until_ready(asset: Any, refresh: Callable[[Any], Any],
+                     pending: tuple[str, ...] = ("PROCESSING", "STATE_UNSPECIFIED"),
+                     failed: tuple[str, ...] = ("FAILED",),
+                     timeout: float | None = DEFAULT_TIMEOUT,
+                     cancel: threading.Event | None = None,
+                     initial_delay: float = INITIAL_DELAY, max_delay: float = MAX_DELAY,
+                     metrics: WaitMetrics | None = None,
+                     sleep: Callable[[float], Any] | None = None,
+                     clock: Callable[[], float] = time.monotonic,
+                     rng: random.Random | None = None) -> Any:
+    """
+    Poll `refresh(asset)` until its state leaves `pending`; return the ready asset.
+
+    Raises RemoteAssetError on a `failed` state, RemoteAssetTimeout past
+    `timeout` seconds and RemoteAssetCancelled once `cancel` is set.
+    """
+    metrics = metrics if metrics is not None else WaitMetrics()
+    started = clock()
+    deadline = None if timeout is None else started + timeout
+    if sleep is None:
+        # Sleeping on the cancel event lets cancellation interrupt a long delay.
+        sleep = cancel.wait if cancel is not None else time.sleep
+
+    delays = backoff_delays(initial_delay, max_delay, rng=rng)
+    try:
+        while True:
+            state = state_name(asset)
+            metrics.final_state = state
+            if state in failed:
+                raise RemoteAssetError(f"{getattr(asset, 'name', 'asset')} failed with state {state}.")
+            if state not in pending:
+                return asset
+            if cancel is not None and cancel.is_set():
+                raise RemoteAssetCancelled(f"Wait for {getattr(asset, 'name', 'asset')} cancelled.")
+
+            delay = next(delays)
+            if deadline is not None:
+                remaining = deadline - clock()
+                if remaining <= 0:
+                    raise RemoteAssetTimeout(
+                        f"{getattr(asset, 'name', 'asset')} still {state} after {timeout:.0f}s."
+                    )
+                delay = min(delay, remaining)
+            metrics.delays.append(delay)
+            sleep(delay)
+            if cancel is not None and cancel.is_set():
+                raise RemoteAssetCancelled(f"Wait for {getattr(asset, 'name', 'asset')} cancelled.")
+            asset = refresh(asset)
+            metrics.polls += 1
+    finally:
+        metrics.seconds = clock() - started
@@ -0,0 +1,212 @@
+"""
+Content-addressed, on-disk result cache.
+
+Entries are keyed by a streaming SHA-256 of the source video plus the kind of
+result and the parameters that produced it (model name, options...). Payloads
+live as plain files under `<root>/objects/`; a small SQLite index tracks size,
+last access and optional expiry so the cache can be shared by several
+processes and evicted least-recently-used once it exceeds `max_bytes`.
+
+`claim(key)` takes a short, expiring lease in the same index, so processes
+sharing the cache can agree on who computes a missing entry.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO
+
+DEFAULT_CACHE_DIR = os.getenv("POV_CACHE_DIR", os.path.join(Path.home(), ".cache", "cinematicpov"))
+DEFAULT_MAX_BYTES = int(os.getenv("POV_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))  # 5 GB
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_file(path: str, chunk_size: int = HASH_CHUNK_BYTES) -> str:
+    """SHA-256 of a file, read in fixed-size chunks (never fully in RAM)."""
+    with open(path, "rb") as f:
+        return hash_stream(f, chunk_size)
+
+
+def hash_stream(src: BinaryIO, chunk_size: int = HASH_CHUNK_BYTES) -> str:
+    """SHA-256 of the rest of a binary stream, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    while True:
+        block = src.read(chunk_size)
+        if not block:
+            break
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(content_hash: str, kind: str, **params: Any) -> str:
+    """Stable key for (content, kind, parameters)."""
+    payload = json.dumps({"content": content_hash, "kind": kind, "params": params},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                       key TEXT PRIMARY KEY,
+                       path TEXT NOT NULL,
+                       size INTEGER NOT NULL,
+                       last_access REAL NOT NULL,
+                       expires REAL
+                   )"""
+            )
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS claims (
+                       key TEXT PRIMARY KEY,
+                       owner TEXT NOT NULL,
+                       expires REAL NOT NULL
+                   )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.root / "index.sqlite", timeout=30)
+
+    def _object_path(self, key: str, suffix: str) -> Path:
+        return self.root / "objects" / key[:2] / f"{key}{suffix}"
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    # ---- Generic file entries ----
+    def get_path(self, key: str) -> Path | None:
+        """Path of a cached payload, or None on miss/expiry."""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT path, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                path, expires = Path(row[0]), row[1]
+                if (expires is not None and expires <= now) or not path.exists():
+                    db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    path.unlink(missing_ok=True)
+                    row = None
+                else:
+                    db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        self._count(row is not None)
+        return None if row is None else path
+
+    def put_path(self, key: str, src: str, suffix: str = "", ttl: float | None = None,
+                 move: bool = False) -> Path:
+        """Store a file (copied, or moved if `move`) under `key`."""
+        dest = self._object_path(key, suffix)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}")
+        if move:
+            shutil.move(src, tmp)
+        else:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+        self._index(key, dest, ttl)
+        return dest
+
+    def _index(self, key: str, dest: Path, ttl: float | None) -> None:
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, path, size, last_access, expires) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, str(dest), dest.stat().st_size, now, expires),
+            )
+        self.evict()
+
+    # ---- JSON entries (segments, lore text, remote file refs) ----
+    def get_json(self, key: str) -> Any | None:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None  # evicted by another process since the lookup: a miss
+
+    def put_json(self, key: str, value: Any, ttl: float | None = None) -> None:
+        dest = self._object_path(key, ".json")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, dest)
+        self._index(key, dest, ttl)
+
+    # ---- Cross-process leases ----
+    def claim(self, key: str, seconds: float, owner: str | None = None) -> bool:
+        """Take the lease on `key` for `seconds` unless someone else holds a live one."""
+        owner = owner or f"{os.getpid()}.{threading.get_ident()}"
+        now = time.time()
+        with self._connect() as db:
+            db.execute("DELETE FROM claims WHERE key = ? AND expires <= ?", (key, now))
+            cur = db.execute("INSERT OR IGNORE INTO claims (key, owner, expires) VALUES (?, ?, ?)",
+                             (key, owner, now + seconds))
+            return cur.rowcount == 1
+
+    def release(self, key: str, owner: str | None = None) -> None:
+        owner = owner or f"{os.getpid()}.{threading.get_ident()}"
+        with self._connect() as db:
+            db.execute("DELETE FROM claims WHERE key = ? AND owner = ?", (key, owner))
+
+    # ---- Housekeeping ----
+    def total_bytes(self) -> int:
+        with self._connect() as db:
+            return db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones until under budget."""
+        removed = 0
+        now = time.time()
+        with self._connect() as db:
+            victims = db.execute(
+                "SELECT key, path FROM entries WHERE expires IS NOT NULL AND expires <= ?", (now,)
+            ).fetchall()
+            total = db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries WHERE expires IS NULL OR expires > ?",
+                (now,),
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                for key, path, size in db.execute(
+                    "SELECT key, path, size FROM entries "
+                    "WHERE expires IS NULL OR expires > ? ORDER BY last_access ASC", (now,)
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((key, path))
+                    total -= size
+            for key, path in victims:
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                Path(path).unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        with self._connect() as db:
+            entries = db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+        }
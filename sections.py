@@ -0,0 +1,200 @@
+"""
+[SCRIPT]/[NOVEL] section parsing for model output, streamed or complete.
+
+`SectionRouter` makes one pass over the text, whether it comes as a
+single string (`parse_sections`) or as streamed chunks (`feed`/`close`).
+Sections are kept as (start, end) offsets into one buffer and are only
+sliced out when `text()` is called. A marker split across two chunks
+(`"...[NOV"` + `"EL]..."`) is held back until it can be decided, so live
+text never flashes a half marker.
+
+Models don't always follow the format, and a failed parse would mean a
+paid regeneration, so sloppy output is recovered rather than rejected:
+
+- missing end marker: the section runs to the next section marker or to
+  the end of the text ("unterminated")
+- end marker without a start: the text since the previous marker (or the
+  start) is taken ("unopened")
+- a section opened more than once: its pieces are concatenated
+  ("duplicated")
+
+`report()` gives the status of every section. One thread may feed while
+another reads `text()` (the UI repainting a live stream).
+"""
+
+import re
+import threading
+from typing import Iterable
+
+SECTIONS = ("SCRIPT", "NOVEL")
+
+COMPLETE = "complete"
+UNTERMINATED = "unterminated"
+UNOPENED = "unopened"
+DUPLICATED = "duplicated"
+MISSING = "missing"
+
+
+class SectionRouter:
+
+    def __init__(self, names: tuple[str, ...] = SECTIONS):
+        self.names = names
+        alternatives = "|".join(re.escape(name) for name in names)
+        self._marker = re.compile(rf"\[(END_)?({alternatives})\]")
+        self._max_marker = max(len(f"[END_{name}]") for name in names)
+
+        self.current: str | None = None            # section being written, if any
+        self._spans: dict[str, list[tuple[int, int]]] = {name: [] for name in names}
+        self._opens = dict.fromkeys(names, 0)
+        self._flags: dict[str, set[str]] = {name: set() for name in names}
+        self._open_start = 0                        # where `current`'s text began
+        self._free_start = 0                        # end of the last marker seen
+        self._chunks: list[str] = []
+        self._joined: str | None = ""
+        self._size = 0
+        self._scan_from = 0                         # first offset not yet decided
+        self._tail = ""                             # buffer[_scan_from:]
+        self._closed = False
+        self._lock = threading.RLock()              # feed() vs. text() from another thread
+
+    # ---- Input ----
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        with self._lock:
+            if self._closed:
+                raise ValueError("feed() after close()")
+            self._chunks.append(text)
+            self._joined = None
+            self._size += len(text)
+            self._scan(text=text)
+
+    def close(self) -> None:
+        """End of input: a held-back partial marker is plain text, an open section ends here."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._scan(final=True)
+            if self.current is not None:
+                self._end_current(self._size, UNTERMINATED)
+
+    def _scan(self, final: bool = False, text: str = "") -> None:
+        # Only the undecided tail plus the new text is searched, so the whole
+        # stream is scanned once and the buffer is never re-joined here.
+        window = self._tail + text
+        base = self._scan_from
+        pos = 0
+        for m in self._marker.finditer(window):
+            self._on_marker(m.group(2), opens=m.group(1) is None, start=base + m.start(), end=base + m.end())
+            pos = m.end()
+        hold = len(window)
+        if not final:
+            # Hold back a trailing "[..." that may still become a marker.
+            bracket = window.rfind("[", max(pos, len(window) - self._max_marker + 1))
+            if bracket >= 0 and self._could_be_marker(window[bracket:]):
+                hold = bracket
+        self._tail = window[hold:]
+        self._scan_from = base + hold
+
+    def _could_be_marker(self, tail: str) -> bool:
+        return any(
+            marker.startswith(tail)
+            for name in self.names for marker in (f"[{name}]", f"[END_{name}]")
+        )
+
+    # ---- State machine ----
+    def _add_span(self, name: str, start: int, end: int) -> None:
+        spans = self._spans[name]
+        if spans and spans[-1][1] == start:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+
+    def _end_current(self, at: int, flag: str | None = None) -> None:
+        self._add_span(self.current, self._open_start, at)
+        if flag:
+            self._flags[self.current].add(flag)
+        self.current = None
+
+    def _on_marker(self, name: str, opens: bool, start: int, end: int) -> None:
+        if opens:
+            if self.current is not None:
+                # A new opening ends whatever was open (same name: duplicate open).
+                self._end_current(start, None if self.current == name else UNTERMINATED)
+            self._opens[name] += 1
+            if self._opens[name] > 1:
+                self._flags[name].add(DUPLICATED)
+            self.current = name
+            self._open_start = end
+        elif self.current == name:
+            self._end_current(start)
+        elif self.current is not None:
+            # [END_X] inside Y: Y ends here, X is left as it was.
+            self._end_current(start, UNTERMINATED)
+        elif not self._spans[name]:
+            # End without a start: take the text since the last marker.
+            self._add_span(name, self._free_start, start)
+            self._flags[name].add(UNOPENED)
+        self._free_start = end
+
+    # ---- Output ----
+    @property
+    def buffer(self) -> str:
+        with self._lock:
+            if self._joined is None:
+                self._joined = "".join(self._chunks)
+                self._chunks = [self._joined]
+            return self._joined
+
+    @property
+    def full_text(self) -> str:
+        return self.buffer
+
+    def spans(self, name: str) -> list[tuple[int, int]]:
+        """(start, end) offsets of `name` in `buffer`, including an open section so far."""
+        with self._lock:
+            spans = list(self._spans[name])
+            if self.current == name:
+                # Exclude a held-back partial marker while streaming.
+                end = self._size if self._closed else self._scan_from
+                if end > self._open_start:
+                    spans.append((self._open_start, end))
+            return spans
+
+    def text(self, name: str) -> str:
+        with self._lock:  # buffer and spans from the same moment
+            buf, spans = self.buffer, self.spans(name)
+        return "".join(buf[start:end] for start, end in spans)
+
+    def report(self) -> dict[str, str]:
+        """Per section: complete, unterminated, unopened, duplicated or missing."""
+        out = {}
+        with self._lock:
+            for name in self.names:
+                flags = self._flags[name]
+                if not self.spans(name) and not self._opens[name]:
+                    out[name] = MISSING
+                elif UNTERMINATED in flags or (self.current == name and not self._closed):
+                    out[name] = UNTERMINATED
+                elif UNOPENED in flags:
+                    out[name] = UNOPENED
+                elif DUPLICATED in flags:
+                    out[name] = DUPLICATED
+                else:
+                    out[name] = COMPLETE
+        return out
+
+    @property
+    def recovered(self) -> list[str]:
+        """Sections with any text, well-formed or not."""
+        return [name for name in self.names if any(end > start for start, end in self.spans(name))]
+
+
+def parse_sections(text: str | Iterable[str], names: tuple[str, ...] = SECTIONS) -> SectionRouter:
+    """Parse a complete response (or an iterable of its chunks)."""
+    router = SectionRouter(names)
+    for chunk in [text] if isinstance(text, str) else text:
+        router.feed(chunk)
+    router.close()
+    return router
@@ -0,0 +1,201 @@
+"""
+Small dependency-aware stage scheduler.
+
+Independent stages (network calls, uploads, ffmpeg/Whisper) run at the same
+time on a thread pool; a stage listed in `after=` waits for those stages and
+receives their results as keyword arguments. Every stage is timed so a job's
+latency can be broken down afterwards.
+
+Stages added with `params=` are keyed: the key hashes the stage name, its
+params and the keys of the stages it depends on, so changing a parameter
+invalidates that stage and everything downstream of it, and nothing else.
+With a `StageMemo`, a keyed stage whose key is already in the memo is not
+run; its remembered result is used instead, and its own dependencies run
+only if some other stage still needs them. `status()` says which stages
+ran, which were reused and which were not needed at all.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+MEMO_ENTRIES = 64
+MEMO_TTL = 6 * 3600.0  # below Gemini's 48h file lifetime, so reused upload refs stay valid
+
+RAN, REUSED, SKIPPED = "ran", "reused", "skipped"
+
+
+@dataclass
+class StageTiming:
+    start: float    # seconds since the scheduler started
+    seconds: float  # time spent inside the stage itself (not waiting on deps)
+
+
+@dataclass
+class _Stage:
+    name: str
+    fn: Callable[..., Any]
+    args: tuple
+    after: tuple[str, ...] = field(default_factory=tuple)
+    key: str | None = None
+    memoize: bool = True
+
+
+def stage_key(name: str, params: dict, dep_keys: tuple[str | None, ...] = ()) -> str | None:
+    """Content key for a stage; None if any dependency is unkeyed (inputs unknown)."""
+    if any(k is None for k in dep_keys):
+        return None
+    payload = json.dumps({"stage": name, "params": params, "deps": list(dep_keys)},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageMemo:
+    """Thread-safe LRU of stage results by key, with per-entry expiry."""
+
+    def __init__(self, max_entries: int = MEMO_ENTRIES, ttl: float | None = MEMO_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str) -> tuple[bool, Any]:
+        """(found, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def store(self, key: str, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class StageScheduler:
+
+    def __init__(self, memo: StageMemo | None = None):
+        self.memo = memo
+        self._stages: list[_Stage] = []
+        self.results: dict[str, Any] = {}
+        self.timings: dict[str, StageTiming] = {}
+        self.reused: set[str] = set()
+        self.wall_seconds: float = 0.0
+
+    def add(self, name: str, fn: Callable[..., Any], *args, after: tuple[str, ...] = (),
+            params: dict | None = None, memoize: bool = True) -> None:
+        """
+        `params`: everything besides its dependencies that the result depends
+        on; omit it for stages that must always run. `memoize=False` keys a
+        stage (so its dependents can be reused) without remembering its
+        result, for results that don't outlive the job (e.g. scratch files).
+        """
+        known = {s.name: s for s in self._stages}
+        if name in known:
+            raise ValueError(f"Stage '{name}' already added.")
+        missing = [dep for dep in after if dep not in known]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {missing}")
+        key = None
+        if params is not None:
+            key = stage_key(name, params, tuple(known[dep].key for dep in after))
+        self._stages.append(_Stage(name, fn, args, tuple(after), key, memoize))
+
+    def key(self, name: str) -> str | None:
+        return next(s.key for s in self._stages if s.name == name)
+
+    def derive_key(self, name: str, params: dict, after: tuple[str, ...] = ()) -> str | None:
+        """Key for work done outside the scheduler that depends on these stages."""
+        return stage_key(name, params, tuple(self.key(dep) for dep in after))
+
+    def _plan(self, targets: tuple[str, ...] | None) -> tuple[list[_Stage], dict[str, Any]]:
+        """(stages to run, reused results): walk back from the targets, stopping at memo hits."""
+        reused: dict[str, Any] = {}
+        if self.memo is not None:
+            for stage in self._stages:
+                if stage.key is not None and stage.memoize:
+                    found, value = self.memo.lookup(stage.key)
+                    if found:
+                        reused[stage.name] = value
+        by_name = {s.name: s for s in self._stages}
+        needed = set(targets if targets is not None else by_name)
+        for stage in reversed(self._stages):  # reverse topological order
+            if stage.name in needed and stage.name not in reused:
+                needed.update(stage.after)
+        to_run = [s for s in self._stages if s.name in needed and s.name not in reused]
+        used = {s.name for s in to_run} | {dep for s in to_run for dep in s.after}
+        return to_run, {n: v for n, v in reused.items() if n in used or n in needed}
+
+    def run(self, targets: tuple[str, ...] | None = None) -> dict[str, Any]:
+        """
+        Run the stages `targets` need (default: all); re-raises the first
+        failure once nothing else is running.
+        """
+        t0 = time.perf_counter()
+        to_run, reused = self._plan(targets)
+        self.reused = set(reused)
+        self.results.update(reused)
+        futures: dict[str, Future] = {}
+        for name, value in reused.items():
+            futures[name] = Future()
+            futures[name].set_result(value)
+
+        def call(stage: _Stage):
+            deps = {dep: futures[dep].result() for dep in stage.after}
+            started = time.perf_counter()
+            try:
+                return stage.fn(*stage.args, **deps)
+            finally:
+                ended = time.perf_counter()
+                self.timings[stage.name] = StageTiming(started - t0, ended - started)
+
+        # One thread per stage: a stage blocked on its deps never starves them.
+        with ThreadPoolExecutor(max_workers=max(len(to_run), 1),
+                                thread_name_prefix="stage") as pool:
+            for stage in to_run:  # insertion order is a valid topological order
+                futures[stage.name] = pool.submit(call, stage)
+            done, pending = wait([futures[s.name] for s in to_run], return_when=FIRST_EXCEPTION)
+            for fut in pending:
+                fut.cancel()
+
+        self.wall_seconds = time.perf_counter() - t0
+        for stage in to_run:
+            fut = futures[stage.name]
+            if not fut.cancelled() and fut.exception() is not None:
+                raise fut.exception()
+            if not fut.cancelled():
+                self.results[stage.name] = fut.result()
+                if self.memo is not None and stage.key is not None and stage.memoize:
+                    self.memo.store(stage.key, self.results[stage.name])
+        return self.results
+
+    def status(self) -> dict[str, str]:
+        """Per stage: 'ran', 'reused' (from the memo) or 'skipped' (not needed)."""
+        return {
+            s.name: REUSED if s.name in self.reused else RAN if s.name in self.timings else SKIPPED
+            for s in self._stages
+        }
+
+    def breakdown(self) -> dict[str, float]:
+        """Per-stage seconds plus total wall time, for display/logging."""
+        out = {name: round(t.seconds, 3) for name, t in self.timings.items()}
+        out["wall"] = round(self.wall_seconds, 3)
+        return out
@@ -0,0 +1,154 @@
+import random
+import time
+from types import SimpleNamespace
+
+from alignment import (
+    UNKNOWN_SPEAKER,
+    SpeakerTranscript,
+    Turn,
+    align_segments,
+    assign_speakers,
+    turns_from_annotation,
+)
+from processor import CastScriptResult
+from transcript import Transcript
+
+
+def brute_force(items, turns):
+    """The O(n * m) reference: largest overlap wins, earliest turn on ties."""
+    ordered = sorted(turns, key=lambda t: t.start)
+    out = []
+    for start, end in items:
+        best, best_overlap = UNKNOWN_SPEAKER, 0.0
+        for turn in ordered:
+            overlap = min(end, turn.end) - max(start, turn.start)
+            if overlap > best_overlap:
+                best, best_overlap = turn.speaker, overlap
+        out.append(best)
+    return out
+
+
+def random_timeline(rng, n_turns, n_items, duration):
+    turns = []
+    for _ in range(n_turns):
+        start = rng.uniform(0, duration)
+        turns.append(Turn(start, start + rng.uniform(0.2, 8.0), f"SPEAKER_{rng.randrange(6):02d}"))
+    items = []
+    for _ in range(n_items):
+        start = rng.uniform(0, duration)
+        items.append((start, start + rng.uniform(0.1, 6.0)))
+    return turns, items
+
+
+class FakeSegment:
+    def __init__(self, start, end):
+        self.start, self.end = start, end
+
+
+class FakeAnnotation:
+    def __init__(self, tracks):
+        self.tracks = tracks
+
+    def itertracks(self, yield_label=False):
+        for i, (start, end, label) in enumerate(self.tracks):
+            yield FakeSegment(start, end), i, label
+
+
+class TestAssignSpeakers:
+
+    def test_largest_overlap_wins(self):
+        turns = [Turn(0.0, 2.0, "A"), Turn(1.5, 5.0, "B")]
+        assert assign_speakers([(0.5, 1.8), (1.0, 4.0)], turns) == ["A", "B"]
+
+    def test_gap_is_unknown(self):
+        turns = [Turn(0.0, 1.0, "A"), Turn(5.0, 6.0, "B")]
+        assert assign_speakers([(2.0, 3.0)], turns) == [UNKNOWN_SPEAKER]
+
+    def test_touching_intervals_do_not_overlap(self):
+        assert assign_speakers([(1.0, 2.0)], [Turn(0.0, 1.0, "A")]) == [UNKNOWN_SPEAKER]
+
+    def test_results_follow_input_order(self):
+        turns = [Turn(0.0, 1.0, "A"), Turn(1.0, 2.0, "B")]
+        assert assign_speakers([(1.2, 1.8), (0.1, 0.9)], turns) == ["B", "A"]
+
+    def test_matches_brute_force_on_random_timelines(self):
+        rng = random.Random(13)
+        for _ in range(50):
+            turns, items = random_timeline(rng, rng.randrange(0, 60), rng.randrange(0, 60), 120.0)
+            assert assign_speakers(items, turns) == brute_force(items, turns)
+
+    def test_thousands_of_turns_align_quickly(self):
+        # ~3 hours: 6000 turns, 4000 segments
+        rng = random.Random(7)
+        turns, items = random_timeline(rng, 6000, 4000, 3 * 3600.0)
+
+        started = time.perf_counter()
+        assign_speakers(items, turns)
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.5
+
+
+class TestAlignSegments:
+
+    def test_segment_level(self):
+        segments = [
+            {"start": 0.0, "end": 2.0, "text": " Hello."},
+            {"start": 2.0, "end": 4.0, "text": " Hi there."},
+        ]
+        turns = [Turn(0.0, 2.1, "SPEAKER_00"), Turn(2.1, 4.0, "SPEAKER_01")]
+
+        transcript = align_segments(segments, turns)
+
+        assert [l.speaker for l in transcript.lines] == ["SPEAKER_00", "SPEAKER_01"]
+        assert transcript.render() == "[0.0s] SPEAKER_00: Hello.\n[2.0s] SPEAKER_01: Hi there."
+
+    def test_words_split_a_segment_at_speaker_change(self):
+        segments = [{
+            "start": 0.0, "end": 3.0, "text": " Are you coming? No.",
+            "words": [
+                {"start": 0.0, "end": 0.4, "word": " Are"},
+                {"start": 0.4, "end": 0.7, "word": " you"},
+                {"start": 0.7, "end": 1.5, "word": " coming?"},
+                {"start": 2.2, "end": 2.6, "word": " No."},
+            ],
+        }]
+        turns = [Turn(0.0, 1.6, "A"), Turn(2.0, 3.0, "B")]
+
+        transcript = align_segments(segments, turns)
+
+        assert [(l.speaker, l.text) for l in transcript.lines] == [("A", " Are you coming?"), ("B", " No.")]
+        assert transcript.lines[0].end == 1.5
+        assert transcript.speakers == ["A", "B"]
+
+    def test_turns_from_annotation(self):
+        annotation = FakeAnnotation([(0.0, 1.5, "SPEAKER_00"), (1.5, 3.0, "SPEAKER_01")])
+        assert turns_from_annotation(annotation) == [
+            Turn(0.0, 1.5, "SPEAKER_00"), Turn(1.5, 3.0, "SPEAKER_01"),
+        ]
+
+    def test_turns_from_pyannote4_output(self):
+        # pyannote 4 pipelines wrap the Annotation in a DiarizeOutput
+        output = SimpleNamespace(speaker_diarization=FakeAnnotation([(0.0, 2.0, "SPEAKER_00")]))
+        assert turns_from_annotation(output) == [Turn(0.0, 2.0, "SPEAKER_00")]
+
+
+class TestResultPromptTranscript:
+
+    def test_prefers_speaker_labels(self):
+        segments = [{"start": 0.0, "end": 1.0, "text": " Hi."}]
+        result = CastScriptResult(
+            transcript_text="Hi.", diarization=None, segments=segments,
+            speaker_transcript=align_segments(segments, [Turn(0.0, 1.0, "A")]),
+        )
+        assert result.prompt_transcript == "[0.0s] A: Hi."
+
+    def test_falls_back_to_segments_then_text(self):
+        segments = [{"start": 0.0, "end": 1.0, "text": " Hi."}]
+        result = CastScriptResult("Hi.", None, segments=Transcript.from_segments(segments))
+        assert result.prompt_transcript == "[0.0s]  Hi."
+        assert CastScriptResult("Hi.", None).prompt_transcript == "Hi."
+
+    def test_empty_speaker_transcript_is_ignored(self):
+        result = CastScriptResult("Hi.", None, speaker_transcript=SpeakerTranscript())
+        assert result.prompt_transcript == "Hi."
@@ -0,0 +1,157 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from batch import (
+    BatchRunner, Episode, complete_rewrite, discover, init_cpu_worker, load_manifest, main, slugify,
+)
+from pov_rewrite import RewriteChunk
+
+
+class FakeStages:
+    """Transcribe/rewrite stand-ins that record what ran."""
+
+    def __init__(self, fail_transcribe=(), fail_rewrite=()):
+        self.transcribed = []
+        self.rewritten = []
+        self.fail_transcribe = set(fail_transcribe)
+        self.fail_rewrite = set(fail_rewrite)
+        self._lock = threading.Lock()
+
+    def transcribe(self, video_path, out_path, whisper_model, chunked):
+        if Path(video_path).stem in self.fail_transcribe:
+            raise RuntimeError("ffmpeg failed")
+        with self._lock:
+            self.transcribed.append(Path(video_path).stem)
+        Path(out_path).write_text(f"transcript of {Path(video_path).stem}")
+        return out_path
+
+    def rewrite(self, transcript_path, episode, character):
+        if character in self.fail_rewrite:
+            raise RuntimeError("quota")
+        with self._lock:
+            self.rewritten.append((episode.title, character))
+        return f"{character}: {Path(transcript_path).read_text()}"
+
+
+def season(tmp_path, n=3):
+    folder = tmp_path / "season"
+    folder.mkdir()
+    for i in range(1, n + 1):
+        (folder / f"S01E0{i}.mp4").write_bytes(b"video")
+    (folder / "notes.txt").write_text("not a video")
+    return folder
+
+
+def runner(tmp_path, stages, characters=("Roman", "Alex")):
+    return BatchRunner(str(tmp_path / "out"), list(characters), cpu_workers=2, llm_concurrency=3,
+                       transcribe=stages.transcribe, rewrite=stages.rewrite,
+                       cpu_pool=ThreadPoolExecutor(2), log=None)
+
+
+class TestInputs:
+
+    def test_discover_lists_videos_in_order(self, tmp_path):
+        episodes = discover(str(season(tmp_path)), show="Wizards")
+        assert [e.title for e in episodes] == ["S01E01", "S01E02", "S01E03"]
+        assert episodes[0].prompt_cast_info() == "Show: Wizards\nEpisode: S01E01"
+
+    def test_manifest_resolves_relative_paths(self, tmp_path):
+        manifest = tmp_path / "season.json"
+        manifest.write_text(json.dumps({
+            "show": "Wizards",
+            "characters": ["Roman"],
+            "episodes": [{"path": "season/ep1.mp4", "title": "S01E01", "cast_info": "Roman, Alex"}],
+        }))
+        episodes, characters = load_manifest(str(manifest))
+        assert characters == ["Roman"]
+        assert episodes[0].path == str(tmp_path / "season" / "ep1.mp4")
+        assert episodes[0].prompt_cast_info() == "Roman, Alex"
+
+    def test_slugify(self):
+        assert slugify("Roman (S1)") == "roman-s1"
+        assert slugify("???") == "untitled"
+
+
+class TestBatchRunner:
+
+    def test_transcribes_once_per_episode_and_fans_out(self, tmp_path):
+        stages = FakeStages()
+        report = runner(tmp_path, stages).run(discover(str(season(tmp_path))))
+
+        assert report.ok
+        assert sorted(stages.transcribed) == ["S01E01", "S01E02", "S01E03"]
+        assert len(stages.rewritten) == 6
+        out = tmp_path / "out" / "s01e02" / "alex.md"
+        assert out.read_text() == "Alex: transcript of S01E02"
+
+    def test_rerun_skips_finished_work(self, tmp_path):
+        episodes = discover(str(season(tmp_path)))
+        runner(tmp_path, FakeStages()).run(episodes)
+
+        stages = FakeStages()
+        report = runner(tmp_path, stages).run(episodes)
+        assert stages.transcribed == [] and stages.rewritten == []
+        assert len(report.skipped) == 6
+
+    def test_resume_reuses_transcript_for_new_character(self, tmp_path):
+        episodes = discover(str(season(tmp_path)))
+        runner(tmp_path, FakeStages(), characters=["Roman"]).run(episodes)
+
+        stages = FakeStages()
+        report = runner(tmp_path, stages, characters=["Roman", "Alex"]).run(episodes)
+        assert stages.transcribed == []
+        assert sorted(stages.rewritten) == [(e.title, "Alex") for e in episodes]
+        assert len(report.skipped) == 3
+
+    def test_failures_are_reported_not_fatal(self, tmp_path):
+        stages = FakeStages(fail_transcribe={"S01E02"}, fail_rewrite={"Alex"})
+        report = runner(tmp_path, stages).run(discover(str(season(tmp_path))))
+
+        assert not report.ok
+        assert set(report.failed) == {"s01e02", "s01e01/alex", "s01e03/alex"}
+        assert sorted(report.written) == ["s01e01/roman", "s01e03/roman"]
+        # Failed outputs are retried on the next run
+        assert not (tmp_path / "out" / "s01e01" / "alex.md").exists()
+
+    def test_duplicate_titles_are_rejected(self, tmp_path):
+        episodes = [Episode(path="a.mp4", title="Pilot"), Episode(path="b.mp4", title="pilot")]
+        with pytest.raises(ValueError):
+            runner(tmp_path, FakeStages()).run(episodes)
+
+
+def test_cli_requires_a_character(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        main([str(season(tmp_path)), "-o", str(tmp_path / "out")])
+    assert "--pov" in capsys.readouterr().err
+
+
+def test_cpu_workers_split_the_cores(monkeypatch):
+    import diarization
+
+    pinned = []
+    monkeypatch.setattr(diarization, "pin_torch_threads", pinned.append)
+    init_cpu_worker(3)
+    assert pinned == [3]
+
+
+class TestCompleteRewrite:
+
+    def test_parts_are_stitched(self):
+        chunks = [RewriteChunk(0, 2, 0.0, 60.0, text="One."), RewriteChunk(1, 2, 60.0, 120.0, text="Two.")]
+        assert complete_rewrite(chunks) == "One.\n\nTwo."
+
+    def test_a_failed_part_writes_nothing(self, tmp_path):
+        def rewrite(transcript_path, episode, character):
+            return complete_rewrite([RewriteChunk(0, 2, 0.0, 60.0, text="One."),
+                                     RewriteChunk(1, 2, 60.0, 120.0, error="ServerError: 503")])
+
+        stages = FakeStages()
+        stages.rewrite = rewrite
+        report = runner(tmp_path, stages, characters=("Roman",)).run(discover(str(season(tmp_path, n=1))))
+
+        assert "part 2: ServerError: 503" in report.failed["s01e01/roman"]
+        assert not (tmp_path / "out" / "s01e01" / "roman.md").exists()
@@ -0,0 +1,91 @@
+import wave
+
+import numpy as np
+import pytest
+
+from chunking import (
+    Chunk,
+    FRAME_SECONDS,
+    frame_energy,
+    load_wav,
+    plan_chunks,
+    stitch_segments,
+)
+
+
+class TestChunkPlanning:
+
+    def test_short_audio_is_single_chunk(self):
+        chunks = plan_chunks([0.5] * 100, duration=2.0)
+        assert chunks == [Chunk(0, 0.0, 2.0)]
+
+    def test_23_minute_episode_uses_5_minute_windows(self):
+        duration = 1380
+        energy = [0.5] * int(duration / FRAME_SECONDS)
+        chunks = plan_chunks(energy, duration)
+
+        assert len(chunks) == 5
+        assert all(c.end - c.start <= 300 for c in chunks)
+        assert chunks[0].start == 0.0
+        assert chunks[-1].end == duration
+
+    def test_cuts_land_on_silence(self):
+        duration = 700
+        energy = [0.5] * int(duration / FRAME_SECONDS)
+        silent_frame = int(290 / FRAME_SECONDS)
+        energy[silent_frame] = 0.0
+
+        chunks = plan_chunks(energy, duration)
+
+        assert chunks[0].end == pytest.approx(290 + FRAME_SECONDS / 2)
+        # Neighbours overlap so no audio is lost at the cut.
+        assert chunks[1].start < chunks[0].end
+
+    def test_windows_cover_whole_timeline(self):
+        duration = 3600
+        rng = np.random.default_rng(0)
+        energy = rng.random(int(duration / FRAME_SECONDS))
+        chunks = plan_chunks(energy, duration)
+
+        for prev, nxt in zip(chunks, chunks[1:]):
+            assert nxt.start <= prev.end
+        assert chunks[-1].end == duration
+
+
+class TestStitching:
+
+    def test_overlap_duplicates_removed(self):
+        a = Chunk(0, 0.0, 300.0)
+        b = Chunk(1, 298.0, 500.0)
+        seg_a = [
+            {"start": 290.0, "end": 297.5, "text": " Hello there."},
+            {"start": 298.2, "end": 299.8, "text": " Wait!"},
+        ]
+        seg_b = [
+            {"start": 298.3, "end": 299.9, "text": " Wait!"},
+            {"start": 301.0, "end": 303.0, "text": " Next line."},
+        ]
+
+        merged = stitch_segments([(b, seg_b), (a, seg_a)])
+
+        assert [s["text"] for s in merged] == [" Hello there.", " Wait!", " Next line."]
+        assert [s["start"] for s in merged] == sorted(s["start"] for s in merged)
+
+
+class TestWavHelpers:
+
+    def test_load_slice_and_energy(self, tmp_path):
+        rate = 16000
+        samples = np.concatenate([np.zeros(rate), np.full(rate, 0.5)])
+        path = tmp_path / "tone.wav"
+        with wave.open(str(path), "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(rate)
+            wf.writeframes((samples * 32767).astype("<i2").tobytes())
+
+        second_half = load_wav(str(path), start=1.0)
+        assert len(second_half) == rate
+        energy = frame_energy(load_wav(str(path)))
+        assert energy[0] == 0.0
+        assert energy[-1] == pytest.approx(0.5, abs=1e-3)
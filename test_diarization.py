@@ -0,0 +1,148 @@
+import time
+
+import numpy as np
+import pytest
+
+from diarization import DiarizationWorker, split_cpus
+from model_registry import ModelRegistry
+from pcm import SAMPLE_RATE
+from processor import CastScriptEngine
+
+STAGE_SECONDS = 0.6
+
+
+class FakeSegment:
+    def __init__(self, start, end):
+        self.start, self.end = start, end
+
+
+class FakeAnnotation:
+    def __init__(self, tracks):
+        self.tracks = tracks
+
+    def itertracks(self, yield_label=False):
+        for i, (start, end, label) in enumerate(self.tracks):
+            yield FakeSegment(start, end), i, label
+
+
+class SleepyPipeline:
+    """Stand-in for pyannote: one speaker for the whole clip, after a fixed delay."""
+
+    def __call__(self, inputs):
+        time.sleep(STAGE_SECONDS)
+        return FakeAnnotation([(0.0, len(inputs) / SAMPLE_RATE, "SPEAKER_00")])
+
+
+def load_sleepy_pipeline():
+    return SleepyPipeline()
+
+
+class ShapelessPipeline:
+    """Returns something alignment cannot read."""
+
+    def __call__(self, inputs):
+        return object()
+
+
+def load_shapeless_pipeline():
+    return ShapelessPipeline()
+
+
+def load_broken_pipeline():
+    raise RuntimeError("gated model")
+
+
+class SleepyWhisper:
+
+    def transcribe(self, audio, **options):
+        time.sleep(STAGE_SECONDS)
+        seconds = len(audio) / SAMPLE_RATE
+        return {"text": " Hello.", "segments": [{"start": 0.0, "end": seconds, "text": " Hello."}]}
+
+
+class InMemoryEngine(CastScriptEngine):
+    """Skips ffmpeg: one second of silence written to the job's scratch file."""
+
+    def load_audio(self, input_path, content_hash, workspace):
+        path = workspace.file("audio.f32")
+        np.zeros(SAMPLE_RATE, dtype=np.float32).tofile(path)
+        return np.memmap(path, dtype=np.float32, mode="c")
+
+
+class TestSplitCpus:
+
+    def test_even_split(self):
+        assert split_cpus(0.5, total=8) == (4, 4)
+
+    def test_each_side_keeps_a_core(self):
+        assert split_cpus(0.0, total=8) == (1, 7)
+        assert split_cpus(1.0, total=8) == (7, 1)
+
+    def test_single_core_host(self):
+        assert split_cpus(0.5, total=1) == (1, 1)
+
+
+class TestParallelDiarization:
+
+    @pytest.fixture
+    def worker(self):
+        worker = DiarizationWorker(loader=load_sleepy_pipeline)
+        worker.warm(timeout=60)
+        yield worker
+        worker.close()
+
+    def test_latency_is_max_not_sum(self, worker, tmp_path):
+        engine = InMemoryEngine(chunk_seconds=None, diarizer=worker,
+                                models=ModelRegistry(loader=lambda name: SleepyWhisper()))
+        clip = tmp_path / "clip.mp4"
+        clip.write_bytes(b"\0")
+
+        started = time.perf_counter()
+        result = engine.process_video_or_url(str(clip))
+        elapsed = time.perf_counter() - started
+
+        assert result.diarization_error is None
+        assert result.speaker_transcript.render() == "[0.0s] SPEAKER_00: Hello."
+        assert elapsed < 2 * STAGE_SECONDS * 0.9
+
+    def test_load_failure_is_reported_not_raised(self, tmp_path):
+        worker = DiarizationWorker(loader=load_broken_pipeline)
+        try:
+            engine = InMemoryEngine(chunk_seconds=None, diarizer=worker,
+                                    models=ModelRegistry(loader=lambda name: SleepyWhisper()))
+            clip = tmp_path / "clip.mp4"
+            clip.write_bytes(b"\0")
+
+            result = engine.process_video_or_url(str(clip))
+        finally:
+            worker.close()
+
+        assert result.transcript_text == "Hello."
+        assert result.diarization is None
+        assert result.diarization_error.startswith("Diarization failed")
+        assert "Failed to load pyannote pipeline: RuntimeError: gated model" in result.diarization_error
+
+    def test_load_error_survives_later_jobs(self):
+        worker = DiarizationWorker(loader=load_broken_pipeline)
+        try:
+            for _ in range(2):
+                with pytest.raises(RuntimeError, match="gated model"):
+                    worker.warm(timeout=60)
+        finally:
+            worker.close()
+
+    def test_alignment_failure_keeps_the_transcript(self, tmp_path):
+        worker = DiarizationWorker(loader=load_shapeless_pipeline)
+        try:
+            engine = InMemoryEngine(chunk_seconds=None, diarizer=worker,
+                                    models=ModelRegistry(loader=lambda name: SleepyWhisper()))
+            clip = tmp_path / "clip.mp4"
+            clip.write_bytes(b"\0")
+
+            result = engine.process_video_or_url(str(clip))
+        finally:
+            worker.close()
+
+        assert result.transcript_text == "Hello."
+        assert result.speaker_transcript is None
+        assert result.diarization_error.startswith("Speaker alignment failed")
@@ -0,0 +1,86 @@
+import hashlib
+import io
+import os
+import struct
+
+import pytest
+
+from ingest import IngestError, Mp4Probe, ingest_stream
+
+
+def box(kind: bytes, body: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def track(handler: bytes, codec: bytes) -> bytes:
+    hdlr = box(b"hdlr", b"\x00" * 8 + handler + b"\x00" * 12)
+    stsd = box(b"stsd", b"\x00" * 4 + struct.pack(">I", 1) + struct.pack(">I4s", 16, codec) + b"\x00" * 8)
+    stbl = box(b"stbl", stsd)
+    return box(b"trak", box(b"mdia", hdlr + box(b"minf", stbl)))
+
+
+def fake_mp4(tracks=((b"vide", b"avc1"), (b"soun", b"mp4a")), seconds=1380, mdat_bytes=50_000) -> bytes:
+    mvhd = box(b"mvhd", b"\x00" * 12 + struct.pack(">II", 1000, seconds * 1000) + b"\x00" * 80)
+    moov = box(b"moov", mvhd + b"".join(track(h, c) for h, c in tracks))
+    return box(b"ftyp", b"isom" + b"\x00" * 4) + box(b"mdat", b"\xAB" * mdat_bytes) + moov
+
+
+class TestMp4Probe:
+
+    @pytest.mark.parametrize("chunk", [3, 7, 64, 1 << 20])
+    def test_probe_across_chunk_boundaries(self, chunk):
+        data = fake_mp4()
+        probe = Mp4Probe()
+        for i in range(0, len(data), chunk):
+            probe.feed(data[i:i + chunk])
+
+        assert probe.moov_parsed
+        assert probe.info.brand == "isom"
+        assert probe.info.duration == pytest.approx(1380)
+        assert probe.info.tracks == ["vide", "soun"]
+        assert probe.info.codecs == ["avc1", "mp4a"]
+
+    def test_rejects_non_mp4_header(self):
+        probe = Mp4Probe()
+        with pytest.raises(IngestError):
+            probe.feed(b"PK\x03\x04" + b"\x00" * 100)
+
+
+class TestIngestStream:
+
+    def test_copy_hash_and_probe_in_one_pass(self, tmp_path):
+        data = fake_mp4()
+        result = ingest_stream(io.BytesIO(data), dest_dir=str(tmp_path), chunk_size=4096)
+
+        try:
+            assert result.size == len(data)
+            assert result.sha256 == hashlib.sha256(data).hexdigest()
+            assert result.probe.has_video
+            with open(result.path, "rb") as f:
+                assert f.read() == data
+        finally:
+            os.remove(result.path)
+
+    def test_declared_oversize_rejected_before_copy(self, tmp_path):
+        src = io.BytesIO(fake_mp4())
+        with pytest.raises(IngestError):
+            ingest_stream(src, dest_dir=str(tmp_path), max_bytes=1000, declared_size=10_000)
+        assert src.tell() == 0
+        assert list(tmp_path.iterdir()) == []
+
+    def test_streamed_oversize_aborts_and_cleans_up(self, tmp_path):
+        with pytest.raises(IngestError):
+            ingest_stream(io.BytesIO(fake_mp4()), dest_dir=str(tmp_path), max_bytes=10_000, chunk_size=1024)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_non_video_rejected_on_first_chunk(self, tmp_path):
+        src = io.BytesIO(b"%PDF-1.7" + b"\x00" * 100_000)
+        with pytest.raises(IngestError):
+            ingest_stream(src, dest_dir=str(tmp_path), chunk_size=1024)
+        assert src.tell() == 1024
+        assert list(tmp_path.iterdir()) == []
+
+    def test_audio_only_rejected(self, tmp_path):
+        data = fake_mp4(tracks=((b"soun", b"mp4a"),))
+        with pytest.raises(IngestError, match="no video"):
+            ingest_stream(io.BytesIO(data), dest_dir=str(tmp_path))
@@ -0,0 +1,141 @@
+import sqlite3
+import time
+
+import jobs
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue, WorkerPool, worker_loop
+
+
+class TestJobQueue:
+
+    def test_submit_claim_complete(self, tmp_path):
+        queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+        job_id = queue.submit("pov", {"pov": "Roman"})
+
+        assert queue.get(job_id).status == QUEUED
+        job = queue.claim()
+        assert job.id == job_id and job.status == RUNNING
+        assert queue.claim() is None
+
+        queue.complete(job_id, {"novel": "..."})
+        done = queue.get(job_id)
+        assert done.status == DONE and done.result == {"novel": "..."}
+        assert not done.active
+
+    def test_claims_are_fifo_and_exclusive(self, tmp_path):
+        queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+        ids = [queue.submit("pov", {"n": i}) for i in range(5)]
+
+        claimed = [queue.claim().id for _ in range(5)]
+
+        assert claimed == ids
+
+    def test_jobs_with_a_lapsed_heartbeat_are_requeued(self, tmp_path):
+        queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+        job_id = queue.submit("pov", {})
+        queue.claim(worker_pid=12345)  # a worker on another host: its pid means nothing here
+
+        assert queue.requeue_orphans(lease_seconds=60, now=time.time() + 61) == 1
+        assert queue.get(job_id).status == QUEUED
+
+    def test_live_worker_job_kept(self, tmp_path):
+        queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+        job_id = queue.submit("pov", {})
+        queue.claim(worker_pid=12345)
+        assert queue.requeue_orphans(lease_seconds=60) == 0
+
+        with queue.heartbeat(job_id, interval=0.01):
+            time.sleep(0.1)
+        assert queue.get(job_id).heartbeat > queue.get(job_id).started
+        assert queue.requeue_orphans(lease_seconds=0.05, now=queue.get(job_id).heartbeat) == 0
+
+    def test_job_that_keeps_losing_its_worker_is_failed(self, tmp_path):
+        queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+        job_id = queue.submit("pov", {})
+        for attempt in range(1, 4):
+            assert queue.claim().attempts == attempt
+            requeued = queue.requeue_orphans(lease_seconds=60, now=time.time() + 61, max_attempts=3)
+            assert requeued == (1 if attempt < 3 else 0)
+
+        job = queue.get(job_id)
+        assert job.status == FAILED and "3 times" in job.error
+
+    def test_stale_claim_cannot_finish_the_job(self, tmp_path):
+        queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+        job_id = queue.submit("pov", {})
+        stale = queue.claim()
+        queue.requeue_orphans(lease_seconds=60, now=time.time() + 61)
+        current = queue.claim()
+
+        assert not queue.touch(job_id, stale.owner)
+        assert not queue.complete(job_id, {"novel": "late"}, owner=stale.owner)
+        assert not queue.fail(job_id, "late", owner=stale.owner)
+        assert queue.get(job_id).status == RUNNING
+
+        assert queue.complete(job_id, {"novel": "ok"}, owner=current.owner)
+        assert queue.get(job_id).result == {"novel": "ok"}
+
+    def test_queue_from_before_heartbeats_is_migrated(self, tmp_path):
+        db = tmp_path / "jobs.sqlite"
+        with sqlite3.connect(db) as conn:
+            conn.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                         "payload TEXT NOT NULL, result TEXT, error TEXT, created REAL NOT NULL, "
+                         "started REAL, finished REAL, worker_pid INTEGER)")
+        queue = JobQueue(str(db))
+        queue.submit("pov", {})
+        job = queue.claim()
+        assert job.heartbeat is not None and job.attempts == 1 and job.owner
+
+
+class TestWorkerLoop:
+
+    def test_runs_handlers_and_records_failures(self, tmp_path, monkeypatch):
+        db = str(tmp_path / "jobs.sqlite")
+        queue = JobQueue(db)
+        seen_engines = []
+
+        def echo(payload, engines):
+            seen_engines.append(id(engines))
+            if payload.get("boom"):
+                raise ValueError("bad input")
+            return {"echo": payload["x"]}
+
+        monkeypatch.setitem(jobs.HANDLERS, "echo", echo)
+        ok = queue.submit("echo", {"x": 1})
+        bad = queue.submit("echo", {"boom": True})
+
+        assert worker_loop(db, max_jobs=10) == 2
+
+        assert queue.get(ok).result == {"echo": 1}
+        assert queue.get(bad).status == FAILED
+        assert "bad input" in queue.get(bad).error
+        # Engines are reused across jobs within one worker.
+        assert len(set(seen_engines)) == 1
+
+    def test_engine_options_reach_the_handler(self, tmp_path, monkeypatch):
+        db = str(tmp_path / "jobs.sqlite")
+        seen = []
+        monkeypatch.setitem(jobs.HANDLERS, "opts", lambda payload, engines: seen.append(dict(jobs._engine_options)))
+        JobQueue(db).submit("opts", {})
+
+        worker_loop(db, max_jobs=1, engine_options={"chunk_seconds": None})
+        assert seen == [{"chunk_seconds": None}]
+
+
+def test_pool_workers_do_not_chunk_and_share_the_cores(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs.os, "cpu_count", lambda: 8)
+    pool = WorkerPool(str(tmp_path / "jobs.sqlite"), workers=4)
+    assert pool.engine_options == {"chunk_seconds": None}
+    assert pool.threads == 2
+
+
+def test_pool_replaces_dead_workers(tmp_path):
+    pool = WorkerPool(str(tmp_path / "jobs.sqlite"), workers=1, start_method="spawn")
+    pool._procs = [pool._ctx.Process(target=time.sleep, args=(0,))]
+    pool._procs[0].start()
+    pool._procs[0].join()
+    dead = pool._procs[0]
+
+    assert pool.respawn() == 1
+    assert pool._procs[0] is not dead and pool.alive() == 1
+    pool.stop(timeout=30)
+    assert pool.alive() == 0
@@ -0,0 +1,112 @@
+import shutil
+import subprocess
+
+import pytest
+
+from keyframes import (
+    MIME_TYPE, Keyframe, KeyframeError, VisualDigest, build_digest, extract_candidates,
+    keyframes_command, label_frames, parse_showinfo, select_keyframes,
+)
+
+SHOWINFO = """\
+[Parsed_showinfo_2 @ 0x55d] config in time_base: 1/25, frame_rate: 25/1
+[Parsed_showinfo_2 @ 0x55d] n:   0 pts:      0 pts_time:0       duration:1 fmt:yuvj420p
+[Parsed_showinfo_2 @ 0x55d] n:   1 pts:    300 pts_time:12      duration:1 fmt:yuvj420p
+frame=    2 fps=0.0 q=5.0 size=N/A time=00:00:12.00
+[Parsed_showinfo_2 @ 0x55d] n:   2 pts:    763 pts_time:30.52   duration:1 fmt:yuvj420p
+"""
+
+
+def frames_at(*times):
+    return [Keyframe(time=float(t), data=b"x" * 100) for t in times]
+
+
+class TestCommand:
+
+    def test_scene_select_with_interval_fallback(self):
+        cmd = keyframes_command("ep.mp4", "out/kf_%05d.jpg", threshold=0.4, width=320, max_interval=20)
+        vf = cmd[cmd.index("-vf") + 1]
+        assert "gt(scene\\,0.4)" in vf and "gte(t-prev_selected_t\\,20)" in vf
+        assert "scale=320:-2" in vf and vf.endswith("showinfo")
+        assert cmd[-2] == "out/kf_%05d.jpg"
+
+    def test_parse_showinfo(self):
+        assert parse_showinfo(SHOWINFO) == [0.0, 12.0, 30.52]
+
+
+class TestSelect:
+
+    def test_under_budget_keeps_everything(self):
+        candidates = frames_at(0, 10, 20)
+        assert select_keyframes(candidates, budget=5) == candidates
+
+    def test_budget_and_order(self):
+        picked = select_keyframes(frames_at(*range(0, 100, 2)), budget=8)
+        times = [f.time for f in picked]
+        assert len(picked) == 8 and times == sorted(times)
+
+    def test_frames_follow_the_dialogue(self):
+        # All the talking happens in the last third
+        starts = [float(t) for t in range(60, 90)]
+        picked = select_keyframes(frames_at(*range(0, 90, 3)), budget=6, segment_starts=starts)
+        assert all(f.time >= 57 for f in picked)
+
+    def test_no_budget(self):
+        assert select_keyframes(frames_at(1, 2), budget=0) == []
+
+
+class TestDigest:
+
+    def test_labels_use_the_containing_line(self):
+        frames = label_frames(frames_at(1, 12.5, 40), [0.0, 12.5, 30.0])
+        assert [f.label for f in frames] == ["[0.0s]", "[12.5s]", "[30.0s]"]
+
+    def test_labelling_leaves_shared_candidates_alone(self):
+        candidates = frames_at(5, 25)
+        first = build_digest(None, None, segment_starts=[0.0, 20.0], candidates=candidates)
+        second = build_digest(None, None, segment_starts=[4.0], candidates=candidates)
+
+        assert [f.label for f in first.frames] == ["[0.0s]", "[20.0s]"]
+        assert [f.label for f in second.frames] == ["[4.0s]", "[4.0s]"]
+        assert [f.label for f in candidates] == ["", ""]
+
+    def test_contents_for_a_part(self):
+        digest = build_digest(None, None, segment_starts=[0.0, 20.0], budget=10,
+                              candidates=frames_at(5, 25, 45))
+        parts = digest.contents(lambda data, mime: (mime, len(data)), start=20.0, end=40.0)
+        assert parts == ["FRAME [20.0s]", (MIME_TYPE, 100)]
+        assert len(digest.contents(lambda d, m: d)) == 6
+        assert digest.nbytes == 300
+        assert digest.stats()["frames"] == 3
+
+    def test_empty_digest(self):
+        assert VisualDigest(frames=[]).contents(lambda d, m: d) == []
+
+
+def test_frame_and_timestamp_counts_must_match(tmp_path, monkeypatch):
+    def fake_ffmpeg(cmd, **kwargs):
+        for i in (1, 2):
+            (tmp_path / f"kf_{i:05d}.jpg").write_bytes(b"\xff\xd8")
+        return subprocess.CompletedProcess(cmd, 0, "", SHOWINFO)  # three timestamps
+
+    monkeypatch.setattr(subprocess, "run", fake_ffmpeg)
+    with pytest.raises(KeyframeError, match="2 frames but logged 3"):
+        extract_candidates("ep.mp4", str(tmp_path))
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_extract_candidates_from_video(tmp_path):
+    video = tmp_path / "cuts.mp4"
+    # Three 4-second solid-colour shots: a hard cut at 4 s and 8 s
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", "color=c=red:s=640x360:d=4:r=10",
+        "-f", "lavfi", "-i", "color=c=blue:s=640x360:d=4:r=10",
+        "-f", "lavfi", "-i", "color=c=white:s=640x360:d=4:r=10",
+        "-filter_complex", "[0][1][2]concat=n=3:v=1:a=0", str(video), "-y",
+    ], check=True)
+    frames = extract_candidates(str(video), str(tmp_path / "kf"), width=160)
+
+    assert [round(f.time) for f in frames] == [0, 4, 8]
+    assert all(f.data[:2] == b"\xff\xd8" for f in frames)  # JPEG
+    assert not list((tmp_path / "kf").iterdir())
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+
+import pytest
+
+from lazy import HEAVY_MODULES, LazyModule, heavy_modules_loaded
+
+
+class TestLazyModule:
+
+    def test_imports_on_first_attribute(self):
+        sys.modules.pop("colorsys", None)
+        mod = LazyModule("colorsys")
+        assert not mod.loaded and "colorsys" not in sys.modules
+        assert mod.installed()
+        assert mod.rgb_to_hsv(1, 0, 0)[0] == 0
+        assert mod.loaded
+
+    def test_missing_module(self):
+        mod = LazyModule("definitely_not_installed_pkg")
+        assert not mod.installed()
+        assert not mod.available()
+        with pytest.raises(ImportError, match="definitely_not_installed_pkg"):
+            mod.anything
+        assert isinstance(mod.error, ImportError)
+
+    def test_private_names_do_not_import(self):
+        mod = LazyModule("colorsys")
+        with pytest.raises(AttributeError):
+            mod.__wrapped__
+        assert not hasattr(mod, "_private")
+
+
+def test_processor_import_leaves_backends_unloaded():
+    pytest.importorskip("numpy")
+    pytest.importorskip("dotenv")
+    code = "import processor, lazy; print(','.join(lazy.heavy_modules_loaded()))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+def test_heavy_modules_loaded_reports_sys_modules(monkeypatch):
+    monkeypatch.setitem(sys.modules, HEAVY_MODULES[0], object())
+    assert HEAVY_MODULES[0] in heavy_modules_loaded()
@@ -0,0 +1,231 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from llm_gateway import (
+    LLMGateway,
+    TokenBucket,
+    retry_after_of,
+    status_of,
+    usage_of,
+)
+from tracing import MetricsStore
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class StatusError(Exception):
+
+    def __init__(self, code, retry_after=None):
+        super().__init__(f"status {code}")
+        self.code = code
+        self.retry_after = retry_after
+
+
+def response(text="ok", prompt=10, output=5):
+    return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(
+        prompt_token_count=prompt, candidates_token_count=output))
+
+
+def gateway(clock=None, **options):
+    clock = clock or FakeClock()
+    options.setdefault("rpm", 6000)
+    return LLMGateway(store=MetricsStore(), clock=clock, sleep=clock.sleep, rng=random.Random(0), **options)
+
+
+class TestTokenBucket:
+
+    def test_burst_then_steady_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, capacity=3, clock=clock, sleep=clock.sleep)
+        assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+        waits = [bucket.acquire() for _ in range(4)]
+        assert waits == pytest.approx([0.5] * 4)
+        assert clock.now == pytest.approx(2.0)
+
+    def test_idle_time_refills_up_to_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock, sleep=clock.sleep)
+        bucket.acquire(2)
+        clock.now += 100
+        assert bucket.acquire(2) == 0
+        assert bucket.acquire() == pytest.approx(1.0)
+
+
+class TestClassification:
+
+    def test_status_from_sdk_shaped_errors(self):
+        assert status_of(StatusError(429)) == 429
+        assert status_of(SimpleNamespace(response=SimpleNamespace(status_code=503))) == 503
+        assert status_of(ValueError("bad")) is None
+
+    def test_retry_after(self):
+        assert retry_after_of(StatusError(429, retry_after=7)) == 7.0
+        headers_error = SimpleNamespace(response=SimpleNamespace(headers={"Retry-After": "3"}))
+        assert retry_after_of(headers_error) == 3.0
+        assert retry_after_of(ValueError()) is None
+
+    def test_usage_from_sdk_and_rest(self):
+        assert usage_of(response(prompt=12, output=3)) == (12, 3)
+        assert usage_of({"usageMetadata": {"promptTokenCount": 4, "candidatesTokenCount": 2}}) == (4, 2)
+        assert usage_of(SimpleNamespace(text="x")) == (0, 0)
+
+
+class TestGateway:
+
+    def test_rate_limit_per_model(self):
+        clock = FakeClock()
+        gw = gateway(clock, rpm={"slow": 60, "*": 6000}, burst=1)
+        for _ in range(3):
+            gw.call("slow", response)
+        for _ in range(3):
+            gw.call("fast", response)
+        stats = gw.stats()
+        assert stats["slow"]["throttled_seconds"] == pytest.approx(2.0)
+        assert stats["fast"]["throttled_seconds"] == pytest.approx(0.02)
+
+    def test_retries_429_and_503_with_backoff(self):
+        clock = FakeClock()
+        gw = gateway(clock, retries=4, initial_delay=1.0, max_delay=8.0)
+        errors = [StatusError(429), StatusError(503)]
+
+        def flaky():
+            if errors:
+                raise errors.pop(0)
+            return response()
+
+        assert gw.call("m", flaky).text == "ok"
+        stats = gw.stats()["m"]
+        assert (stats["calls"], stats["errors"], stats["retries"]) == (3, 2, 2)
+        backoffs = [s for s in clock.sleeps if s >= 0.5]
+        assert len(backoffs) == 2 and all(s <= 8.0 for s in backoffs)
+
+    def test_retry_after_is_honoured(self):
+        clock = FakeClock()
+        gw = gateway(clock)
+        errors = [StatusError(429, retry_after=12)]
+
+        def throttled():
+            if errors:
+                raise errors.pop()
+            return response()
+
+        gw.call("m", throttled)
+        assert 12 in clock.sleeps
+
+    def test_client_errors_are_not_retried(self):
+        gw = gateway()
+        calls = []
+
+        def bad():
+            calls.append(1)
+            raise StatusError(400)
+
+        with pytest.raises(StatusError):
+            gw.call("m", bad)
+        assert len(calls) == 1
+
+    def test_gives_up_after_retries(self):
+        gw = gateway(retries=2)
+
+        def unavailable():
+            raise StatusError(503)
+
+        with pytest.raises(StatusError):
+            gw.call("m", unavailable)
+        assert gw.stats()["m"]["calls"] == 3
+
+    def test_in_flight_bound(self):
+        gw = LLMGateway(rpm=1e6, max_in_flight=2, store=MetricsStore())
+        lock = threading.Lock()
+        state = {"now": 0, "max": 0}
+
+        def slow():
+            with lock:
+                state["now"] += 1
+                state["max"] = max(state["max"], state["now"])
+            time.sleep(0.03)
+            with lock:
+                state["now"] -= 1
+            return response()
+
+        threads = [threading.Thread(target=gw.call, args=("m", slow)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert state["max"] == 2
+        assert gw.stats()["m"]["calls"] == 8
+
+    def test_token_and_latency_accounting(self):
+        store = MetricsStore()
+        gw = LLMGateway(rpm=1e6, store=store)
+        gw.call("m", response, prompt=100, output=40)
+        gw.call("m", response, prompt=50, output=10)
+        stats = gw.stats()["m"]
+        assert (stats["prompt_tokens"], stats["output_tokens"]) == (150, 50)
+        assert stats["mean_latency_seconds"] is not None
+        text = store.to_prometheus()
+        assert "pov_llm_seconds" in text and "pov_llm_tokens" in text
+
+
+class TestStream:
+
+    def test_retries_before_the_first_chunk_only(self):
+        gw = gateway()
+        attempts = []
+
+        def stream():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise StatusError(429)
+            yield SimpleNamespace(text="a")
+            yield response("b", prompt=7, output=2)
+
+        assert [p.text for p in gw.stream("m", stream)] == ["a", "b"]
+        stats = gw.stats()["m"]
+        assert (stats["retries"], stats["prompt_tokens"]) == (1, 7)
+
+    def test_mid_stream_failure_is_raised(self):
+        gw = gateway()
+
+        def stream():
+            yield SimpleNamespace(text="a")
+            raise StatusError(503)
+
+        with pytest.raises(StatusError):
+            list(gw.stream("m", stream))
+        assert gw.stats()["m"]["retries"] == 0
+
+    def test_closing_early_frees_the_slot_and_the_stream(self):
+        gw = gateway(max_in_flight=1)
+        closed = []
+
+        def stream():
+            try:
+                for i in range(100):
+                    yield SimpleNamespace(text=str(i))
+            finally:
+                closed.append(True)
+
+        pieces = gw.stream("m", stream)
+        next(pieces)
+        pieces.close()
+        assert closed == [True]
+        assert gw.call("m", response).text == "ok"  # the single slot is free again
+
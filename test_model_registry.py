@@ -0,0 +1,110 @@
+import threading
+import time
+
+from model_registry import ModelRegistry
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+
+
+def counting_loader(counter):
+    def load(name):
+        counter.append(name)
+        return FakeModel(name)
+    return load
+
+
+class TestModelRegistry:
+
+    def test_model_loaded_once_and_shared(self):
+        loads = []
+        registry = ModelRegistry(loader=counting_loader(loads))
+
+        first = registry.get("base")
+        second = registry.get("base")
+
+        assert first is second
+        assert loads == ["base"]
+        assert "load_seconds" in registry.stats()["models"]["base"]
+
+    def test_concurrent_first_use_loads_once(self):
+        loads = []
+
+        def slow_loader(name):
+            time.sleep(0.05)
+            loads.append(name)
+            return FakeModel(name)
+
+        registry = ModelRegistry(loader=slow_loader)
+        threads = [threading.Thread(target=registry.get, args=("base",)) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert loads == ["base"]
+
+    def test_max_models_evicts_lru(self):
+        registry = ModelRegistry(loader=counting_loader([]), max_models=2)
+        registry.get("tiny")
+        registry.get("base")
+        registry.get("tiny")  # base is now least recently used
+        registry.get("turbo")
+
+        assert set(registry.stats()["models"]) == {"tiny", "turbo"}
+        assert registry.unloads == 1
+
+    def test_leased_and_pinned_models_survive(self):
+        registry = ModelRegistry(loader=counting_loader([]), max_models=1, idle_timeout=0.01)
+        registry.keep_warm("tiny")
+
+        with registry.lease("base"):
+            registry.get("turbo")
+            time.sleep(0.02)
+            registry.unload_idle()
+            assert {"tiny", "base"} <= set(registry.stats()["models"])
+
+        registry.unload_idle(now=time.monotonic() + 1)
+        assert set(registry.stats()["models"]) == {"tiny"}
+
+    def test_idle_timeout_unloads(self):
+        registry = ModelRegistry(loader=counting_loader([]), idle_timeout=0.05)
+        registry.get("base")
+        deadline = time.monotonic() + 2
+        while registry.stats()["models"] and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        assert registry.stats()["models"] == {}
+
+    def test_leases_are_exclusive(self):
+        class NotReentrant:
+            """Like Whisper's decoder: one call at a time or the shared state is trashed."""
+
+            def __init__(self, name):
+                self.busy = False
+                self.overlaps = 0
+
+            def transcribe(self, audio):
+                if self.busy:
+                    self.overlaps += 1
+                self.busy = True
+                time.sleep(0.01)
+                self.busy = False
+                return {"text": audio}
+
+        registry = ModelRegistry(loader=NotReentrant)
+
+        def job(i):
+            with registry.lease("base") as model:
+                model.transcribe(str(i))
+
+        threads = [threading.Thread(target=job, args=(i,)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert registry.get("base").overlaps == 0
+        assert registry.stats()["models"]["base"]["leases"] == 0
@@ -0,0 +1,70 @@
+import os
+import time
+
+from monitor_performance import NdjsonRing, ProcessSampler, WindowedHealth, run_daemon
+
+
+class TestNdjsonRing:
+
+    def test_rotation_bounds_disk_usage(self, tmp_path):
+        ring = NdjsonRing(str(tmp_path / "samples.ndjson"), max_bytes=200, backups=2)
+        for i in range(100):
+            ring.append({"t": i, "cpu": 1.0})
+
+        files = sorted(os.listdir(tmp_path))
+        assert files == ["samples.ndjson", "samples.ndjson.1", "samples.ndjson.2"]
+        assert all(os.path.getsize(tmp_path / f) <= 200 for f in files)
+
+        kept = [r["t"] for r in ring.read()]
+        assert kept == sorted(kept)
+        assert kept[-1] == 99
+
+
+class TestProcessSampler:
+
+    def test_sample_does_not_block(self):
+        sampler = ProcessSampler([os.getpid()])
+        sum(i * i for i in range(200_000))  # burn a little CPU
+
+        started = time.perf_counter()
+        sample = sampler.sample()
+
+        assert time.perf_counter() - started < 0.2
+        cpu, rss_mb = sample["procs"][str(os.getpid())]
+        assert cpu >= 0 and rss_mb > 0
+        assert 0 <= sample["cpu"] <= 100
+
+    def test_dead_pid_is_dropped(self):
+        sampler = ProcessSampler([2 ** 22 + 12345])
+        assert sampler.sample()["procs"] == {}
+
+
+class TestWindowedHealth:
+
+    def test_single_spike_is_not_a_warning(self):
+        health = WindowedHealth(window_seconds=60)
+        for t in range(10):
+            verdict = health.add({"t": t, "cpu": 99.0 if t == 5 else 20.0, "mem": 30.0, "disk": 40.0})
+        assert verdict["status"] == "healthy"
+
+    def test_sustained_load_warns_and_window_expires(self):
+        health = WindowedHealth(window_seconds=10)
+        for t in range(10):
+            verdict = health.add({"t": t, "cpu": 95.0, "mem": 30.0, "disk": 40.0})
+        assert verdict["status"] == "warning"
+        assert "High CPU usage" in verdict["issues"][0]
+
+        for t in range(30, 40):
+            verdict = health.add({"t": t, "cpu": 10.0, "mem": 30.0, "disk": 40.0})
+        assert verdict["status"] == "healthy"
+
+
+class TestDaemon:
+
+    def test_daemon_writes_samples(self, tmp_path):
+        out = str(tmp_path / "samples.ndjson")
+        run_daemon(out, interval=0.01, max_samples=5)
+
+        records = NdjsonRing(out).read()
+        assert len(records) == 5
+        assert {"t", "cpu", "mem", "disk", "procs", "health"} <= set(records[0])
@@ -0,0 +1,90 @@
+import io
+import subprocess
+
+import numpy as np
+import pytest
+
+import pcm
+from pcm import decode_pcm, ffmpeg_pcm_command, load_or_decode, load_pcm_file
+from result_cache import ResultCache
+
+
+class FakeFfmpeg:
+    """Popen stand-in that streams pre-baked float32 samples on stdout."""
+
+    def __init__(self, samples, returncode=0):
+        self.payload = np.asarray(samples, dtype="<f4").tobytes()
+        self.returncode_value = returncode
+        self.calls = []
+
+    def __call__(self, cmd, stdout=None, stderr=None):
+        self.calls.append(cmd)
+        proc = self
+        proc.stdout = io.BytesIO(self.payload)
+        proc.stderr = io.BytesIO(b"" if self.returncode_value == 0 else b"boom")
+        return proc
+
+    def wait(self):
+        return self.returncode_value
+
+    def poll(self):
+        return self.returncode_value
+
+
+class TestPcmPipe:
+
+    def test_command_streams_f32le_to_stdout(self):
+        cmd = ffmpeg_pcm_command("ep.mp4")
+        assert cmd[-1] == "pipe:1"
+        assert cmd[cmd.index("-f") + 1] == "f32le"
+        assert cmd[cmd.index("-ar") + 1] == "16000"
+
+    def test_short_input_stays_in_memory(self, monkeypatch, tmp_path):
+        samples = np.linspace(-1, 1, 16000, dtype=np.float32)
+        monkeypatch.setattr(pcm.subprocess, "Popen", FakeFfmpeg(samples))
+        spill = tmp_path / "audio.f32"
+
+        audio = decode_pcm("ep.mp4", spill_path=str(spill), chunk_bytes=1000)
+
+        assert not isinstance(audio, np.memmap)
+        assert not spill.exists()
+        np.testing.assert_array_equal(audio, samples)
+
+    def test_long_input_spills_to_memmap(self, monkeypatch, tmp_path):
+        samples = np.arange(16000 * 3, dtype=np.float32)
+        monkeypatch.setattr(pcm.subprocess, "Popen", FakeFfmpeg(samples))
+        spill = tmp_path / "audio.f32"
+
+        audio = decode_pcm("ep.mp4", spill_path=str(spill), spill_after_seconds=1, chunk_bytes=4096)
+
+        assert isinstance(audio, np.memmap)
+        np.testing.assert_array_equal(audio, samples)
+        np.testing.assert_array_equal(load_pcm_file(str(spill), start=1, end=2), samples[16000:32000])
+
+    def test_ffmpeg_failure_raises(self, monkeypatch):
+        monkeypatch.setattr(pcm.subprocess, "Popen", FakeFfmpeg([], returncode=1))
+        with pytest.raises(subprocess.CalledProcessError):
+            decode_pcm("missing.mp4")
+
+    def test_cached_audio_skips_decode(self, monkeypatch, tmp_path):
+        fake = FakeFfmpeg(np.ones(1600, dtype=np.float32))
+        monkeypatch.setattr(pcm.subprocess, "Popen", fake)
+        cache = ResultCache(root=str(tmp_path / "cache"))
+
+        first = load_or_decode("ep.mp4", str(tmp_path / "a.f32"), "hash", cache)
+        second = load_or_decode("ep.mp4", str(tmp_path / "b.f32"), "hash", cache)
+
+        assert len(fake.calls) == 1
+        np.testing.assert_array_equal(first, second)
+
+    def test_audio_evicted_after_lookup_is_decoded_again(self, monkeypatch, tmp_path):
+        fake = FakeFfmpeg(np.ones(1600, dtype=np.float32))
+        monkeypatch.setattr(pcm.subprocess, "Popen", fake)
+        cache = ResultCache(root=str(tmp_path / "cache"))
+        load_or_decode("ep.mp4", str(tmp_path / "a.f32"), "hash", cache)
+
+        lookup = cache.get_path
+        monkeypatch.setattr(cache, "get_path", lambda key: (path := lookup(key)).unlink() or path)
+        audio = load_or_decode("ep.mp4", str(tmp_path / "b.f32"), "hash", cache)
+
+        assert len(fake.calls) == 2 and len(audio) == 1600
@@ -0,0 +1,194 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from llm_gateway import LLMGateway
+from pov_rewrite import GenerationAborted, PovRewriter, estimate_tokens, split_scenes, stitch
+from processor import CastScriptEngine
+from tracing import MetricsStore
+from transcript import Transcript
+
+
+class Throttled(Exception):
+    status_code = 429
+
+
+def episode(minutes, gap_every=None, line="Roman says something about the portal."):
+    """One 3 s line every 4 s; a 10 s pause every `gap_every` lines."""
+    segments, t = [], 0.0
+    while t < minutes * 60:
+        i = len(segments)
+        segments.append({"start": t, "end": t + 3.0, "text": f" {line} ({i})"})
+        t += 4.0
+        if gap_every and (i + 1) % gap_every == 0:
+            t += 10.0
+    return Transcript.from_segments(segments)
+
+
+def scene_prompt(scene, state, index, total):
+    return f"PART {index}/{total}\nNOTES: {state}\n{scene}"
+
+
+class RecordingLLM:
+    """generate(prompt): sleeps, counts concurrency, echoes which part it wrote."""
+
+    def __init__(self, delay=0.0, fail_parts=(), delays=None):
+        self.delay = delay
+        self.delays = delays or {}
+        self.fail_parts = set(fail_parts)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts = []
+
+    def __call__(self, prompt, part=None):
+        with self.lock:
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if prompt.startswith("PART"):
+                assert part == int(prompt.split()[1].split("/")[0])
+                time.sleep(self.delays.get(part, self.delay))
+                if part in self.fail_parts:
+                    raise RuntimeError("quota")
+                return f"chapter {part}"
+            # character-notes update: cheap
+            assert part is None
+            return f"notes after {prompt.count('(')} lines"
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class TestSplitScenes:
+
+    def test_short_transcript_is_one_chunk(self):
+        transcript = episode(1)
+        assert [len(c) for c in split_scenes(transcript, max_tokens=10_000)] == [len(transcript)]
+
+    def test_chunks_respect_budget_and_cover_everything(self):
+        transcript = episode(45)
+        chunks = split_scenes(transcript, max_tokens=500)
+        assert len(chunks) > 1
+        assert sum(len(c) for c in chunks) == len(transcript)
+        assert Transcript.concat(chunks).render() == transcript.render()
+        assert all(estimate_tokens(c.render()) <= 500 for c in chunks)
+
+    def test_prefers_scene_gaps(self):
+        transcript = episode(45, gap_every=20)
+        for chunk in split_scenes(transcript, max_tokens=500)[:-1]:
+            # every cut lands right after a 10 s pause
+            first_line = int(chunk.text_at(0).rsplit("(", 1)[1].rstrip(")"))
+            assert first_line % 20 == 0 and len(chunk) % 20 == 0
+
+    def test_empty_transcript_still_gets_a_chunk(self):
+        assert len(split_scenes(Transcript.empty())) == 1
+
+
+class TestPovRewriter:
+
+    def test_chunks_stream_in_order_with_rolling_notes(self):
+        llm = RecordingLLM(delays={0: 0.2, 1: 0.0, 2: 0.1})
+        rewriter = PovRewriter(llm, scene_prompt, "Roman", max_tokens=300, concurrency=3)
+        transcript = episode(12)
+
+        chunks = list(rewriter.stream(transcript))
+
+        assert [c.index for c in chunks] == list(range(len(chunks)))
+        assert [c.text for c in chunks] == [f"chapter {i}" for i in range(len(chunks))]
+        assert chunks[0].state == ""
+        assert all(c.state.startswith("notes after") for c in chunks[1:])
+
+    def test_concurrency_is_bounded(self):
+        llm = RecordingLLM(delay=0.05)
+        rewriter = PovRewriter(llm, scene_prompt, "Roman", max_tokens=200, concurrency=2)
+        list(rewriter.stream(episode(20)))
+        # two rewrites plus the single notes chain
+        assert llm.max_in_flight <= 3
+
+    def test_first_chunk_arrives_long_before_the_last(self):
+        llm = RecordingLLM(delay=0.1)
+        rewriter = PovRewriter(llm, scene_prompt, "Roman", max_tokens=300, concurrency=2)
+        started = time.perf_counter()
+        stream = rewriter.stream(episode(30))
+        next(stream)
+        first = time.perf_counter() - started
+        rest = list(stream)
+        total = time.perf_counter() - started
+        assert len(rest) >= 4
+        assert first < total / 3
+
+    def test_failed_chunk_does_not_sink_the_rest(self):
+        llm = RecordingLLM(fail_parts={1})
+        rewriter = PovRewriter(llm, scene_prompt, "Roman", max_tokens=300, retries=1)
+        chunks = list(rewriter.stream(episode(8)))
+
+        assert chunks[1].error == "RuntimeError: quota"
+        assert chunks[0].text == "chapter 0" and chunks[2].text == "chapter 2"
+        assert sum(p.startswith("PART 1/") for p in llm.prompts) == 2  # one retry
+        novel = stitch(chunks)
+        assert "[Part 2 missing" in novel and "chapter 2" in novel
+
+    @pytest.mark.parametrize("error", ["aborted", "gateway"])
+    def test_aborts_and_gateway_errors_are_not_retried_again(self, error):
+        calls = []
+        gateway = LLMGateway(rpm=1e9, retries=2, initial_delay=0, max_delay=0, store=MetricsStore())
+
+        def throttled():
+            raise Throttled()
+
+        def generate(prompt, part):
+            calls.append(part)
+            if part is None:
+                return "notes"
+            if error == "aborted":
+                raise GenerationAborted("stopped by user")
+            return gateway.call("m", throttled)
+
+        rewriter = PovRewriter(generate, scene_prompt, "Roman", max_tokens=10_000, retries=3)
+        [chunk] = list(rewriter.stream(episode(2)))
+
+        assert chunk.error is not None
+        assert calls.count(0) == 1  # the gateway's own 3 attempts, no rewriter retries on top
+
+    def test_closing_the_stream_stops_pending_chunks(self):
+        llm = RecordingLLM(delay=0.05)
+        rewriter = PovRewriter(llm, scene_prompt, "Roman", max_tokens=200, concurrency=1)
+        stream = rewriter.stream(episode(30))
+        next(stream)
+        stream.close()
+        time.sleep(0.2)
+        written = sum(p.startswith("PART") for p in llm.prompts)
+        assert written < len(rewriter.plan(episode(30)))
+
+
+class TestEngineRewrite:
+
+    class FakeGemini:
+        def __init__(self):
+            self.prompts = []
+
+        def generate_content(self, prompt):
+            self.prompts.append(prompt)
+            return SimpleNamespace(text=f"part {len(self.prompts)}")
+
+    @pytest.fixture
+    def engine(self):
+        engine = CastScriptEngine(chunk_seconds=None)
+        engine.llm = self.FakeGemini()
+        return engine
+
+    def test_short_transcript_is_one_call(self, engine):
+        assert engine.rewrite_pov(episode(1), "Roman", "Roman: eldest") == "part 1"
+        assert "PART" not in engine.llm.prompts[0]
+
+    def test_long_transcript_is_map_reduced(self, engine):
+        novel = engine.rewrite_pov(episode(20), "Roman", "Roman: eldest", max_tokens=500)
+        rewrites = [p for p in engine.llm.prompts if p.startswith("ACT AS")]
+        assert len(rewrites) > 1
+        assert all("Roman: eldest" in p for p in rewrites)
+        assert any("PART 2 OF" in p for p in rewrites)
+        assert novel.count("part") == len(rewrites)
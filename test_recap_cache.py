@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from recap_cache import RecapCache, normalise_episode, normalise_show, recap_key
+from result_cache import ResultCache
+
+
+def recaps(tmp_path, **options):
+    return RecapCache(ResultCache(root=str(tmp_path)), poll_seconds=0.01, **options)
+
+
+class TestKeys:
+
+    @pytest.mark.parametrize("episode", ["S01E03", "s1e3", "s01 e03", "1x03", "Season 1 Episode 3", "S1-Ep3"])
+    def test_episode_forms(self, episode):
+        assert normalise_episode(episode) == "s01e03"
+
+    def test_titles_and_shows_ignore_case_and_punctuation(self):
+        assert normalise_show("  Wizards Beyond  Waverly Place! ") == "wizards beyond waverly place"
+        assert normalise_episode("The Pilot.") == "the pilot"
+
+    def test_key_depends_on_model(self):
+        a = recap_key("Wizards Beyond Waverly Place", "S01E03", "m1")
+        assert a == recap_key("wizards beyond waverly place", "1x3", "m1")
+        assert a != recap_key("Wizards Beyond Waverly Place", "S01E03", "m2")
+        assert a != recap_key("Wizards Beyond Waverly Place", "S01E04", "m1")
+
+
+class TestRecapCache:
+
+    def test_fetches_once_then_hits(self, tmp_path):
+        cache = recaps(tmp_path)
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            return "recap"
+
+        assert cache.get_or_fetch("Show", "S01E01", "m", fetch) == "recap"
+        assert cache.get_or_fetch("show", "1x1", "m", fetch) == "recap"
+        assert len(calls) == 1
+        assert cache.stats()["fetches"] == 1
+
+    def test_ttl_expiry(self, tmp_path):
+        cache = recaps(tmp_path, ttl=0.01)
+        cache.get_or_fetch("Show", "S01E01", "m", lambda: "old")
+        time.sleep(0.05)
+        assert cache.get_or_fetch("Show", "S01E01", "m", lambda: "new") == "new"
+
+    def test_single_flight_across_threads(self, tmp_path):
+        cache = recaps(tmp_path)
+        calls = []
+        gate = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            gate.wait(5)
+            return "recap"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            cache.get_or_fetch("Show", "S01E01", "m", fetch))) for _ in range(6)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+
+        assert results == ["recap"] * 6
+        assert len(calls) == 1
+        assert cache.stats()["shared"] == 5
+
+    def test_waits_on_another_process_lease(self, tmp_path):
+        # A second RecapCache on the same index stands in for another worker process
+        other = ResultCache(root=str(tmp_path))
+        cache = recaps(tmp_path)
+        key = recap_key("Show", "S01E01", "m")
+        assert other.claim(key, 5, owner="other-process")
+
+        def finish():
+            time.sleep(0.1)
+            other.put_json(key, "from other")
+            other.release(key, owner="other-process")
+
+        threading.Thread(target=finish).start()
+        assert cache.get_or_fetch("Show", "S01E01", "m", lambda: pytest.fail("fetched twice")) == "from other"
+
+    def test_failed_fetch_is_retried_by_next_caller(self, tmp_path):
+        cache = recaps(tmp_path)
+
+        def boom():
+            raise RuntimeError("quota")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_fetch("Show", "S01E01", "m", boom)
+        assert cache.get_or_fetch("Show", "S01E01", "m", lambda: "recap") == "recap"
+
+    def test_size_budget_evicts_old_recaps(self, tmp_path):
+        cache = RecapCache(ResultCache(root=str(tmp_path), max_bytes=250))
+        for episode in ("S01E01", "S01E02", "S01E03"):
+            cache.get_or_fetch("Show", episode, "m", lambda: "x" * 100)
+            time.sleep(0.01)
+        assert cache.get("Show", "S01E01", "m") is None
+        assert cache.get("Show", "S01E03", "m") is not None
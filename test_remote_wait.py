@@ -0,0 +1,105 @@
+import random
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from remote_wait import (
+    RemoteAssetCancelled,
+    RemoteAssetError,
+    RemoteAssetTimeout,
+    WaitMetrics,
+    backoff_delays,
+    wait_until_ready,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeFilesClient:
+    """Local stand-in for client.files: ready after `ready_after` polls."""
+
+    def __init__(self, ready_after, final="ACTIVE"):
+        self.ready_after = ready_after
+        self.final = final
+        self.gets = 0
+
+    def upload(self):
+        return self._file("PROCESSING")
+
+    def get(self, name):
+        self.gets += 1
+        return self._file(self.final if self.gets >= self.ready_after else "PROCESSING")
+
+    @staticmethod
+    def _file(state):
+        return SimpleNamespace(name="files/abc", state=SimpleNamespace(name=state))
+
+
+class TestBackoff:
+
+    def test_delays_grow_and_cap(self):
+        delays = backoff_delays(initial=0.5, maximum=4.0, rng=random.Random(1))
+        values = [next(delays) for _ in range(10)]
+        assert values[0] <= 0.5
+        assert max(values) <= 4.0
+        assert all(v >= 0.25 for v in values)
+
+
+class TestWaitUntilReady:
+
+    def test_ready_file_returns_without_polling(self):
+        client = FakeFilesClient(ready_after=0)
+        ready = client._file("ACTIVE")
+        metrics = WaitMetrics()
+
+        assert wait_until_ready(ready, lambda f: client.get(f.name), metrics=metrics) is ready
+        assert metrics.polls == 0
+
+    def test_polls_until_active(self):
+        client = FakeFilesClient(ready_after=4)
+        clock = FakeClock()
+        metrics = WaitMetrics()
+
+        ready = wait_until_ready(client.upload(), lambda f: client.get(f.name),
+                                 sleep=clock.sleep, clock=clock, metrics=metrics,
+                                 rng=random.Random(0))
+
+        assert ready.state.name == "ACTIVE"
+        assert metrics.polls == 4
+        assert metrics.final_state == "ACTIVE"
+        # First polls are sub-second, unlike the old fixed 3 s loop.
+        assert metrics.delays[0] <= 0.5
+        assert metrics.seconds == pytest.approx(sum(metrics.delays))
+
+    def test_failed_state_raises(self):
+        client = FakeFilesClient(ready_after=2, final="FAILED")
+        clock = FakeClock()
+        with pytest.raises(RemoteAssetError):
+            wait_until_ready(client.upload(), lambda f: client.get(f.name), sleep=clock.sleep, clock=clock)
+
+    def test_deadline(self):
+        client = FakeFilesClient(ready_after=10 ** 6)
+        clock = FakeClock()
+        with pytest.raises(RemoteAssetTimeout):
+            wait_until_ready(client.upload(), lambda f: client.get(f.name), timeout=60,
+                             sleep=clock.sleep, clock=clock)
+        assert clock.now == pytest.approx(60)
+
+    def test_cancel_interrupts_sleep(self):
+        client = FakeFilesClient(ready_after=10 ** 6)
+        cancel = threading.Event()
+        threading.Timer(0.05, cancel.set).start()
+
+        with pytest.raises(RemoteAssetCancelled):
+            wait_until_ready(client.upload(), lambda f: client.get(f.name),
+                             cancel=cancel, initial_delay=5, max_delay=5, timeout=10)
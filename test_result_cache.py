@@ -0,0 +1,79 @@
+import hashlib
+import io
+import time
+
+from result_cache import ResultCache, cache_key, hash_file, hash_stream
+
+
+class TestResultCache:
+
+    def test_hash_file_matches_sha256(self, tmp_path):
+        video = tmp_path / "ep.mp4"
+        data = b"\x00\x01fake-video" * 100_000
+        video.write_bytes(data)
+
+        assert hash_file(str(video), chunk_size=4096) == hashlib.sha256(data).hexdigest()
+        assert hash_stream(io.BytesIO(data), chunk_size=4096) == hash_file(str(video))
+
+    def test_key_depends_on_params(self):
+        a = cache_key("abc", "segments", whisper="base")
+        assert a == cache_key("abc", "segments", whisper="base")
+        assert a != cache_key("abc", "segments", whisper="tiny")
+        assert a != cache_key("abd", "segments", whisper="base")
+
+    def test_json_round_trip_and_counters(self, tmp_path):
+        cache = ResultCache(root=str(tmp_path))
+        key = cache_key("abc", "lore", show="Wizards", title="S01E03")
+
+        assert cache.get_json(key) is None
+        cache.put_json(key, "recap text")
+        assert cache.get_json(key) == "recap text"
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_file_entries(self, tmp_path):
+        cache = ResultCache(root=str(tmp_path / "cache"))
+        audio = tmp_path / "audio.wav"
+        audio.write_bytes(b"RIFF" + b"\x00" * 100)
+
+        stored = cache.put_path("k1", str(audio), suffix=".wav", move=True)
+
+        assert not audio.exists()
+        assert cache.get_path("k1") == stored
+        assert stored.read_bytes().startswith(b"RIFF")
+
+    def test_ttl_expiry(self, tmp_path):
+        cache = ResultCache(root=str(tmp_path))
+        cache.put_json("upload", {"name": "files/abc"}, ttl=0.01)
+        time.sleep(0.05)
+
+        assert cache.get_json("upload") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction_respects_budget(self, tmp_path):
+        cache = ResultCache(root=str(tmp_path), max_bytes=250)
+        for name in ("a", "b"):
+            cache.put_json(name, "x" * 100)
+            time.sleep(0.01)
+        cache.get_json("a")  # "b" is now least recently used
+        time.sleep(0.01)
+        cache.put_json("c", "x" * 100)
+
+        assert cache.get_json("b") is None
+        assert cache.get_json("a") is not None
+        assert cache.get_json("c") is not None
+        assert cache.total_bytes() <= 250
+
+    def test_payload_evicted_after_lookup_is_a_miss(self, tmp_path, monkeypatch):
+        cache = ResultCache(root=str(tmp_path))
+        cache.put_json("lore", "recap")
+        lookup = cache.get_path
+
+        def evicted_in_between(key):
+            path = lookup(key)
+            path.unlink()  # another process evicts it before we open it
+            return path
+
+        monkeypatch.setattr(cache, "get_path", evicted_in_between)
+        assert cache.get_json("lore") is None
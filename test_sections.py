@@ -0,0 +1,231 @@
+import random
+import threading
+
+import pytest
+
+from sections import (
+    COMPLETE,
+    DUPLICATED,
+    MISSING,
+    SECTIONS,
+    UNOPENED,
+    UNTERMINATED,
+    SectionRouter,
+    parse_sections,
+)
+
+RESPONSE = (
+    "Sure! [SCRIPT]\nROMAN: Where's the wand?\nBILLIE: [whispers] Gone.\n[END_SCRIPT]\n"
+    "[NOVEL]\nRoman felt the floor tilt. [Chapter 1]\n[END_NOVEL]"
+)
+SCRIPT = "\nROMAN: Where's the wand?\nBILLIE: [whispers] Gone.\n"
+NOVEL = "\nRoman felt the floor tilt. [Chapter 1]\n"
+
+
+def route(pieces):
+    router = SectionRouter()
+    for piece in pieces:
+        router.feed(piece)
+    router.close()
+    return router
+
+
+class TestSectionRouter:
+
+    def test_whole_response(self):
+        router = route([RESPONSE])
+        assert router.text("SCRIPT") == SCRIPT
+        assert router.text("NOVEL") == NOVEL
+        assert router.full_text == RESPONSE
+
+    def test_every_two_way_split(self):
+        for cut in range(len(RESPONSE) + 1):
+            router = route([RESPONSE[:cut], RESPONSE[cut:]])
+            assert (router.text("SCRIPT"), router.text("NOVEL")) == (SCRIPT, NOVEL), cut
+
+    def test_token_sized_pieces(self):
+        rng = random.Random(17)
+        for _ in range(200):
+            pieces, pos = [], 0
+            while pos < len(RESPONSE):
+                step = rng.randint(1, 6)
+                pieces.append(RESPONSE[pos:pos + step])
+                pos += step
+            router = route(pieces)
+            assert (router.text("SCRIPT"), router.text("NOVEL")) == (SCRIPT, NOVEL)
+
+    def test_text_is_routed_while_streaming(self):
+        router = SectionRouter()
+        router.feed("[SCRIPT]ROMAN: Hi")
+        assert router.text("SCRIPT") == "ROMAN: Hi"
+        assert router.current == "SCRIPT"
+        router.feed(" there.[END_SCR")
+        # the half marker is held back, not shown
+        assert router.text("SCRIPT") == "ROMAN: Hi there."
+        router.feed("IPT][NOVEL]Roman")
+        assert router.current == "NOVEL"
+        assert router.text("NOVEL") == "Roman"
+
+    def test_missing_end_marker_runs_to_the_end(self):
+        router = route(["[SCRIPT]a", "b[NOVEL]c", "d"])
+        assert router.text("SCRIPT") == "ab"
+        assert router.text("NOVEL") == "cd"
+
+    def test_dangling_bracket_is_flushed_on_close(self):
+        router = route(["[NOVEL]It ended with [NOV"])
+        assert router.text("NOVEL") == "It ended with [NOV"
+
+
+class TestRecovery:
+
+    def test_well_formed(self):
+        router = parse_sections(RESPONSE)
+        assert router.report() == {"SCRIPT": COMPLETE, "NOVEL": COMPLETE}
+        assert router.recovered == ["SCRIPT", "NOVEL"]
+
+    def test_no_end_markers_at_all(self):
+        # The app's prompt only names the opening markers
+        router = parse_sections("[SCRIPT] A: hi [NOVEL] She smiled.")
+        assert router.text("SCRIPT") == " A: hi "
+        assert router.text("NOVEL") == " She smiled."
+        assert router.report() == {"SCRIPT": UNTERMINATED, "NOVEL": UNTERMINATED}
+
+    def test_end_marker_without_start(self):
+        router = parse_sections("A: hi\n[END_SCRIPT]\n[NOVEL]She smiled.[END_NOVEL]")
+        assert router.text("SCRIPT") == "A: hi\n"
+        assert router.report()["SCRIPT"] == UNOPENED
+
+    def test_duplicated_section_is_concatenated(self):
+        router = parse_sections("[NOVEL]One.[END_NOVEL][SCRIPT]x[END_SCRIPT][NOVEL] Two.[END_NOVEL]")
+        assert router.text("NOVEL") == "One. Two."
+        assert router.report()["NOVEL"] == DUPLICATED
+
+    def test_missing_section(self):
+        router = parse_sections("[NOVEL]Only prose.[END_NOVEL]")
+        assert router.report() == {"SCRIPT": MISSING, "NOVEL": COMPLETE}
+        assert router.recovered == ["NOVEL"]
+        assert router.text("SCRIPT") == ""
+
+    def test_mismatched_end_closes_the_open_section(self):
+        router = parse_sections("[SCRIPT]lines[END_NOVEL]after")
+        assert router.text("SCRIPT") == "lines"
+        assert router.report()["SCRIPT"] == UNTERMINATED
+
+    def test_spans_are_offsets_into_one_buffer(self):
+        router = parse_sections(RESPONSE)
+        (start, end), = router.spans("NOVEL")
+        assert RESPONSE[start:end] == NOVEL
+        assert router.buffer is router.buffer
+
+    def test_feed_after_close_is_an_error(self):
+        router = parse_sections("x")
+        with pytest.raises(ValueError):
+            router.feed("y")
+
+
+# ---- Fuzzing ----
+FRAGMENTS = [
+    "[SCRIPT]", "[END_SCRIPT]", "[NOVEL]", "[END_NOVEL]",
+    "[", "]", "[SCR", "IPT]", "[END_", "NOVEL", "[Chapter 2]", "[whispers]",
+    "ROMAN: hi.", "\n", " ", "é", "🎬", "text", "[[", "]]", "END_SCRIPT",
+]
+
+
+def random_document(rng):
+    return "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 40)))
+
+
+def random_pieces(rng, text):
+    pieces, pos = [], 0
+    while pos < len(text):
+        step = rng.randint(1, 12)
+        pieces.append(text[pos:pos + step])
+        pos += step
+    return pieces
+
+
+def snapshot(router):
+    return (
+        {name: router.spans(name) for name in SECTIONS},
+        {name: router.text(name) for name in SECTIONS},
+        router.report(),
+    )
+
+
+class TestFuzz:
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_chunking_never_changes_the_result(self, seed):
+        rng = random.Random(seed)
+        for _ in range(100):
+            doc = random_document(rng)
+            assert snapshot(parse_sections(random_pieces(rng, doc))) == snapshot(parse_sections(doc)), doc
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_invariants_on_arbitrary_output(self, seed):
+        rng = random.Random(1000 + seed)
+        for _ in range(100):
+            doc = random_document(rng)
+            router = parse_sections(doc)
+            assert router.buffer == doc
+            spans = sorted(span for name in SECTIONS for span in router.spans(name))
+            # in bounds, ordered, non-overlapping
+            assert all(0 <= s <= e <= len(doc) for s, e in spans)
+            assert all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
+            # no marker is ever part of a section's text
+            for s, e in spans:
+                assert not any(m in doc[s:e] for m in ("[SCRIPT]", "[END_SCRIPT]", "[NOVEL]", "[END_NOVEL]"))
+            for name in SECTIONS:
+                assert (name in router.recovered) == bool(router.text(name))
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_well_formed_sections_round_trip(self, seed):
+        rng = random.Random(2000 + seed)
+        body = [f for f in FRAGMENTS if "SCRIPT" not in f and "NOVEL" not in f and "[" not in f]
+        for _ in range(100):
+            script = "".join(rng.choice(body) for _ in range(rng.randint(0, 20)))
+            novel = "".join(rng.choice(body) for _ in range(rng.randint(0, 20)))
+            drop_ends = rng.random() < 0.5
+            doc = (f"Preamble [SCRIPT]{script}{'' if drop_ends else '[END_SCRIPT]'}"
+                   f"[NOVEL]{novel}{'' if drop_ends else '[END_NOVEL]'}")
+            router = parse_sections(random_pieces(rng, doc))
+            assert router.text("SCRIPT") == script
+            assert router.text("NOVEL") == novel
+            expected = UNTERMINATED if drop_ends else COMPLETE
+            assert router.report() == {"SCRIPT": expected, "NOVEL": expected}
+
+    def test_live_text_is_a_prefix_of_the_final_text(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            doc = random_document(rng)
+            router = SectionRouter()
+            seen = {name: "" for name in SECTIONS}
+            for piece in random_pieces(rng, doc):
+                router.feed(piece)
+                for name in SECTIONS:
+                    seen[name] = router.text(name)
+            router.close()
+            for name in SECTIONS:
+                assert router.text(name).startswith(seen[name]), doc
+
+    def test_reading_from_another_thread_while_feeding(self):
+        doc = RESPONSE * 50
+        router = SectionRouter()
+        reads = []
+        done = threading.Event()
+
+        def reader():
+            while not done.is_set():
+                reads.append(router.text("NOVEL"))
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        for i in range(0, len(doc), 3):
+            router.feed(doc[i:i + 3])
+        done.set()
+        thread.join()
+        router.close()
+
+        final = router.text("NOVEL")
+        assert final == NOVEL * 50
+        assert all(final.startswith(text) for text in reads)
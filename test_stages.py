@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from stages import RAN, REUSED, SKIPPED, StageMemo, StageScheduler
+
+
+class TestStageScheduler:
+
+    def test_independent_stages_overlap(self):
+        sched = StageScheduler()
+        for name in ("lore", "transcript", "upload"):
+            sched.add(name, time.sleep, 0.2)
+
+        sched.run()
+
+        # Three 0.2 s stages should take ~max, not ~sum.
+        assert sched.wall_seconds < 0.5
+        assert set(sched.timings) == {"lore", "transcript", "upload"}
+
+    def test_dependency_results_passed_as_kwargs(self):
+        sched = StageScheduler()
+        sched.add("lore", lambda: "recap")
+        sched.add("transcript", lambda: "[0.0s] hi")
+        sched.add("generate", lambda pov, lore, transcript: f"{pov}|{lore}|{transcript}",
+                  "Roman", after=("lore", "transcript"))
+
+        results = sched.run()
+
+        assert results["generate"] == "Roman|recap|[0.0s] hi"
+        assert sched.timings["generate"].start >= sched.timings["lore"].start
+
+    def test_failure_is_reraised_and_dependents_skip(self):
+        ran = threading.Event()
+
+        def boom():
+            raise RuntimeError("upload failed")
+
+        sched = StageScheduler()
+        sched.add("upload", boom)
+        sched.add("generate", lambda upload: ran.set(), after=("upload",))
+
+        with pytest.raises(RuntimeError, match="upload failed"):
+            sched.run()
+        assert not ran.is_set()
+
+    def test_unknown_dependency_rejected(self):
+        sched = StageScheduler()
+        with pytest.raises(ValueError):
+            sched.add("generate", lambda: None, after=("lore",))
+
+    def test_breakdown_includes_wall(self):
+        sched = StageScheduler()
+        sched.add("a", lambda: 1)
+        sched.run()
+        assert set(sched.breakdown()) == {"a", "wall"}
+
+
+class TestKeyedStages:
+
+    @staticmethod
+    def pipeline(memo, calls, whisper="base", pov="Roman"):
+        def stage(name, value):
+            def fn(**deps):
+                calls.append(name)
+                return value
+            return fn
+
+        sched = StageScheduler(memo=memo)
+        sched.add("ingest", stage("ingest", "video"), params={"upload": "f1"}, memoize=False)
+        sched.add("lore", stage("lore", "recap"), params={"show": "Wizards"})
+        sched.add("transcript", stage("transcript", f"text/{whisper}"), after=("ingest",),
+                  params={"whisper": whisper})
+        sched.add("rewrite", stage("rewrite", f"novel/{pov}"), after=("lore", "transcript"),
+                  params={"pov": pov})
+        return sched
+
+    def test_changing_downstream_param_reruns_only_that_stage(self):
+        memo, calls = StageMemo(), []
+        self.pipeline(memo, calls).run(targets=("rewrite",))
+        assert sorted(calls) == ["ingest", "lore", "rewrite", "transcript"]
+
+        calls.clear()
+        sched = self.pipeline(memo, calls, pov="Billie")
+        results = sched.run(targets=("rewrite",))
+        assert calls == ["rewrite"]
+        assert results["rewrite"] == "novel/Billie" and results["transcript"] == "text/base"
+        assert sched.status() == {"ingest": SKIPPED, "lore": REUSED, "transcript": REUSED, "rewrite": RAN}
+
+    def test_upstream_change_invalidates_dependents(self):
+        memo, calls = StageMemo(), []
+        self.pipeline(memo, calls).run()
+        calls.clear()
+        self.pipeline(memo, calls, whisper="tiny").run(targets=("rewrite",))
+        assert sorted(calls) == ["ingest", "rewrite", "transcript"]
+
+    def test_unkeyed_dependency_disables_reuse(self):
+        memo = StageMemo()
+        for _ in range(2):
+            sched = StageScheduler(memo=memo)
+            sched.add("clock", lambda: object())
+            sched.add("derived", lambda clock: clock, after=("clock",), params={})
+            sched.run()
+        assert sched.key("derived") is None and sched.reused == set()
+
+    def test_derive_key_tracks_dependencies(self):
+        a = self.pipeline(StageMemo(), [])
+        b = self.pipeline(StageMemo(), [], whisper="tiny")
+        assert a.derive_key("x", {"pov": "Roman"}, after=("lore",)) == \
+            b.derive_key("x", {"pov": "Roman"}, after=("lore",))
+        assert a.derive_key("x", {}, after=("transcript",)) != b.derive_key("x", {}, after=("transcript",))
+
+
+class TestStageMemo:
+
+    def test_lru_and_expiry(self):
+        memo = StageMemo(max_entries=2, ttl=0.05)
+        memo.store("a", 1)
+        memo.store("b", None)
+        assert memo.lookup("a") == (True, 1)
+        memo.store("c", 3)  # "b" is least recently used
+        assert memo.lookup("b") == (False, None)
+        time.sleep(0.06)
+        assert memo.lookup("a") == (False, None)
@@ -0,0 +1,98 @@
+import json
+import time
+import urllib.request
+
+import pytest
+
+from monitor_performance import PerformanceMonitor
+from tracing import MetricsStore, job_trace, serve_metrics, span
+
+
+@pytest.fixture
+def store():
+    s = MetricsStore()
+    s.register("pov_stage_seconds", "stage time")
+    return s
+
+
+class TestSpans:
+
+    def test_span_records_stage_and_status(self, store):
+        with span("transcribe", store=store, model="tiny"):
+            time.sleep(0.01)
+        with pytest.raises(RuntimeError):
+            with span("upload", store=store):
+                raise RuntimeError("quota")
+
+        series = {(s["labels"]["stage"], s["labels"]["status"]): s
+                  for s in store.to_json()["pov_stage_seconds"]}
+        assert series[("transcribe", "ok")]["count"] == 1
+        assert series[("transcribe", "ok")]["p50"] >= 0.01
+        assert series[("upload", "error")]["count"] == 1
+
+    def test_job_trace_samples_peak_rss(self, store):
+        with job_trace("engine", store=store, interval=0.01) as sampler:
+            blob = bytearray(32 * 1024 * 1024)
+            time.sleep(0.05)
+            del blob
+
+        assert sampler.peak > 32 * 1024 * 1024
+        (rss,) = store.to_json()["pov_job_peak_rss_bytes"]
+        assert rss["labels"] == {"kind": "engine"}
+
+
+class TestExposition:
+
+    def test_prometheus_histogram_is_cumulative(self, store):
+        for value in (0.07, 0.3, 3.0):
+            store.observe("pov_stage_seconds", value, stage="extract")
+
+        text = store.to_prometheus()
+
+        assert "# TYPE pov_stage_seconds histogram" in text
+        assert 'pov_stage_seconds_bucket{stage="extract",le="0.1"} 1' in text
+        assert 'pov_stage_seconds_bucket{stage="extract",le="5"} 3' in text
+        assert 'pov_stage_seconds_bucket{stage="extract",le="+Inf"} 3' in text
+        assert 'pov_stage_seconds_count{stage="extract"} 3' in text
+
+    def test_http_endpoint(self, store):
+        store.observe("pov_stage_seconds", 1.5, stage="generate")
+        server = serve_metrics(0, host="127.0.0.1", store=store)
+        try:
+            base = f"http://127.0.0.1:{server.server_address[1]}"
+            prom = urllib.request.urlopen(f"{base}/metrics").read().decode()
+            data = json.loads(urllib.request.urlopen(f"{base}/metrics.json").read())
+        finally:
+            server.shutdown()
+
+        assert 'stage="generate"' in prom
+        assert data["pov_stage_seconds"][0]["sum"] == 1.5
+
+    def test_monitor_includes_pipeline_without_blocking(self, store):
+        store.observe("pov_stage_seconds", 2.0, stage="transcribe", status="ok")
+        monitor = PerformanceMonitor(store=store)
+
+        started = time.perf_counter()
+        report = monitor.generate_report()
+
+        assert time.perf_counter() - started < 0.5
+        assert "transcribe" in report
+        assert "pov_cpu_percent" in monitor.prometheus()
+
+    def test_monitor_reads_pipeline_from_the_app_endpoint(self, store):
+        store.observe("pov_stage_seconds", 3.0, stage="rewrite", status="ok")
+        server = serve_metrics(0, host="127.0.0.1", store=store)
+        try:
+            monitor = PerformanceMonitor(metrics_url=f"http://127.0.0.1:{server.server_address[1]}")
+            report = monitor.generate_report()
+            prom = monitor.prometheus()
+        finally:
+            server.shutdown()
+
+        assert "rewrite" in report
+        assert 'stage="rewrite"' in prom
+
+    def test_monitor_without_endpoint_has_no_pipeline(self):
+        monitor = PerformanceMonitor(metrics_url="http://127.0.0.1:9")
+        monitor.collect_system_metrics()
+        assert monitor.metrics["pipeline"] == {}
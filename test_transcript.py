@@ -0,0 +1,111 @@
+import io
+import random
+import tracemalloc
+
+import pytest
+
+from processor import format_segments
+from transcript import Segment, Transcript, TranscriptBuilder
+
+
+def hour_of_segments(seed=0):
+    """~1 hour of Whisper-shaped segments, including the fields we drop."""
+    rng = random.Random(seed)
+    segments, t = [], 0.0
+    while t < 3600:
+        length = rng.uniform(1.0, 6.0)
+        words = " ".join(rng.choice(["magic", "wand", "Roman", "Billie", "portal", "spell"])
+                         for _ in range(rng.randint(3, 14)))
+        segments.append({
+            "id": len(segments), "seek": int(t * 100), "start": round(t, 2), "end": round(t + length, 2),
+            "text": f" {words}.", "tokens": [rng.randrange(50000) for _ in range(20)],
+            "temperature": 0.0, "avg_logprob": -0.3, "compression_ratio": 1.4, "no_speech_prob": 0.01,
+        })
+        t += length + rng.uniform(0.0, 0.5)
+    return segments
+
+
+SEGMENTS = [
+    {"start": 0.0, "end": 2.0, "text": " Hello."},
+    {"start": 2.5, "end": 4.0, "text": " Héllo again."},
+    {"start": 4.0, "end": 9.0, "text": " Long one."},
+    {"start": 9.5, "end": 11.0, "text": " Next."},
+    {"start": 12.0, "end": 13.0, "text": " Later."},
+]
+
+
+class TestTranscript:
+
+    def test_renders_like_format_segments(self):
+        transcript = Transcript.from_segments(SEGMENTS)
+        assert transcript.render() == format_segments(SEGMENTS)
+        assert transcript.text == "Hello. Héllo again. Long one. Next. Later."
+
+    def test_speakers_render_with_labels(self):
+        transcript = Transcript.from_segments(SEGMENTS[:2], speakers=["A", None])
+        assert transcript.render() == "[0.0s] A: Hello.\n[2.5s]  Héllo again."
+        assert transcript.speakers == ["A"]
+
+    def test_indexing(self):
+        transcript = Transcript.from_segments(SEGMENTS)
+        assert transcript[1] == Segment(2.5, 4.0, " Héllo again.")
+        assert transcript[-1].text == " Later."
+        with pytest.raises(IndexError):
+            transcript[5]
+
+    def test_slice_time_matches_linear_scan(self):
+        transcript = Transcript.from_segments(SEGMENTS)
+        for start, end in [(0, 1), (4.5, 5.5), (6.5, 7), (9, 12), (3, 12.5), (20, 30), (0, 100)]:
+            expected = [s["text"] for s in SEGMENTS if s["start"] < end and s["end"] > start]
+            assert [s.text for s in transcript.slice_time(start, end)] == expected
+
+    def test_slice_is_a_view(self):
+        transcript = Transcript.from_segments(SEGMENTS)
+        part = transcript.slice_time(4.5, 10)
+        assert part.buffer is transcript.buffer
+        assert part.starts.base is not None
+
+    def test_windows_cover_every_segment_once(self):
+        transcript = Transcript.from_segments(hour_of_segments())
+        windows = list(transcript.windows(300))
+        assert sum(len(w) for w in windows) == len(transcript)
+        assert Transcript.concat(windows).render() == transcript.render()
+        assert all(w.starts[-1] - w.starts[0] < 300 for w in windows)
+
+    @pytest.mark.parametrize("speakers", [None, ["A", "B", None, "A", "B"]])
+    def test_save_load_round_trip(self, speakers):
+        transcript = Transcript.from_segments(SEGMENTS, speakers=speakers)
+        buf = io.BytesIO()
+        transcript.save(buf)
+        buf.seek(0)
+        loaded = Transcript.load(buf)
+        assert loaded.to_dicts() == transcript.to_dicts()
+
+    def test_saving_a_slice_writes_only_its_text(self):
+        part = Transcript.from_segments(SEGMENTS).slice_time(9, 13)
+        buf = io.BytesIO()
+        part.save(buf)
+        buf.seek(0)
+        loaded = Transcript.load(buf)
+        assert loaded.buffer == " Next. Later."
+        assert loaded.render() == part.render()
+
+    def test_builder_requires_start_order(self):
+        builder = TranscriptBuilder()
+        builder.add(5.0, 6.0, " b")
+        with pytest.raises(ValueError):
+            builder.add(1.0, 2.0, " a")
+
+    def test_an_hour_takes_far_less_memory_than_segment_dicts(self):
+        tracemalloc.start()
+        raw = hour_of_segments()
+        dict_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        transcript = Transcript.from_segments(raw)
+        columnar_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        assert len(transcript) == len(raw)
+        assert columnar_bytes < dict_bytes / 10
@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from model_registry import ModelRegistry
+from pcm import SAMPLE_RATE
+from processor import CastScriptEngine
+from vad import TimeMap, gate, remap_segments, speech_regions, transcribe_gated
+
+RNG = np.random.default_rng(0)
+
+
+def silence(seconds):
+    return (RNG.standard_normal(int(seconds * SAMPLE_RATE)) * 1e-4).astype(np.float32)
+
+
+def speech(seconds):
+    """Voice-band harmonics with a ~4 Hz syllable envelope."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voice = sum(np.sin(2 * np.pi * f * t) / k for k, f in enumerate((400, 800, 1200, 1600), start=1))
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    return (0.2 * voice * envelope).astype(np.float32)
+
+
+def bass_music(seconds):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.4 * np.sin(2 * np.pi * 80 * t) + 0.3 * np.sin(2 * np.pi * 120 * t)).astype(np.float32)
+
+
+def episode():
+    # 0-5 silence, 5-8 speech, 8-14 music bed, 14-17 speech, 17-20 silence
+    return np.concatenate([silence(5), speech(3), bass_music(6), speech(3), silence(3)])
+
+
+class EchoTimes:
+    """Whisper stand-in: one segment per second of audio it is given."""
+
+    def __init__(self):
+        self.heard = []
+
+    def transcribe(self, audio, **options):
+        self.heard.append(len(audio) / SAMPLE_RATE)
+        seconds = int(len(audio) / SAMPLE_RATE)
+        return {"text": " hi" * seconds,
+                "segments": [{"start": float(i), "end": i + 1.0, "text": " hi"} for i in range(seconds)]}
+
+
+class TestSpeechRegions:
+
+    def test_finds_speech_and_skips_silence_and_music(self):
+        regions = speech_regions(episode())
+        assert len(regions) == 2
+        assert regions[0] == pytest.approx([5.0, 8.0], abs=0.3)
+        assert regions[1] == pytest.approx([14.0, 17.0], abs=0.3)
+
+    def test_short_pauses_stay_inside_a_region(self):
+        audio = np.concatenate([speech(2), silence(0.3), speech(2)])
+        assert len(speech_regions(audio)) == 1
+
+    def test_empty_and_silent_input(self):
+        assert speech_regions(np.zeros(0, dtype=np.float32)).shape == (0, 2)
+        assert len(speech_regions(silence(5))) == 0
+
+
+class TestGate:
+
+    def test_gated_audio_and_time_map(self):
+        audio = episode()
+        regions = np.array([[5.0, 8.0], [14.0, 17.0]])
+        gated, timemap = gate(audio, regions, join_seconds=0.5)
+
+        assert len(gated) == int(6.5 * SAMPLE_RATE)
+        assert timemap.to_original(1.0) == pytest.approx(6.0)
+        assert timemap.to_original(3.2) == pytest.approx(8.0)   # inside the join: end of region 1
+        assert timemap.to_original(4.5) == pytest.approx(15.0)
+        np.testing.assert_allclose(timemap.to_original(np.array([0.0, 3.5])), [5.0, 14.0])
+
+    def test_remap_segments_and_words(self):
+        timemap = TimeMap(np.array([0.0, 10.0]), np.array([100.0, 300.0]), np.array([9.0, 5.0]))
+        seg = {"start": 1.0, "end": 11.0, "text": " x", "words": [{"start": 10.5, "end": 11.0, "word": " x"}]}
+        [out] = remap_segments([seg], timemap)
+        assert (out["start"], out["end"]) == (101.0, 301.0)
+        assert out["words"][0]["start"] == 300.5
+
+
+class TestTranscribeGated:
+
+    def test_only_speech_is_transcribed(self):
+        model = EchoTimes()
+        result = transcribe_gated(episode(), model.transcribe)
+
+        assert model.heard[0] < 8  # ~6.5 s of 20
+        assert result["vad"]["gated"] and result["vad"]["skipped_ratio"] > 0.6
+        starts = [s["start"] for s in result["segments"]]
+        assert all(4.5 <= t < 8.5 or 13.5 <= t < 17.5 for t in starts)
+        assert starts == sorted(starts)
+
+    def test_no_speech_skips_the_model(self):
+        model = EchoTimes()
+        result = transcribe_gated(silence(10), model.transcribe)
+        assert model.heard == [] and result["segments"] == []
+        assert result["vad"]["skipped_seconds"] == pytest.approx(10.0)
+
+    def test_all_speech_goes_through_ungated(self):
+        model = EchoTimes()
+        result = transcribe_gated(speech(6), model.transcribe)
+        assert model.heard == [pytest.approx(6.0)]
+        assert not result["vad"]["gated"]
+
+
+class InMemoryEngine(CastScriptEngine):
+
+    def load_audio(self, input_path, content_hash, workspace):
+        return episode()
+
+
+def test_engine_vad_reports_and_maps_times():
+    model = EchoTimes()
+    engine = InMemoryEngine(models=ModelRegistry(loader=lambda name: model), chunk_seconds=None, vad=True)
+    result = engine.process_video_or_url("episode.mp4")
+
+    assert result.vad["regions"] == 2
+    assert result.segments[0].start >= 4.5
+    assert model.heard[0] < 8
+
+
+class JitteryWhisper:
+    """Whisper stand-in whose segment starts come back slightly out of order."""
+
+    def transcribe(self, audio, **options):
+        return {"text": " a b c", "segments": [
+            {"start": 0.0, "end": 1.0, "text": " a"},
+            {"start": 2.0, "end": 2.9, "text": " c"},
+            {"start": 1.9, "end": 2.0, "text": " b"},
+        ]}
+
+
+def test_engine_sorts_out_of_order_segments():
+    engine = InMemoryEngine(models=ModelRegistry(loader=lambda name: JitteryWhisper()), chunk_seconds=None)
+    result = engine.process_video_or_url("episode.mp4")
+
+    assert [seg.text for seg in result.segments] == [" a", " b", " c"]
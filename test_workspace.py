@@ -0,0 +1,102 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from model_registry import ModelRegistry
+from processor import CastScriptEngine
+import workspace
+from workspace import JobWorkspace
+
+
+class EchoModel:
+    """Stand-in for Whisper: 'transcribes' samples by decoding them as UTF-8."""
+
+    def transcribe(self, audio, **options):
+        time.sleep(0.02)  # widen the window for jobs to interleave
+        text = audio.tobytes().decode("utf-8")
+        return {"text": text, "segments": [{"start": 0.0, "end": 1.0, "text": text}]}
+
+
+class SlowCopyEngine(CastScriptEngine):
+    """Decoding = copy the fixture into the job's scratch file (no ffmpeg)."""
+
+    def load_audio(self, input_path, content_hash, workspace):
+        scratch = workspace.file("audio.f32")
+        shutil.copyfile(input_path, scratch)
+        time.sleep(0.01)
+        return np.fromfile(scratch, dtype=np.uint8)
+
+
+class TestJobWorkspace:
+
+    def test_unique_and_cleaned_up(self):
+        with JobWorkspace() as a, JobWorkspace() as b:
+            assert a.path != b.path
+            with open(a.file("audio.wav"), "w") as f:
+                f.write("x")
+            paths = (a.path, b.path)
+        assert not any(os.path.exists(p) for p in paths)
+
+    def test_cleaned_up_on_error(self):
+        try:
+            with JobWorkspace() as ws:
+                path = ws.path
+                raise RuntimeError("job failed")
+        except RuntimeError:
+            pass
+        assert not os.path.exists(path)
+
+    def test_root_override(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("POV_SCRATCH_DIR", str(tmp_path))
+        with JobWorkspace() as ws:
+            assert os.path.dirname(ws.path) == str(tmp_path)
+
+    def test_bulk_files_stay_off_tmpfs(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(workspace, "TMPFS_ROOT", str(tmp_path / "shm"))
+        os.mkdir(tmp_path / "shm")
+        disk = tmp_path / "disk"
+        disk.mkdir()
+        with JobWorkspace(root=str(tmp_path / "shm"), bulk_root=str(disk)) as ws:
+            assert os.path.dirname(ws.file("frame.jpg")) == ws.path
+            bulk = ws.bulk_file("audio.f32")
+            assert os.path.dirname(os.path.dirname(bulk)) == str(disk)
+            paths = (ws.path, ws.bulk_path)
+        assert not any(os.path.exists(p) for p in paths)
+
+    def test_bulk_files_share_a_disk_workspace(self, tmp_path):
+        with JobWorkspace(root=str(tmp_path)) as ws:
+            assert ws.bulk_path == ws.path
+
+
+class TestConcurrentEngine:
+
+    def test_parallel_jobs_do_not_cross_contaminate(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("POV_SCRATCH_DIR", str(tmp_path / "scratch"))
+        os.makedirs(tmp_path / "scratch")
+        registry = ModelRegistry(loader=lambda name: EchoModel())
+        engine = SlowCopyEngine(chunk_seconds=None, models=registry)
+
+        fixtures = []
+        for i in range(12):
+            path = tmp_path / f"episode_{i}.wav"
+            path.write_text(f"episode {i} dialogue", encoding="utf-8")
+            fixtures.append(str(path))
+
+        barrier = threading.Barrier(4)
+
+        def job(path):
+            try:
+                barrier.wait(timeout=1)
+            except threading.BrokenBarrierError:
+                pass
+            return engine.process_video_or_url(path).transcript_text
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            outputs = list(pool.map(job, fixtures))
+
+        assert outputs == [f"episode {i} dialogue" for i in range(12)]
+        assert os.listdir(tmp_path / "scratch") == []
@@ -0,0 +1,226 @@
+"""
+Hot-path instrumentation for the POV pipeline.
+
+- `span(stage)` times a pipeline stage (ingest, extract, transcribe,
+  diarize, upload, generate...) into a rolling in-process histogram store
+- `job_trace(kind)` samples the process's peak RSS from a background
+  thread for the lifetime of one job
+- `METRICS.to_prometheus()` / `METRICS.to_json()` expose the store, and
+  `serve_metrics(port)` publishes both over HTTP (/metrics, /metrics.json)
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BYTES_BUCKETS = tuple(mb * 1024 * 1024 for mb in (128, 256, 512, 1024, 1536, 2048, 3072, 4096, 8192))
+WINDOW = 1024  # recent observations kept per series for quantiles
+
+
+class Histogram:
+    """Cumulative Prometheus buckets plus a rolling window for quantiles."""
+
+    def __init__(self, buckets: tuple[float, ...], window: int = WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class MetricsStore:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, dict[tuple, Histogram]] = {}
+        self._buckets: dict[str, tuple[float, ...]] = {}
+        self._help: dict[str, str] = {}
+
+    def register(self, name: str, help_text: str, buckets: tuple[float, ...] = SECONDS_BUCKETS) -> None:
+        with self._lock:
+            self._histograms.setdefault(name, {})
+            self._buckets[name] = buckets
+            self._help[name] = help_text
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(self._buckets.get(name, SECONDS_BUCKETS))
+            hist.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            for series in self._histograms.values():
+                series.clear()
+
+    def to_json(self) -> dict:
+        out = {}
+        with self._lock:
+            for name, series in self._histograms.items():
+                out[name] = [
+                    {
+                        "labels": dict(key),
+                        "count": h.count,
+                        "sum": round(h.sum, 6),
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "max": max(h.recent) if h.recent else None,
+                    }
+                    for key, h in series.items()
+                ]
+        return out
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in self._histograms.items():
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in series.items():
+                    cumulative = 0
+                    for bound, count in zip(list(h.buckets) + ["+Inf"], h.counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else _fmt(bound)
+                        lines.append(f"{name}_bucket{_labels(key, le=le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(key)} {_fmt(h.sum)}")
+                    lines.append(f"{name}_count{_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _labels(key: tuple, **extra: str) -> str:
+    items = list(key) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = MetricsStore()
+METRICS.register("pov_stage_seconds", "Wall time per pipeline stage.")
+METRICS.register("pov_job_seconds", "Wall time per job.")
+METRICS.register("pov_job_peak_rss_bytes", "Peak process RSS sampled during a job.", BYTES_BUCKETS)
+
+
+@contextmanager
+def span(stage: str, store: MetricsStore = METRICS, **labels: str) -> Iterator[None]:
+    """Time a pipeline stage; failures are recorded with status="error"."""
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        store.observe("pov_stage_seconds", time.perf_counter() - started, stage=stage, status=status, **labels)
+
+
+def current_rss() -> int:
+    try:
+        import psutil
+
+        return psutil.Process(os.getpid()).memory_info().rss
+    except ImportError:
+        # Linux fallback: resident pages from /proc
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class RssSampler:
+    """Background thread recording peak RSS while active."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while True:
+            self.peak = max(self.peak, current_rss())
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self) -> "RssSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> int:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+@contextmanager
+def job_trace(kind: str, store: MetricsStore = METRICS, interval: float = 0.1) -> Iterator[RssSampler]:
+    """Record a job's wall time and peak RSS."""
+    sampler = RssSampler(interval).start()
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield sampler
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        peak = sampler.stop()
+        store.observe("pov_job_seconds", time.perf_counter() - started, kind=kind, status=status)
+        store.observe("pov_job_peak_rss_bytes", peak, kind=kind)
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0", store: MetricsStore = METRICS) -> ThreadingHTTPServer:
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics.json"):
+                body = json.dumps(store.to_json()).encode()
+                ctype = "application/json"
+            elif self.path.startswith("/metrics"):
+                body = store.to_prometheus().encode()
+                ctype = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
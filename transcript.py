@@ -0,0 +1,239 @@
+"""
+Compact, array-backed transcript.
+
+Segments are held column-wise: float64 start/end arrays, an int16 speaker
+code array (-1 = no speaker) plus a small speaker-name table, and every
+segment's text in one string addressed by an offsets array. Compared with a
+list of Whisper segment dicts this is a handful of objects per transcript
+instead of a dozen per segment.
+
+- `slice_time(start, end)` returns a view of the segments overlapping a
+  time range (binary search; arrays and text are shared, not copied)
+- `windows(seconds)` walks the transcript in consecutive time slices, for
+  incremental processing
+- `save`/`load` write a columnar .npz file (no pickle)
+- `lines()`/`render()` produce the `[12.5s] text` prompt form lazily
+"""
+
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator, Sequence
+
+import numpy as np
+
+NO_SPEAKER = -1
+FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class Segment:
+    start: float
+    end: float
+    text: str
+    speaker: str | None = None
+
+
+class Transcript:
+    __slots__ = ("starts", "ends", "speaker_codes", "speaker_names", "offsets", "buffer", "_max_ends")
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, speaker_codes: np.ndarray,
+                 speaker_names: tuple[str, ...], offsets: np.ndarray, buffer: str):
+        if not (len(starts) == len(ends) == len(speaker_codes) == len(offsets) - 1):
+            raise ValueError("transcript columns have different lengths")
+        self.starts = starts
+        self.ends = ends
+        self.speaker_codes = speaker_codes
+        self.speaker_names = speaker_names
+        self.offsets = offsets      # segment i is buffer[offsets[i]:offsets[i + 1]]
+        self.buffer = buffer
+        self._max_ends = None
+
+    # ---- Construction ----
+    @classmethod
+    def empty(cls) -> "Transcript":
+        return cls.from_segments([])
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[dict], speakers: Sequence[str | None] | None = None) -> "Transcript":
+        """From Whisper-style dicts; only start/end/text (and "speaker") are kept."""
+        builder = TranscriptBuilder()
+        for i, seg in enumerate(segments):
+            speaker = speakers[i] if speakers is not None else seg.get("speaker")
+            builder.add(seg["start"], seg["end"], seg["text"], speaker)
+        return builder.build()
+
+    @classmethod
+    def concat(cls, parts: Sequence["Transcript"]) -> "Transcript":
+        builder = TranscriptBuilder()
+        for part in parts:
+            builder.extend(part)
+        return builder.build()
+
+    # ---- Access ----
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text_at(self, i: int) -> str:
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]]
+
+    def speaker_at(self, i: int) -> str | None:
+        code = self.speaker_codes[i]
+        return None if code == NO_SPEAKER else self.speaker_names[code]
+
+    def __getitem__(self, i: int | slice) -> "Segment | Transcript":
+        if isinstance(i, slice):
+            lo, hi, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError("transcript slices must be contiguous")
+            return self._index_slice(lo, max(lo, hi))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return Segment(float(self.starts[i]), float(self.ends[i]), self.text_at(i), self.speaker_at(i))
+
+    def __iter__(self) -> Iterator[Segment]:
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def text(self) -> str:
+        """Plain text of the whole transcript (no timestamps)."""
+        return self.buffer[self.offsets[0]:self.offsets[-1]].strip()
+
+    @property
+    def duration(self) -> float:
+        return float(self.ends.max()) if len(self) else 0.0
+
+    @property
+    def speakers(self) -> list[str]:
+        used = np.unique(self.speaker_codes[self.speaker_codes != NO_SPEAKER])
+        return sorted(self.speaker_names[c] for c in used)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the columns and the text."""
+        columns = self.starts.nbytes + self.ends.nbytes + self.speaker_codes.nbytes + self.offsets.nbytes
+        return columns + len(self.buffer.encode("utf-8"))
+
+    def to_dicts(self) -> list[dict]:
+        out = []
+        for seg in self:
+            d = {"start": seg.start, "end": seg.end, "text": seg.text}
+            if seg.speaker is not None:
+                d["speaker"] = seg.speaker
+            out.append(d)
+        return out
+
+    # ---- Slicing ----
+    def _index_slice(self, lo: int, hi: int) -> "Transcript":
+        return Transcript(self.starts[lo:hi], self.ends[lo:hi], self.speaker_codes[lo:hi],
+                          self.speaker_names, self.offsets[lo:hi + 1], self.buffer)
+
+    def slice_time(self, start: float, end: float) -> "Transcript":
+        """
+        Segments overlapping [start, end), as a view onto this transcript.
+
+        The view is contiguous, so a segment nested inside a longer one that
+        does overlap is kept even if it ends before `start`.
+        """
+        if self._max_ends is None:
+            # Running max of ends is sorted even when segments nest or overlap.
+            self._max_ends = np.maximum.accumulate(self.ends) if len(self) else self.ends
+        lo = int(np.searchsorted(self._max_ends, start, side="right"))
+        hi = int(np.searchsorted(self.starts, end, side="left"))
+        return self._index_slice(lo, max(lo, hi))
+
+    def windows(self, seconds: float) -> Iterator["Transcript"]:
+        """Consecutive slices by segment start; every segment lands in exactly one window."""
+        if seconds <= 0:
+            raise ValueError("window length must be positive")
+        lo = 0
+        while lo < len(self):
+            boundary = (self.starts[lo] // seconds + 1) * seconds
+            hi = int(np.searchsorted(self.starts, boundary, side="left"))
+            yield self._index_slice(lo, hi)
+            lo = hi
+
+    # ---- Rendering ----
+    def lines(self) -> Iterator[str]:
+        """`[12.5s] text` lines (`[12.5s] SPEAKER: text` where a speaker is known), one at a time."""
+        for i in range(len(self)):
+            speaker = self.speaker_at(i)
+            if speaker is None:
+                yield f"[{float(self.starts[i])}s] {self.text_at(i)}"
+            else:
+                yield f"[{float(self.starts[i])}s] {speaker}: {self.text_at(i).strip()}"
+
+    def render(self) -> str:
+        return "\n".join(self.lines())
+
+    # ---- Serialization ----
+    def save(self, file: str | BinaryIO) -> None:
+        """Columnar .npz: one array per column, text as a single UTF-8 blob."""
+        # A slice shares its parent's buffer; only write its own text.
+        base = int(self.offsets[0])
+        text = self.buffer[base:int(self.offsets[-1])]
+        np.savez(
+            file,
+            version=np.array(FORMAT_VERSION, dtype=np.int16),
+            starts=self.starts,
+            ends=self.ends,
+            speaker_codes=self.speaker_codes,
+            speaker_names=np.array(self.speaker_names, dtype=str),
+            offsets=self.offsets - base,
+            text=np.frombuffer(text.encode("utf-8"), dtype=np.uint8),
+        )
+
+    @classmethod
+    def load(cls, file: str | BinaryIO) -> "Transcript":
+        with np.load(file, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(f"unsupported transcript format version {version}")
+            return cls(
+                data["starts"], data["ends"], data["speaker_codes"],
+                tuple(str(name) for name in data["speaker_names"]),
+                data["offsets"], data["text"].tobytes().decode("utf-8"),
+            )
+
+
+class TranscriptBuilder:
+    """Accumulates segments (e.g. as chunks finish) and freezes them into a Transcript."""
+
+    def __init__(self):
+        self._starts: list[float] = []
+        self._ends: list[float] = []
+        self._codes: list[int] = []
+        self._names: dict[str, int] = {}
+        self._texts: list[str] = []
+        self._offsets: list[int] = [0]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def add(self, start: float, end: float, text: str, speaker: str | None = None) -> None:
+        if self._starts and start < self._starts[-1]:
+            raise ValueError("segments must be added in start order")
+        self._starts.append(float(start))
+        self._ends.append(float(end))
+        if speaker is None:
+            self._codes.append(NO_SPEAKER)
+        else:
+            self._codes.append(self._names.setdefault(speaker, len(self._names)))
+        self._texts.append(text)
+        self._offsets.append(self._offsets[-1] + len(text))
+
+    def extend(self, transcript: Transcript) -> None:
+        for i in range(len(transcript)):
+            self.add(float(transcript.starts[i]), float(transcript.ends[i]),
+                     transcript.text_at(i), transcript.speaker_at(i))
+
+    def build(self) -> Transcript:
+        return Transcript(
+            np.array(self._starts, dtype=np.float64),
+            np.array(self._ends, dtype=np.float64),
+            np.array(self._codes, dtype=np.int16),
+            tuple(self._names),
+            np.array(self._offsets, dtype=np.int64),
+            "".join(self._texts),
+        )
@@ -0,0 +1,191 @@
+"""
+Voice-activity gating for Whisper.
+
+A cheap pre-pass over 16 kHz mono PCM finds the stretches that look like
+speech, so silence, music beds and laugh tracks are never sent to the
+recogniser (saving compute, and the lines Whisper hallucinates over them).
+
+- `speech_regions` scores fixed frames with NumPy (RMS level against an
+  adaptive noise floor, plus the share of energy in the 300-3400 Hz speech
+  band), then closes short gaps, drops blips and pads the edges
+- `gate` concatenates the regions, with a short pause between them, and
+  returns a `TimeMap` from the gated timeline back to the original one
+- `transcribe_gated` runs any Whisper-style `transcribe(audio)` on the
+  gated audio and maps its segment/word times back; the result carries a
+  "vad" report of how much audio was skipped
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Callable
+
+import numpy as np
+
+from pcm import SAMPLE_RATE
+from tracing import METRICS
+
+FRAME_SECONDS = 0.03
+MARGIN_DB = 12.0           # speech sits this far above the noise floor
+ABS_FLOOR_DB = -50.0       # never call anything quieter than this speech
+SPEECH_BAND = (300.0, 3400.0)
+MIN_BAND_RATIO = 0.35      # music beds put most energy outside the speech band
+MIN_SPEECH_SECONDS = 0.25
+MAX_GAP_SECONDS = 0.6      # shorter pauses stay inside a region
+PAD_SECONDS = 0.2
+JOIN_SECONDS = 0.3         # silence between regions in the gated audio
+MIN_SKIP_RATIO = 0.05      # below this, gating isn't worth the joins
+FFT_BLOCK_FRAMES = 4096    # frames per rFFT batch (bounds scratch memory)
+
+METRICS.register("pov_vad_skipped_ratio", "Share of audio skipped by the VAD gate.",
+                 (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0))
+
+
+@dataclass
+class VadReport:
+    duration: float
+    speech_seconds: float
+    regions: int
+    gated: bool  # False when the whole input went through unchanged
+
+    @property
+    def skipped_seconds(self) -> float:
+        return max(self.duration - self.speech_seconds, 0.0)
+
+    @property
+    def skipped_ratio(self) -> float:
+        return self.skipped_seconds / self.duration if self.duration else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            **asdict(self),
+            "skipped_seconds": round(self.skipped_seconds, 3),
+            "skipped_ratio": round(self.skipped_ratio, 4),
+        }
+
+
+def _frames(audio: np.ndarray, n: int) -> np.ndarray:
+    usable = (len(audio) // n) * n
+    return np.asarray(audio[:usable], dtype=np.float32).reshape(-1, n)
+
+
+def band_ratio(frames: np.ndarray, sample_rate: int = SAMPLE_RATE,
+               band: tuple[float, float] = SPEECH_BAND) -> np.ndarray:
+    """Per frame, the share of spectral energy inside `band`."""
+    n = frames.shape[1]
+    freqs = np.fft.rfftfreq(n, 1.0 / sample_rate)
+    in_band = (freqs >= band[0]) & (freqs <= band[1])
+    window = np.hanning(n).astype(np.float32)
+    out = np.empty(len(frames), dtype=np.float32)
+    for lo in range(0, len(frames), FFT_BLOCK_FRAMES):
+        power = np.abs(np.fft.rfft(frames[lo:lo + FFT_BLOCK_FRAMES] * window, axis=1)) ** 2
+        out[lo:lo + FFT_BLOCK_FRAMES] = power[:, in_band].sum(axis=1) / (power.sum(axis=1) + 1e-12)
+    return out
+
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """[start, end) frame indices of each run of True."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _merge(starts: np.ndarray, ends: np.ndarray, max_gap: float) -> tuple[np.ndarray, np.ndarray]:
+    if len(starts) < 2:
+        return starts, ends
+    keep = (starts[1:] - ends[:-1]) > max_gap  # a gap this long splits regions
+    return starts[np.concatenate(([True], keep))], ends[np.concatenate((keep, [True]))]
+
+
+def speech_regions(audio: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                   frame_seconds: float = FRAME_SECONDS, margin_db: float = MARGIN_DB,
+                   min_band_ratio: float = MIN_BAND_RATIO, min_speech: float = MIN_SPEECH_SECONDS,
+                   max_gap: float = MAX_GAP_SECONDS, pad: float = PAD_SECONDS) -> np.ndarray:
+    """(n, 2) float array of [start, end) seconds that likely contain speech."""
+    n = max(int(sample_rate * frame_seconds), 1)
+    frames = _frames(audio, n)
+    duration = len(audio) / sample_rate
+    if len(frames) == 0:
+        return np.zeros((0, 2))
+
+    level = 20 * np.log10(np.sqrt(np.mean(frames * frames, axis=1)) + 1e-10)
+    floor, loud = np.percentile(level, [10, 90])
+    # Adaptive, but a clip that is all dialogue (floor ~ speech level) keeps its quieter syllables
+    threshold = max(min(floor + margin_db, loud - margin_db / 2), ABS_FLOOR_DB)
+    mask = (level > threshold) & (band_ratio(frames, sample_rate) >= min_band_ratio)
+
+    starts, ends = _runs(mask)
+    starts, ends = _merge(starts * frame_seconds, ends * frame_seconds, max_gap)
+    long_enough = (ends - starts) >= min_speech
+    starts, ends = starts[long_enough] - pad, ends[long_enough] + pad
+    starts, ends = _merge(np.clip(starts, 0, duration), np.clip(ends, 0, duration), 0.0)
+    return np.stack([starts, ends], axis=1) if len(starts) else np.zeros((0, 2))
+
+
+@dataclass
+class TimeMap:
+    """Piecewise map from gated-audio seconds to original seconds."""
+    gated_starts: np.ndarray
+    original_starts: np.ndarray
+    lengths: np.ndarray
+
+    def to_original(self, t: float | np.ndarray) -> float | np.ndarray:
+        t = np.asarray(t, dtype=np.float64)
+        i = np.clip(np.searchsorted(self.gated_starts, t, side="right") - 1, 0, len(self.gated_starts) - 1)
+        # Times inside a join pause snap to the end of the region before it
+        offset = np.clip(t - self.gated_starts[i], 0.0, self.lengths[i])
+        out = self.original_starts[i] + offset
+        return float(out) if out.ndim == 0 else out
+
+
+def gate(audio: np.ndarray, regions: np.ndarray, sample_rate: int = SAMPLE_RATE,
+         join_seconds: float = JOIN_SECONDS) -> tuple[np.ndarray, TimeMap]:
+    """Speech regions back to back (with `join_seconds` of silence between) and their TimeMap."""
+    bounds = np.round(regions * sample_rate).astype(np.int64)
+    join = np.zeros(int(join_seconds * sample_rate), dtype=np.float32)
+    pieces, gated_starts, cursor = [], [], 0
+    for lo, hi in bounds:
+        if pieces:
+            pieces.append(join)
+            cursor += len(join)
+        gated_starts.append(cursor / sample_rate)
+        pieces.append(np.asarray(audio[lo:hi], dtype=np.float32))
+        cursor += hi - lo
+    speech = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+    lengths = (bounds[:, 1] - bounds[:, 0]) / sample_rate
+    return speech, TimeMap(np.array(gated_starts), bounds[:, 0] / sample_rate, lengths)
+
+
+def remap_segments(segments: list[dict], timemap: TimeMap) -> list[dict]:
+    """Whisper segments (and their words) moved onto the original timeline."""
+    out = []
+    for seg in segments:
+        seg = {**seg, "start": round(timemap.to_original(seg["start"]), 3),
+               "end": round(timemap.to_original(seg["end"]), 3)}
+        if seg.get("words"):
+            seg["words"] = [{**w, "start": round(timemap.to_original(w["start"]), 3),
+                             "end": round(timemap.to_original(w["end"]), 3)} for w in seg["words"]]
+        out.append(seg)
+    return out
+
+
+def transcribe_gated(audio: np.ndarray, transcribe: Callable[[np.ndarray], dict],
+                     sample_rate: int = SAMPLE_RATE, min_skip_ratio: float = MIN_SKIP_RATIO,
+                     **options: Any) -> dict:
+    """transcribe() over speech only; segment times are on the original timeline."""
+    duration = len(audio) / sample_rate
+    regions = speech_regions(audio, sample_rate, **options)
+    speech_seconds = float((regions[:, 1] - regions[:, 0]).sum())
+    report = VadReport(duration=round(duration, 3), speech_seconds=round(speech_seconds, 3),
+                       regions=len(regions), gated=True)
+
+    if len(regions) == 0:
+        result = {"text": "", "segments": []}
+    elif report.skipped_ratio < min_skip_ratio:
+        report.gated = False
+        result = dict(transcribe(audio))
+    else:
+        speech, timemap = gate(audio, regions, sample_rate)
+        result = dict(transcribe(speech))
+        del speech
+        result["segments"] = remap_segments(result.get("segments") or [], timemap)
+    METRICS.observe("pov_vad_skipped_ratio", report.skipped_ratio if report.gated else 0.0)
+    result["vad"] = report.as_dict()
+    return result
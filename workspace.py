@@ -0,0 +1,83 @@
+"""
+Per-job scratch workspaces.
+
+Every job gets its own directory (tmpfs-backed under /dev/shm when it is
+writable and has room, otherwise the regular temp dir) that is removed when
+the job ends, even on error or if the workspace object is simply dropped.
+
+tmpfs pages are RAM that cannot be reclaimed, so only small scratch files go
+there. Bulk files (the ingested upload, the decoded PCM spill) go to a
+disk-backed directory instead, whose pages the kernel can drop under pressure.
+"""
+
+import os
+import shutil
+import tempfile
+import weakref
+
+TMPFS_ROOT = "/dev/shm"
+# A 23-minute 16 kHz mono WAV is ~44 MB; leave generous headroom.
+MIN_TMPFS_FREE_BYTES = 512 * 1024 * 1024
+
+
+def scratch_root(min_free_bytes: int = MIN_TMPFS_FREE_BYTES) -> str | None:
+    """Directory for scratch files: $POV_SCRATCH_DIR, tmpfs if usable, else None (system temp)."""
+    override = os.getenv("POV_SCRATCH_DIR")
+    if override:
+        return override
+    if os.path.isdir(TMPFS_ROOT) and os.access(TMPFS_ROOT, os.W_OK):
+        try:
+            if shutil.disk_usage(TMPFS_ROOT).free >= min_free_bytes:
+                return TMPFS_ROOT
+        except OSError:
+            pass
+    return None
+
+
+def _remove_all(paths: list[str]) -> None:
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class JobWorkspace:
+    """Unique scratch directory for one job; use as a context manager."""
+
+    def __init__(self, prefix: str = "pov-job-", root: str | None = None, bulk_root: str | None = None):
+        self.prefix = prefix
+        self.path = tempfile.mkdtemp(prefix=prefix, dir=root if root is not None else scratch_root())
+        self.bulk_root = bulk_root if bulk_root is not None else os.getenv("POV_SCRATCH_DIR")
+        self._bulk_path: str | None = None
+        self._dirs = [self.path]   # shared with the finalizer, so a later bulk dir is removed too
+        self._finalizer = weakref.finalize(self, _remove_all, self._dirs)
+
+    def file(self, name: str) -> str:
+        """Path for a small scratch file inside this workspace."""
+        return os.path.join(self.path, name)
+
+    @property
+    def bulk_path(self) -> str:
+        """Disk-backed directory for large files; the workspace itself unless that is on tmpfs."""
+        if self._bulk_path is None:
+            if os.path.dirname(self.path) != TMPFS_ROOT:
+                self._bulk_path = self.path
+            else:
+                self._bulk_path = tempfile.mkdtemp(prefix=self.prefix, dir=self.bulk_root)
+                self._dirs.append(self._bulk_path)
+        return self._bulk_path
+
+    def bulk_file(self, name: str) -> str:
+        """Path for a large scratch file (upload, decoded audio) kept out of tmpfs."""
+        return os.path.join(self.bulk_path, name)
+
+    def cleanup(self) -> None:
+        self._finalizer()
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def __enter__(self) -> "JobWorkspace":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cleanup()